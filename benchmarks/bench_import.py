@@ -0,0 +1,75 @@
+"""
+Import-time budget for the headless entry point.
+
+Imports ``workforce.headless`` in fresh interpreters with ``-X importtime``,
+reports the median total and the slowest top-level packages, and exits with
+status 1 if the median exceeds the budget.
+
+Run from the repository root with ``python -m benchmarks.bench_import``.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+MODULE = "workforce.headless"
+
+
+def import_times(module):
+    """
+    Import module in a fresh interpreter; return (total microseconds,
+    cumulative microseconds per top-level package).
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        capture_output=True, text=True, check=True,
+    )
+    packages = defaultdict(int)
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if not fields[0].strip().isdigit():
+            continue
+        self_us = int(fields[0])
+        name = fields[2].strip()
+        packages[name.split(".")[0]] += self_us
+        total += self_us
+    return total, packages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default=MODULE)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500,
+                        help="Largest acceptable median import time")
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    totals = []
+    packages = defaultdict(list)
+    for i in range(args.repeat):
+        total, by_package = import_times(args.module)
+        totals.append(total)
+        for name, us in by_package.items():
+            packages[name].append(us)
+
+    median = statistics.median(totals) / 1000
+    print("import {0}: median {1:.1f} ms over {2} runs (budget {3:.0f} ms)".format(
+        args.module, median, args.repeat, args.budget_ms
+    ))
+    slowest = sorted(packages.items(), key=lambda item: -statistics.median(item[1]))
+    for name, times in slowest[: args.top]:
+        print("    {0:<20} {1:8.1f} ms".format(name, statistics.median(times) / 1000))
+    if median > args.budget_ms:
+        print("Over budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
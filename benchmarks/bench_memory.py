@@ -0,0 +1,120 @@
+"""
+Memory per agent of the agent model.
+
+Measures, with tracemalloc, the bytes allocated per agent for the slotted
+GPFellow, Trainee and Patient classes and for dict-based classes with the
+same fields (the layout before they used __slots__: a mesa Agent with sex
+and nickname strings), then the bytes per patient of a whole model
+(agents, grid cells and schedule) with eager and lazy nicknames.
+
+Run from the repository root with ``python -m benchmarks.bench_memory``.
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from mesa import Agent
+
+from workforce.agents import GPFellow, Patient, Trainee
+from workforce.model import PatientGPFellow
+from workforce.person_properties import SEXES, calcName
+
+
+class DictPerson(Agent):
+    """
+    An agent with a __dict__, as PersonAgent was before __slots__.
+    """
+
+    def __init__(self, unique_id, pos, model, moore, age, sex, nickname):
+        super().__init__(unique_id, model)
+        self.pos = pos
+        self.moore = moore
+        self.age = age
+        self.sex = sex
+        self._nickname = nickname
+
+
+class DictGPFellow(DictPerson):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.yearsOutTraining = self.age - 25
+        self.attendances = 0
+
+
+class DictTrainee(DictPerson):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.yearsInTraining = 0
+
+
+class DictPatient(DictPerson):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.attendance_count = 0
+
+
+def allocated_per_item(build, count):
+    """
+    Bytes still allocated per item after build(count) returns its items.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = build(count)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return (after - before) / count
+
+
+def agent_bytes(breed, model, count, new_name):
+    """
+    Bytes per agent of a breed, including the name each agent holds:
+    new_name(sex) returns a string (dict layout) or a NamePool code
+    (slotted layout).
+    """
+    def build(count):
+        return [
+            breed(i, (i % 20, i % 20), model, True, 25 + i % 50, SEXES[i % 2], new_name(SEXES[i % 2]))
+            for i in range(count)
+        ]
+    return allocated_per_item(build, count)
+
+
+def model_bytes(count, lazy_names):
+    def build(count):
+        return PatientGPFellow(
+            initial_gpfellows=0, initial_trainees=0, initial_patients=count,
+            lazy_names=lazy_names, seed=0,
+        )
+    return allocated_per_item(build, count)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=100000,
+                        help="Number of agents to allocate per measurement")
+    args = parser.parse_args(argv)
+
+    model = PatientGPFellow(initial_gpfellows=0, initial_trainees=0, initial_patients=0, seed=0)
+    name_string = lambda sex: calcName(sex, model.streams.names)
+
+    print("{0:<10} {1:>12} {2:>12}".format("breed", "dict B/agent", "slots B/agent"))
+    for name, dict_breed, breed in (
+        ("GPFellow", DictGPFellow, GPFellow),
+        ("Trainee", DictTrainee, Trainee),
+        ("Patient", DictPatient, Patient),
+    ):
+        before = agent_bytes(dict_breed, model, args.count, name_string)
+        after = agent_bytes(breed, model, args.count, model.new_nickname)
+        print("{0:<10} {1:12.0f} {2:12.0f}".format(name, before, after))
+
+    for lazy_names in (False, True):
+        print("model, lazy_names={0}: {1:.0f} B/patient".format(
+            lazy_names, model_bytes(args.count, lazy_names)
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Startup benchmark for name generation.
+
+Compares the per-agent ``names.get_full_name`` path with the preloaded
+NamePool (scalar and vectorised draws), and model construction with eager
+and lazy nicknames.
+
+Run from the repository root with ``python -m benchmarks.bench_names``.
+"""
+
+import argparse
+import time
+
+import names
+import numpy
+
+from workforce.model import PatientGPFellow
+from workforce.namepool import NamePool
+from workforce.person_properties import calcName, calcSex
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def names_package(count):
+    for i in range(count):
+        names.get_full_name(gender='male' if calcSex() == 'M' else 'female')
+
+
+def pool_scalar(count):
+    for i in range(count):
+        calcName(calcSex())
+
+
+def pool_vectorised(pool, count):
+    pool.draw(numpy.random.randint(0, 2, count))
+
+
+def build_model(count, lazy_names):
+    PatientGPFellow(initial_patients=count, lazy_names=lazy_names)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--count', type=int, default=2000,
+                        help='Number of names (and initial patients) to generate')
+    args = parser.parse_args(argv)
+
+    load = time.perf_counter()
+    pool = NamePool()
+    load = time.perf_counter() - load
+    # Load the shared name pool and warm up the model code, so neither
+    # timed configuration pays first-use costs the other does not
+    build_model(1, False)
+
+    results = [
+        ('names.get_full_name per agent', timed(names_package, args.count)),
+        ('NamePool load (once per process)', load),
+        ('NamePool scalar draws', timed(pool_scalar, args.count)),
+        ('NamePool one vectorised draw', timed(pool_vectorised, pool, args.count)),
+        ('PatientGPFellow eager nicknames', timed(build_model, args.count, False)),
+        ('PatientGPFellow lazy nicknames', timed(build_model, args.count, True)),
+    ]
+    print('{0} names / patients'.format(args.count))
+    for label, seconds in results:
+        print('{0:<36} {1:10.4f} s'.format(label, seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Throughput benchmark for the persistence layer.
+
+Writes the AGENT_RESULT rows of a model run to a fresh SQLite database,
+first one INSERT and commit per row (the naive path) and then through the
+pooled, batched, background ResultWriter, and reports rows per second.
+
+Run from the repository root with ``python -m benchmarks.bench_persistence``.
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from workforce.model import PatientGPFellow
+from workforce.persistence import ResultWriter, create_sqlite_schema, sqlite_pool
+
+
+def fresh_database(directory, name):
+    path = os.path.join(directory, name)
+    connection = sqlite3.connect(path)
+    create_sqlite_schema(connection)
+    connection.execute("INSERT INTO SCENARIO (SCENARIO_NAME) VALUES ('benchmark')")
+    connection.commit()
+    connection.close()
+    return path
+
+
+def build_model(patients):
+    return PatientGPFellow(initial_patients=patients, patient_reproduce=0.02, lazy_names=True, seed=0)
+
+
+def naive(path, model, steps):
+    """
+    One INSERT and commit per agent row; returns rows written.
+    """
+    connection = sqlite3.connect(path)
+    rows = 0
+    for i in range(steps):
+        model.step()
+        for agent in model.schedule.agents:
+            connection.execute(
+                "INSERT INTO AGENT_RESULT (SCENARIO_ID, STEP, AGENT_ID, AGENT_TYPE, AGE, SEX) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (1, model.schedule.steps, agent.unique_id, type(agent).__name__, agent.age, agent.sex),
+            )
+            connection.commit()
+            rows += 1
+    connection.close()
+    return rows
+
+
+def batched(path, model, steps):
+    """
+    ResultWriter from a connection pool; returns rows written.
+    """
+    pool = sqlite_pool(path)
+    writer = ResultWriter(pool, 1)
+    for i in range(steps):
+        model.step()
+        writer.write_step(model)
+    writer.close()
+    pool.close()
+    return writer.rows_written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--patients", type=int, default=5000)
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--naive-steps", type=int, default=1,
+                        help="Steps for the (slow) row-at-a-time path")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp()
+    for label, write, steps in (
+        ("row at a time", naive, args.naive_steps),
+        ("ResultWriter", batched, args.steps),
+    ):
+        path = fresh_database(directory, label.replace(" ", "_") + ".db")
+        model = build_model(args.patients)
+        # Time the model on its own so only database time is reported
+        reference = build_model(args.patients)
+        start = time.perf_counter()
+        for i in range(steps):
+            reference.step()
+        stepping = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rows = write(path, model, steps)
+        seconds = max(time.perf_counter() - start - stepping, 1e-9)
+        print("{0:<15} {1:>9} rows {2:>12,.0f} rows/sec".format(label, rows, rows / seconds))
+
+
+if __name__ == "__main__":
+    main()
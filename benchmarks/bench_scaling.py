@@ -0,0 +1,237 @@
+"""
+Scaling benchmark suite for model construction and stepping.
+
+``run`` sweeps populations, grid sizes and birth rates and measures, for
+each case, the wall time, peak traced memory and allocated blocks of
+``PatientGPFellow.__init__`` and of ``step()``, plus the time spent in
+each breed's ``step_breed``. Results are appended to a JSON history file.
+``compare`` checks the latest run against an earlier one and exits with
+status 1 if any metric regressed by more than the threshold.
+
+Run from the repository root, e.g.
+
+    python -m benchmarks.bench_scaling run --patients 100 1000 10000
+    python -m benchmarks.bench_scaling compare --threshold 0.1
+"""
+
+import argparse
+import datetime
+import gc
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+from workforce.model import ENGINES
+
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.json")
+
+# Metrics where a larger value is worse, compared by the compare command
+METRICS = (
+    "init_seconds",
+    "init_peak_bytes",
+    "init_blocks",
+    "step_seconds",
+    "step_peak_bytes",
+    "step_blocks",
+)
+
+# Methods the array engines step each breed with
+BREED_METHODS = {
+    "GPFellow": "step_gpfellows",
+    "Trainee": "step_trainees",
+    "Patient": "step_patients",
+}
+
+
+def time_breeds(model, timings):
+    """
+    Wrap the model's per-breed step so its time accumulates in timings.
+    """
+    def timed(name, step):
+        def wrapper(*args):
+            start = time.perf_counter()
+            step(*args)
+            timings[name] += time.perf_counter() - start
+        return wrapper
+
+    if model.schedule is not None:
+        step_breed = model.schedule.step_breed
+
+        def timed_step_breed(breed):
+            timed(breed.__name__, step_breed)(breed)
+
+        model.schedule.step_breed = timed_step_breed
+    else:
+        for name, method in BREED_METHODS.items():
+            setattr(model, method, timed(name, getattr(model, method)))
+
+
+def build(engine, case, seed):
+    return ENGINES[engine](
+        height=case["grid"],
+        width=case["grid"],
+        initial_patients=case["patients"],
+        patient_reproduce=case["birth_rate"],
+        seed=seed,
+    )
+
+
+def traced(func):
+    """
+    Call func under tracemalloc; return (result, peak bytes, blocks allocated).
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = func()
+    after = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    blocks = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, "filename"))
+    return result, peak, blocks
+
+
+def measure(engine, case, steps, seed=0):
+    """
+    Benchmark one case: timings without tracing, then memory with it.
+    """
+    start = time.perf_counter()
+    model = build(engine, case, seed)
+    init_seconds = time.perf_counter() - start
+
+    breeds = defaultdict(float)
+    time_breeds(model, breeds)
+    start = time.perf_counter()
+    for i in range(steps):
+        model.step()
+    step_seconds = (time.perf_counter() - start) / steps
+
+    model, init_peak, init_blocks = traced(lambda: build(engine, case, seed))
+    _, step_peak, step_blocks = traced(lambda: [model.step() for i in range(steps)])
+
+    return dict(
+        case,
+        engine=engine,
+        steps=steps,
+        init_seconds=init_seconds,
+        init_peak_bytes=init_peak,
+        init_blocks=init_blocks,
+        step_seconds=step_seconds,
+        step_peak_bytes=step_peak,
+        step_blocks=step_blocks // steps,
+        breed_step_seconds={name: t / steps for name, t in breeds.items()},
+    )
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as history_file:
+        return json.load(history_file)
+
+
+def case_key(result):
+    return (result["engine"], result["patients"], result["grid"], result["birth_rate"])
+
+
+def run(args):
+    results = []
+    for patients, grid, birth_rate in itertools.product(args.patients, args.grid, args.birth_rate):
+        case = dict(patients=patients, grid=grid, birth_rate=birth_rate)
+        result = measure(args.engine, case, args.steps)
+        results.append(result)
+        print(
+            "{engine} patients={patients} grid={grid} birth_rate={birth_rate}: "
+            "init {init_seconds:.4f}s {init_peak_bytes:,}B, "
+            "step {step_seconds:.4f}s {step_peak_bytes:,}B".format(**result)
+        )
+        for name, seconds in sorted(result["breed_step_seconds"].items()):
+            print("    {0:<10} {1:.4f}s/step".format(name, seconds))
+
+    history = load_history(args.history)
+    history.append({
+        "label": args.label,
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+    })
+    with open(args.history, "w") as history_file:
+        json.dump(history, history_file, indent=1)
+    print("Appended run {0} to {1}".format(len(history) - 1, args.history))
+
+
+def compare(args):
+    history = load_history(args.history)
+    if len(history) < 2:
+        print("Need at least two runs in {0} to compare".format(args.history))
+        return 0
+    baseline, current = history[args.baseline], history[args.current]
+    baseline_results = {case_key(r): r for r in baseline["results"]}
+
+    regressions = 0
+    for result in current["results"]:
+        reference = baseline_results.get(case_key(result))
+        if reference is None:
+            continue
+        for metric in METRICS:
+            old, new = reference[metric], result[metric]
+            change = (new - old) / old if old else 0.0
+            flag = ""
+            if change > args.threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            print("{0} {1:<16} {2:>14.6g} -> {3:<14.6g} {4:+7.1%}{5}".format(
+                case_key(result), metric, old, new, change, flag
+            ))
+    print("{0} regression(s) over {1:.0%}".format(regressions, args.threshold))
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--history", default=HISTORY_PATH, help="JSON history file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Benchmark and append to the history")
+    run_parser.add_argument("--engine", choices=sorted(ENGINES), default="agent")
+    run_parser.add_argument("--patients", type=int, nargs="+", default=[100, 1000, 10000])
+    run_parser.add_argument("--grid", type=int, nargs="+", default=[20])
+    run_parser.add_argument("--birth-rate", type=float, nargs="+", default=[0.02])
+    run_parser.add_argument("--steps", type=int, default=5)
+    run_parser.add_argument("--label", default="")
+
+    compare_parser = commands.add_parser("compare", help="Flag regressions between two runs")
+    compare_parser.add_argument("--baseline", type=int, default=-2,
+                                help="History index of the baseline run")
+    compare_parser.add_argument("--current", type=int, default=-1,
+                                help="History index of the run to check")
+    compare_parser.add_argument("--threshold", type=float, default=0.1,
+                                help="Relative increase counted as a regression")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run(args)
+        return 0
+    return compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
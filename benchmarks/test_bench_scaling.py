@@ -0,0 +1,32 @@
+"""
+Tests of the scaling benchmark's history and regression check.
+"""
+
+import json
+
+from benchmarks.bench_scaling import METRICS, main
+
+
+def test_run_appends_to_the_history_and_compare_passes(tmp_path, capsys):
+    history = str(tmp_path / "history.json")
+    for label in ("before", "after"):
+        assert main(["--history", history, "run", "--patients", "50", "--steps", "1", "--label", label]) == 0
+    with open(history) as history_file:
+        runs = json.load(history_file)
+    assert [run["label"] for run in runs] == ["before", "after"]
+    assert set(METRICS) <= set(runs[0]["results"][0])
+    # Timings of two tiny runs may differ by any amount; only check that
+    # the comparison runs
+    assert main(["--history", history, "compare", "--threshold", "1000"]) == 0
+
+
+def test_compare_flags_regressions_over_the_threshold(tmp_path):
+    history = str(tmp_path / "history.json")
+    case = dict(engine="agent", patients=100, grid=20, birth_rate=0.02)
+    slow = dict(case, **{metric: 2.0 for metric in METRICS})
+    fast = dict(case, **{metric: 1.0 for metric in METRICS})
+    with open(history, "w") as history_file:
+        json.dump([{"results": [fast]}, {"results": [slow]}], history_file)
+    assert main(["--history", history, "compare", "--threshold", "0.5"]) == 1
+    assert main(["--history", history, "compare", "--threshold", "1.5"]) == 0
+    assert main(["--history", history, "compare", "--baseline", "1", "--current", "0"]) == 0
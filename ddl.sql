@@ -2,6 +2,8 @@
 -- Date:    2020-06-24
 -- Desc:    Concept for how to store data in a database to underpin model
 
+DROP TABLE IF EXISTS mortimer_workforce.SCENARIO_RESULT;
+DROP TABLE IF EXISTS mortimer_workforce.AGENT_RESULT;
 DROP TABLE IF EXISTS mortimer_workforce.LOCATION;
 DROP TABLE IF EXISTS mortimer_workforce.LOCATION_TYPE;
 DROP TABLE IF EXISTS mortimer_workforce.GP_FELLOW;
@@ -96,4 +98,33 @@ CREATE TABLE mortimer_workforce.SCENARIO (
 )
 AUTO_INCREMENT=1 
 ENGINE=InnoDB DEFAULT CHARSET=utf8 COLLATE=utf8_spanish_ci;
-;
\ No newline at end of file
+;
+-- Scenario Result (headcounts per step)
+CREATE TABLE mortimer_workforce.SCENARIO_RESULT (
+	SCENARIO_ID INT(11) NOT NULL
+    , STEP INT(11) NOT NULL
+    , PATIENTS INT(11)
+    , GP_FELLOWS INT(11)
+    , GP_TRAINEES INT(11)
+	, PRIMARY KEY (`SCENARIO_ID`, `STEP`)
+    , CONSTRAINT FK_SCENARIO_RESULT_SCENARIO_ID FOREIGN KEY (`SCENARIO_ID`) 
+		REFERENCES SCENARIO(`SCENARIO_ID`)
+)
+ENGINE=InnoDB DEFAULT CHARSET=utf8 COLLATE=utf8_spanish_ci;
+;
+-- Agent Result (agent state per step)
+CREATE TABLE mortimer_workforce.AGENT_RESULT (
+	SCENARIO_ID INT(11) NOT NULL
+    , STEP INT(11) NOT NULL
+    , AGENT_ID INT(11) NOT NULL
+    , AGENT_TYPE VARCHAR(20)
+    , AGE INT(11)
+    , SEX CHAR(1)
+    , ATTENDANCES INT(11)
+    , YEARS_IN_TRAINING INT(11)
+	, PRIMARY KEY (`SCENARIO_ID`, `STEP`, `AGENT_ID`)
+    , CONSTRAINT FK_AGENT_RESULT_SCENARIO_ID FOREIGN KEY (`SCENARIO_ID`) 
+		REFERENCES SCENARIO(`SCENARIO_ID`)
+)
+ENGINE=InnoDB DEFAULT CHARSET=utf8 COLLATE=utf8_spanish_ci;
+;
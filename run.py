@@ -1,3 +1,7 @@
+from workforce import configure_logging
+
+configure_logging()
+
 from workforce.server import server
 
 server.launch()
@@ -0,0 +1,32 @@
+"""
+GP workforce model.
+
+Importing the package, the model, the agents or the scheduler does not
+start any visualization code or open any files. The server
+(``workforce.server``) and optional backends are imported on first use,
+and logging to ``workforce.log`` is only switched on by configure_logging().
+"""
+
+import logging
+import os
+
+LOGGERS = ('agent', 'model')
+
+
+def configure_logging(path='workforce.log', level=logging.DEBUG):
+    """
+    Send the model's debug loggers to a log file. Safe to call repeatedly.
+    """
+    path = os.path.abspath(path)
+    for name in LOGGERS:
+        logger = logging.getLogger(name)
+        if any(getattr(h, 'baseFilename', None) == path for h in logger.handlers):
+            continue
+        # create file handler which logs even debug messages
+        fh = logging.FileHandler(path)
+        fh.setLevel(level)
+        # create formatter and add it to the handlers
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        fh.setFormatter(formatter)
+        # add the handlers to the logger
+        logger.addHandler(fh)
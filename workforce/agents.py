@@ -1,25 +1,18 @@
-from mesa import Agent
 from workforce.person_agent import PersonAgent
-from workforce.person_properties import calcAge, calcSex, calcName
+from workforce.person_properties import calcAge, calcSex
+from workforce.instrument import clock
 import numpy
 import logging
 
-# Create a logger for debugging
+# Create a logger for debugging; workforce.configure_logging() sends it to
+# workforce.log
 logger = logging.getLogger('agent')
 logger.setLevel(logging.DEBUG)
-# create file handler which logs even debug messages
-fh = logging.FileHandler('workforce.log')
-fh.setLevel(logging.DEBUG)
-# create formatter and add it to the handlers
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-fh.setFormatter(formatter)
-# add the handlers to the logger
-logger.addHandler(fh)
 logger.info('Running agent.py')
 
 # A function for generating a time in training
-def calcYearsInTraining(steps):
-    yearsInTraining = 0 if steps > 0 else round(numpy.random.random() * 5)
+def calcYearsInTraining(steps, rng=numpy.random):
+    yearsInTraining = 0 if steps > 0 else round(rng.random() * 5)
     return yearsInTraining
 def calcYearsOutTraining(age):
     yearsOutTraining = age - 25
@@ -29,16 +22,20 @@ class GPFellow(PersonAgent):
     """
     A gpfellow that ages, and sometimes trains a trainee.
     """
+    __slots__ = ("age", "yearsOutTraining", "attendances")
+    # Derived from the schedule under EventActivationByBreed
+    yearly_attributes = ("age", "yearsOutTraining")
+
     def __init__(self, unique_id, pos, model, moore, age, sex, nickname):
         super().__init__(unique_id, pos, model, moore, age, sex, nickname)
         self.yearsOutTraining = calcYearsOutTraining(self.age)
+        self.attendances = 0
 
     def step(self):
         """
         A model step: Age by one year
         """
         #self.random_move()
-        inworkforce = True
         # Age the gpfellow
         self.age += 1
         self.yearsOutTraining += 1
@@ -46,92 +43,175 @@ class GPFellow(PersonAgent):
         # Exit the workforce
         #logger.info('self.model.gpfellow_retirement_age: '+str(self.model.gpfellow_retirement_age))
         if self.age > self.model.gpfellow_retirement_age:
-            self.model.grid._remove_agent(self.pos, self)
-            self.model.schedule.remove(self)
-            inworkforce = False
-
-        # Start training a new trainee
-        if inworkforce and self.random.random() < self.model.gpfellow_trained_trainee:
-            age = calcAge(25,2)
-            sex = calcSex()
-            nickname = calcName(sex)
-            trainee = Trainee(
-                self.model.next_id(), self.pos, self.model, self.moore, age, sex, nickname
-            )
-            self.model.grid.place_agent(trainee, self.pos)
-            trainee.random_move()
-            self.model.schedule.add(trainee)
+            self.retire()
+        # Start training a new trainee (the model starts every trainee at
+        # once in bulk births mode)
+        elif (
+            not self.model.bulk_births
+            and self.model.streams.intake.random() < self.model.gpfellow_trained_trainee
+        ):
+            self.start_trainee()
+
+    def retire(self):
+        """
+        Leave the grid and the schedule.
+        """
+        self.model.remove_gpfellow(self)
+        self.model.schedule.remove(self)
+        if self.model.instrument is not None:
+            self.model.instrument.count("retirements")
+
+    def start_trainee(self):
+        """
+        Take on a new trainee, who starts next to this gpfellow.
+        """
+        demographics = self.model.streams.demographics
+        age = calcAge(25, 2, demographics)
+        sex = calcSex(demographics)
+        nickname = self.model.new_nickname(sex)
+        trainee = Trainee(
+            self.model.next_id(), self.pos, self.model, self.moore, age, sex, nickname
+        )
+        self.model.grid.place_agent(trainee, self.pos)
+        trainee.random_move()
+        self.model.schedule.add(trainee)
+        if self.model.instrument is not None:
+            self.model.instrument.count("trainee_starts")
+
+    def schedule_events(self, schedule, first_step):
+        """
+        Register the retirement and the first trainee start with an
+        EventActivationByBreed, given the first step this gpfellow ages in.
+        """
+        # Retires in the first step its age passes the retirement age
+        retirement = first_step + max(self.model.gpfellow_retirement_age - self.age, 0)
+        schedule.schedule_event(self, retirement, "retire")
+        self._schedule_trainee_start(first_step - 1)
+
+    def _schedule_trainee_start(self, step):
+        # Steps between trainee starts are geometric: a trainee is started
+        # with probability gpfellow_trained_trainee every year
+        if self.model.gpfellow_trained_trainee > 0:
+            wait = self.model.streams.intake.generator.geometric(self.model.gpfellow_trained_trainee)
+            self.model.schedule.schedule_event(self, step + int(wait), "trainee_start_event")
+
+    def trainee_start_event(self):
+        self.start_trainee()
+        self._schedule_trainee_start(self.model.schedule.steps)
 
 class Trainee(PersonAgent):
     """
     A trainee that ages, becomes a fellow.
     """
+    __slots__ = ("age", "yearsInTraining")
+    # Derived from the schedule under EventActivationByBreed
+    yearly_attributes = ("age", "yearsInTraining")
+
     def __init__(self, unique_id, pos, model, moore, age, sex, nickname):
         super().__init__(unique_id, pos, model, moore, age, sex, nickname)
         #logger.info(self.model.schedule.steps)
-        self.yearsInTraining = calcYearsInTraining(self.model.schedule.steps)
+        self.yearsInTraining = calcYearsInTraining(
+            self.model.schedule.steps, self.model.streams.demographics
+        )
 
     def step(self):
         """
         A model step: Age by one year
         """
-        inworkforce = True
         # Age the gpfellow
         self.age += 1
         self.yearsInTraining += 1
 
         # Becomes a gpfellow
         if self.yearsInTraining >= self.model.trainee_train_period:
-            # remove self
-            self.model.grid._remove_agent(self.pos, self)
-            self.model.schedule.remove(self)
-            inworkforce = False
-            # add gpfellow with my properties
-            newGPFellow = GPFellow(
-                self.model.next_id(), self.pos, self.model, self.moore, self.age, self.sex, self.nickname
-            )
-            self.model.grid.place_agent(newGPFellow, self.pos)
-            self.model.schedule.add(newGPFellow)
-            inworkforce = False
+            self.graduate()
+
+    def graduate(self):
+        """
+        Replace this trainee with a gpfellow of the same age, sex, name
+        and position.
+        """
+        pos = self.pos
+        age = self.age
+        # remove self
+        self.model.grid.remove_agent(self)
+        self.model.schedule.remove(self)
+        # add gpfellow with my properties
+        newGPFellow = GPFellow(
+            self.model.next_id(), pos, self.model, self.moore, age, self.sex, self._nickname
+        )
+        self.model.place_gpfellow(newGPFellow, pos)
+        self.model.schedule.add(newGPFellow)
+        if self.model.instrument is not None:
+            self.model.instrument.count("promotions")
+
+    def schedule_events(self, schedule, first_step):
+        """
+        Register the graduation with an EventActivationByBreed, given the
+        first step this trainee ages in.
+        """
+        # Graduates in the first step its training reaches the training period
+        years = max(self.model.trainee_train_period - self.yearsInTraining - 1, 0)
+        schedule.schedule_event(self, first_step + years, "graduate")
 
 
 class Patient(PersonAgent):
     """
     A patient that walks around, reproduces (asexually) and attends gpfellows.
     """
+    __slots__ = ("age", "attendance_count")
+
     def __init__(self, unique_id, pos, model, moore, age, sex, nickname):
         super().__init__(unique_id, pos, model, moore, age, sex, nickname)
         self.attendance_count = 0
 
     def step(self):
-        self.random_move()
+        instrument = self.model.instrument
+        # The model moves every patient at once in bulk movement mode
+        if not self.model.bulk_movement:
+            if instrument is not None:
+                start = clock()
+            self.random_move()
+            if instrument is not None:
+                instrument.add_time("movement", clock() - start)
         # Age the patient
         self.age += 1
 
-        # If there are gpfellows present, attend one
-        x, y = self.pos
-        this_cell = self.model.grid.get_cell_list_contents([self.pos])
-        gpfellow = [obj for obj in this_cell if isinstance(obj, GPFellow)]
-        if len(gpfellow) > 0:
-            gpfellow_attended = self.random.choice(gpfellow)
-            self.attendance_count += 1
-            
-            # Add to gpfellows workload
-            #self.model.grid._remove_agent(self.pos, gpfellow_attended)
-            #self.model.schedule.remove(gpfellow_attended)
+        # If there are gpfellows present, attend one (the model attends
+        # every patient at the end of the step in bulk attendance mode)
+        if not self.model.bulk_attendance:
+            if instrument is not None:
+                start = clock()
+            gpfellows = self.model.gpfellows_by_cell.get(self.pos)
+            if gpfellows:
+                gpfellow_attended = self.model.streams.attendance.choice(gpfellows)
+                self.attendance_count += 1
+
+                # Add to gpfellows workload
+                gpfellow_attended.attendances += 1
+                if instrument is not None:
+                    instrument.count("attendances")
+            if instrument is not None:
+                instrument.add_time("attendance", clock() - start)
 
         # Death or reproduction
         if self.age > 80:
-            self.model.grid._remove_agent(self.pos, self)
+            self.model.grid.remove_agent(self)
             self.model.schedule.remove(self)
-        else:
-            if self.random.random() < self.model.patient_reproduce:
+            if instrument is not None:
+                instrument.count("deaths")
+        # The model draws every birth at once in bulk births mode
+        elif not self.model.bulk_births:
+            streams = self.model.streams
+            if streams.births.random() < self.model.patient_reproduce:
                 # Create a new patient baby
                 age = 0
-                sex = calcSex()
-                nickname = calcName(sex)
+                sex = calcSex(streams.demographics)
+                nickname = self.model.new_nickname(sex)
                 baby = Patient(
                     self.model.next_id(), self.pos, self.model, self.moore, age, sex, nickname 
                 )
                 self.model.grid.place_agent(baby, baby.pos)
                 self.model.schedule.add(baby)
+                if instrument is not None:
+                    instrument.count("births")
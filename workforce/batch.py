@@ -0,0 +1,269 @@
+"""
+Parameter sweeps of the Patient-GPFellow model over a process pool.
+
+Every combination of parameters is run for a number of replicates. Each run
+gets a seed derived only from the base seed and its run id, so results do
+not depend on the number of processes or how tasks are chunked. Finished
+runs stream back to the parent, which appends them to one tidy table with a
+row per run and step.
+
+From the command line:
+
+    python -m workforce.batch --patient-reproduce 0.01 0.02 \\
+        --gpfellow-retirement-age 60 65 70 --replicates 10 --steps 50 \\
+        --output sweep.csv
+"""
+
+import argparse
+import inspect
+import itertools
+import math
+import multiprocessing
+
+import pandas
+
+from workforce.cache import MAX_BYTES, ResultCache
+from workforce.model import ENGINES
+from workforce.scenario import PARAMETERS, headcount_kwargs, run_seed
+
+# Model parameters that can be swept, with their command line types
+SWEEP_PARAMETERS = PARAMETERS
+
+
+def parameter_grid(**ranges):
+    """
+    Return one dict per combination of the given parameter values.
+
+    Args:
+        ranges: Parameter name to a list of values, or a single value.
+    """
+    keys = list(ranges)
+    values = [v if isinstance(v, (list, tuple, range)) else [v] for v in ranges.values()]
+    return [dict(zip(keys, combination)) for combination in itertools.product(*values)]
+
+
+def _run_arguments(engine, parameters, seed):
+    """
+    The keyword arguments a run of the engine is built with, as run_series
+    keys them in the cache: every parameter, with the fast headcount
+    defaults and the signature defaults given explicitly.
+    """
+    kwargs = headcount_kwargs(engine, parameters)
+    # Key on every parameter, so defaults given explicitly still hit
+    arguments = inspect.signature(ENGINES[engine]).bind(seed=seed, **kwargs)
+    arguments.apply_defaults()
+    kwargs = dict(arguments.arguments)
+    del kwargs["seed"]
+    return kwargs
+
+
+def cached_series(engine, parameters, seed, steps, cache):
+    """
+    The series run_series would return if the cache holds the run (or a
+    longer one), else None. Never runs the model.
+    """
+    return cache.get(engine, _run_arguments(engine, parameters, seed), seed, steps)
+
+
+def run_series(engine, parameters, seed, steps, cache=None):
+    """
+    The DataCollector series of one run, taken from the cache when it holds
+    the run (or a longer one) and stored in it otherwise.
+
+    Args:
+        engine: Key of workforce.model.ENGINES.
+        parameters: Model parameters.
+        seed: Seed of the run.
+        steps: Years to simulate.
+        cache: Optional ResultCache.
+
+    Returns:
+        Dict of series name to a list of steps + 1 values.
+    """
+    kwargs = _run_arguments(engine, parameters, seed)
+    if cache is not None:
+        series = cache.get(engine, kwargs, seed, steps)
+        if series is not None:
+            return series
+
+    model = ENGINES[engine](seed=seed, **kwargs)
+    for i in range(steps):
+        model.step()
+    series = {name: list(values) for name, values in model.datacollector.model_vars.items()}
+    if cache is not None:
+        cache.put(engine, kwargs, seed, series)
+    return series
+
+
+def run_single(task):
+    """
+    Run one model to completion and return its DataCollector series.
+
+    Args:
+        task: (run_id, engine, parameters, seed, steps, cache) tuple, where
+              cache is a ResultCache or None.
+
+    Returns:
+        DataFrame with one row per step, tagged with the run id, seed and
+        parameters.
+    """
+    run_id, engine, parameters, seed, steps, cache = task
+    results = pandas.DataFrame(run_series(engine, parameters, seed, steps, cache))
+    results.index.name = "Step"
+    results = results.reset_index()
+    results.insert(0, "seed", seed)
+    results.insert(0, "run_id", run_id)
+    for i, (name, value) in enumerate(parameters.items()):
+        results.insert(2 + i, name, value)
+    return results
+
+
+def batch_run(
+    parameters,
+    replicates=1,
+    steps=50,
+    engine="agent",
+    seed=0,
+    processes=None,
+    chunksize=None,
+    output=None,
+    cache=None,
+):
+    """
+    Run every parameter combination for a number of replicates.
+
+    Args:
+        parameters: List of parameter dicts (see parameter_grid), or a dict
+                    of parameter ranges to expand.
+        replicates: Runs per parameter combination.
+        steps: Years to simulate per run.
+        engine: Key of workforce.model.ENGINES to run.
+        seed: Base seed that all per-run seeds are derived from.
+        processes: Worker processes; defaults to the number of CPUs. With
+                   1 the runs happen in this process.
+        chunksize: Tasks handed to a worker at a time; defaults to about
+                   four chunks per worker.
+        output: Optional CSV path that each run is appended to as it
+                finishes.
+        cache: Optional ResultCache to reuse and store runs in.
+
+    Returns:
+        DataFrame with columns run_id, seed, the swept parameters, Step and
+        the model's DataCollector series, sorted by run_id and Step.
+    """
+    if isinstance(parameters, dict):
+        parameters = parameter_grid(**parameters)
+    tasks = [
+        (run_id, engine, params, run_seed(seed, run_id), steps, cache)
+        for run_id, (params, replicate) in enumerate(
+            itertools.product(parameters, range(replicates))
+        )
+    ]
+    processes = processes or multiprocessing.cpu_count()
+    if chunksize is None:
+        chunksize = max(1, math.ceil(len(tasks) / (4 * processes)))
+
+    frames = []
+    header = True
+
+    def collect(results):
+        nonlocal header
+        frames.append(results)
+        if output is not None:
+            results.to_csv(output, mode="w" if header else "a", header=header, index=False)
+            header = False
+
+    if processes == 1:
+        for task in tasks:
+            collect(run_single(task))
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            for results in pool.imap_unordered(run_single, tasks, chunksize):
+                collect(results)
+
+    if not frames:
+        return pandas.DataFrame()
+    table = pandas.concat(frames, ignore_index=True)
+    return table.sort_values(["run_id", "Step"], ignore_index=True)
+
+
+def compare_engines(parameters, engines=("agent", "cohort"), replicates=30, steps=50, **kwargs):
+    """
+    Run one scenario on several engines and compare their series per step.
+
+    Args:
+        parameters: Model parameters of the scenario.
+        engines: Keys of workforce.model.ENGINES to compare; the first is
+                 the reference.
+        replicates, steps, kwargs: Passed on to batch_run.
+
+    Returns:
+        DataFrame indexed by Step with the mean and standard error of every
+        series for each engine, and for each other engine the z score of the
+        difference of its mean from the reference engine's.
+    """
+    summaries = {}
+    for engine in engines:
+        table = batch_run([parameters], replicates=replicates, steps=steps, engine=engine, **kwargs)
+        series = table.drop(columns=["run_id", "seed"] + list(parameters))
+        grouped = series.groupby("Step")
+        summaries[engine] = (grouped.mean(), grouped.sem())
+
+    reference = engines[0]
+    mean, sem = summaries[reference]
+    columns = {}
+    for engine in engines:
+        columns[(engine, "mean")] = summaries[engine][0]
+        columns[(engine, "sem")] = summaries[engine][1]
+        if engine != reference:
+            other_mean, other_sem = summaries[engine]
+            spread = (sem ** 2 + other_sem ** 2) ** 0.5
+            columns[(engine, "z")] = (other_mean - mean) / spread.where(spread > 0)
+    return pandas.concat(columns, axis=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run a parameter sweep of the Patient-GPFellow model."
+    )
+    for name, kind in SWEEP_PARAMETERS.items():
+        parser.add_argument(
+            "--" + name.replace("_", "-"), type=kind, nargs="+",
+            help="Value(s) of " + name,
+        )
+    parser.add_argument("--replicates", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="agent")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--chunksize", type=int)
+    parser.add_argument("--output", default="sweep.csv")
+    parser.add_argument("--cache", metavar="DIR",
+                        help="Reuse and store runs in a result cache directory")
+    parser.add_argument("--cache-size", type=float, default=MAX_BYTES / 2 ** 20,
+                        help="Largest size of the cache in MiB")
+    args = parser.parse_args(argv)
+
+    ranges = {
+        name: getattr(args, name)
+        for name in SWEEP_PARAMETERS
+        if getattr(args, name) is not None
+    }
+    table = batch_run(
+        parameter_grid(**ranges),
+        replicates=args.replicates,
+        steps=args.steps,
+        engine=args.engine,
+        seed=args.seed,
+        processes=args.processes,
+        chunksize=args.chunksize,
+        output=args.output,
+        cache=ResultCache(args.cache, int(args.cache_size * 2 ** 20)) if args.cache else None,
+    )
+    # Rewrite in run order now that every run has finished
+    table.to_csv(args.output, index=False)
+    print("Wrote {0} runs to {1}".format(table["run_id"].nunique(), args.output))
+
+
+if __name__ == "__main__":
+    main()
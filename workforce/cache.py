@@ -0,0 +1,199 @@
+"""
+On-disk cache of simulated headcount series.
+
+A run is fully determined by its engine, parameters, seed and the model
+code, so its DataCollector series can be stored and reused. Entries are
+content addressed: the key is a hash of the engine, the parameters that
+affect the series, the seed and a hash of the source of the simulation
+modules, so editing the model invalidates old results while edits elsewhere
+(the server, the batch runner) do not.
+
+The number of steps is not part of the key. An entry holds the longest run
+stored so far, and a request for fewer steps is answered from its prefix:
+a cached 50 year run answers a 30 year request.
+
+Entries are ``.npz`` files under the cache directory. Reading an entry
+touches it, and when the cache grows past max_bytes the least recently used
+entries are removed.
+
+    cache = ResultCache()
+    series = cache.get("agent", parameters, seed=1, steps=30)
+    if series is None:
+        ...
+        cache.put("agent", parameters, 1, model.datacollector.model_vars)
+"""
+
+import functools
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy
+
+from workforce.population import PopulationTable
+
+CACHE_PATH = os.environ.get(
+    "WORKFORCE_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "workforce")
+)
+MAX_BYTES = 256 * 2 ** 20
+
+# Modules whose code decides the simulated series
+SOURCE_MODULES = (
+    "agents",
+    "cohort",
+    "columns",
+    "model",
+    "person_agent",
+    "person_properties",
+    "population",
+    "schedule",
+    "streams",
+)
+
+# Parameters that do not change the collected headcount series: names,
+# movement and attendance have random streams of their own
+IGNORED_PARAMETERS = (
+    "lazy_names",
+    "bulk_movement",
+    "bulk_attendance",
+    "collector_path",
+    "collect_every",
+    "agent_sample",
+    "instrument",
+    "population_cache",
+)
+
+
+@functools.lru_cache(maxsize=None)
+def source_hash():
+    """
+    SHA-256 of the source of the simulation modules.
+    """
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in SOURCE_MODULES:
+        with open(os.path.join(directory, name + ".py"), "rb") as source:
+            digest.update(source.read())
+    return digest.hexdigest()
+
+
+def scenario_key(engine, parameters, seed):
+    """
+    The cache key of a run, whatever its number of steps.
+    """
+    parameters = {
+        name: value for name, value in parameters.items() if name not in IGNORED_PARAMETERS
+    }
+    # A population file is keyed by its contents, like a PopulationTable
+    population = parameters.get("population")
+    if population is not None and not isinstance(population, PopulationTable):
+        parameters["population"] = PopulationTable.load(population)
+    text = json.dumps([engine, parameters, seed, source_hash()], sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    A size-bounded LRU store of series on disk, safe to share between
+    processes.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES):
+        """
+        Args:
+            path: Directory of the cache; created if needed.
+            max_bytes: Size the entries are evicted down to.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(path, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.path, key + ".npz")
+
+    def get(self, engine, parameters, seed, steps):
+        """
+        The series of the first steps of a run, as lists with steps + 1
+        values (the initial state first), or None if not cached. Runs
+        without a seed are never cached.
+        """
+        if seed is None:
+            return None
+        entry = self._entry(scenario_key(engine, parameters, seed))
+        try:
+            with numpy.load(entry) as data:
+                series = {name: data[name] for name in data.files}
+            os.utime(entry)
+        except (OSError, ValueError):  # missing, evicted or half written
+            self.misses += 1
+            return None
+        if any(len(values) < steps + 1 for values in series.values()):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {name: values[: steps + 1].tolist() for name, values in series.items()}
+
+    def put(self, engine, parameters, seed, series):
+        """
+        Store the series of a run, unless a run at least as long is
+        already cached.
+
+        Args:
+            engine, parameters, seed: As passed to get().
+            series: Series name to the list of values per step, e.g. a
+                    DataCollector's model_vars.
+        """
+        if seed is None or not series:
+            return
+        entry = self._entry(scenario_key(engine, parameters, seed))
+        steps = min(len(values) for values in series.values())
+        try:
+            with numpy.load(entry) as data:
+                if min(len(data[name]) for name in data.files) >= steps:
+                    return
+        except (OSError, ValueError):
+            pass
+        # Write to a temporary file and rename it, so readers never see a
+        # partial entry
+        descriptor, temporary = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(descriptor, "wb") as entry_file:
+            numpy.savez(entry_file, **{
+                name: numpy.asarray(values[:steps]) for name, values in series.items()
+            })
+        os.replace(temporary, entry)
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache fits in
+        max_bytes.
+        """
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith(".npz"):
+                continue
+            try:
+                status = os.stat(os.path.join(self.path, name))
+            except FileNotFoundError:  # removed by another process
+                continue
+            entries.append((status.st_mtime, status.st_size, name))
+        total = sum(size for mtime, size, name in entries)
+        for mtime, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.path, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        for name in os.listdir(self.path):
+            if name.endswith(".npz"):
+                os.remove(os.path.join(self.path, name))
@@ -0,0 +1,296 @@
+"""
+Calibration of Patient-GPFellow parameters against observed headcounts.
+
+A Calibration holds an observed series per year (e.g. GPFellows and
+Trainees from the registry), the bounds of the parameters to tune and the
+values of the others. The loss of a candidate is the root mean square
+difference between the observed series and the mean of its simulated
+replicates over the observed years (missing years may be nan).
+
+Every candidate is run with the same replicate seeds (common random
+numbers), so differences in loss come from the parameters rather than the
+draws. Replicates of a batch of candidates run in a process pool, losses
+are memoized per candidate, and with a ResultCache single runs are reused
+across calibrations.
+
+Two searches are available:
+
+    abc         approximate Bayesian computation by rejection: candidates
+                drawn uniformly within the bounds, the closest fraction
+                kept as posterior samples
+    surrogate   a quadratic response surface fitted to the candidates
+                evaluated so far proposes each next batch, plus some
+                uniform draws to keep exploring
+
+    calibration = Calibration(
+        observed,
+        bounds={"gpfellow_trained_trainee": (0.01, 0.2),
+                "gpfellow_retirement_age": (55, 70),
+                "trainee_train_period": (3, 8)},
+    )
+    best, loss = calibration.surrogate(rounds=5)
+    posterior = calibration.abc(samples=300, accept=0.1)
+
+From the command line, with observed.csv holding a column per series and
+a row per year:
+
+    python -m workforce.calibration observed.csv \\
+        --bound gpfellow_trained_trainee 0.01 0.2 \\
+        --bound gpfellow_retirement_age 55 70 --method surrogate
+"""
+
+import argparse
+import itertools
+import multiprocessing
+
+import numpy
+import pandas
+
+from workforce.batch import SWEEP_PARAMETERS, run_seed, run_series
+from workforce.cache import ResultCache
+
+# Series compared with the observed ones by default
+OBSERVED_SERIES = ("GPFellows", "Trainees")
+
+
+def _simulate(task):
+    engine, parameters, seed, steps, cache = task
+    return run_series(engine, parameters, seed, steps, cache)
+
+
+class Calibration:
+    """
+    Memoized, pooled evaluation of candidate parameters against observed
+    series, with ABC rejection and surrogate-guided searches.
+    """
+
+    def __init__(
+        self,
+        observed,
+        bounds,
+        fixed=None,
+        replicates=10,
+        seed=0,
+        engine="agent",
+        processes=None,
+        cache=None,
+        names=OBSERVED_SERIES,
+    ):
+        """
+        Args:
+            observed: Series name to one value per year from year 0, as a
+                      dict of sequences or a DataFrame.
+            bounds: Parameter name to (low, high); integer parameters (see
+                    batch.SWEEP_PARAMETERS) are drawn as integers.
+            fixed: Values of the other model parameters.
+            replicates: Runs per candidate, all candidates sharing the same
+                        seeds.
+            seed: Base seed of the replicate seeds and of the searches.
+            engine: Key of workforce.model.ENGINES to run.
+            processes: Worker processes; defaults to the number of CPUs.
+            cache: Optional ResultCache to reuse and store single runs in.
+            names: Series compared with the observed ones.
+        """
+        self.names = list(names)
+        self.observed = numpy.array([numpy.asarray(observed[name], dtype=float) for name in self.names])
+        self.steps = self.observed.shape[1] - 1
+        self.bounds = dict(bounds)
+        self.fixed = dict(fixed or {})
+        self.seeds = [run_seed(seed, replicate) for replicate in range(replicates)]
+        self.engine = engine
+        self.processes = processes or multiprocessing.cpu_count()
+        self.cache = cache
+        self.rng = numpy.random.default_rng(seed)
+        # Candidate key to loss, for every candidate evaluated so far
+        self.losses = {}
+
+    def _key(self, candidate):
+        return tuple(candidate[name] for name in self.bounds)
+
+    def _candidate(self, values):
+        """
+        A candidate dict from one value per bounded parameter, with integer
+        parameters rounded.
+        """
+        candidate = {}
+        for name, value in zip(self.bounds, values):
+            if SWEEP_PARAMETERS.get(name) is int:
+                candidate[name] = int(round(value))
+            else:
+                candidate[name] = float(value)
+        return candidate
+
+    def sample(self, count):
+        """
+        Candidates drawn uniformly within the bounds.
+        """
+        draws = []
+        for name, (low, high) in self.bounds.items():
+            if SWEEP_PARAMETERS.get(name) is int:
+                draws.append(self.rng.integers(low, high + 1, size=count))
+            else:
+                draws.append(self.rng.uniform(low, high, size=count))
+        return [self._candidate(values) for values in zip(*draws)]
+
+    def loss(self, series):
+        """
+        Root mean square difference between the mean of the replicates'
+        series and the observed ones, over the observed years.
+        """
+        simulated = numpy.mean(
+            [[values[name][: self.steps + 1] for name in self.names] for values in series], axis=0
+        )
+        return float(numpy.sqrt(numpy.nanmean((simulated - self.observed) ** 2)))
+
+    def evaluate(self, candidates):
+        """
+        The loss of each candidate, running the replicates of the ones not
+        evaluated before in the process pool.
+        """
+        pending = []
+        for candidate in candidates:
+            key = self._key(candidate)
+            if key not in self.losses and key not in (self._key(c) for c in pending):
+                pending.append(candidate)
+        tasks = [
+            (self.engine, dict(self.fixed, **candidate), seed, self.steps, self.cache)
+            for candidate in pending
+            for seed in self.seeds
+        ]
+        if self.processes == 1:
+            results = [_simulate(task) for task in tasks]
+        elif tasks:
+            with multiprocessing.Pool(self.processes) as pool:
+                results = pool.map(_simulate, tasks, chunksize=len(self.seeds))
+        replicates = len(self.seeds)
+        for i, candidate in enumerate(pending):
+            self.losses[self._key(candidate)] = self.loss(results[i * replicates : (i + 1) * replicates])
+        return [self.losses[self._key(candidate)] for candidate in candidates]
+
+    def history(self):
+        """
+        DataFrame of every candidate evaluated and its loss, best first.
+        """
+        table = pandas.DataFrame(
+            [dict(zip(self.bounds, key), loss=loss) for key, loss in self.losses.items()]
+        )
+        return table.sort_values("loss", ignore_index=True)
+
+    def abc(self, samples=200, accept=0.1):
+        """
+        ABC rejection: evaluate samples uniform candidates and keep the
+        closest fraction accept of them.
+
+        Returns:
+            DataFrame of the accepted candidates and their losses, best
+            first; its loss column's maximum is the tolerance used.
+        """
+        candidates = self.sample(samples)
+        losses = self.evaluate(candidates)
+        table = pandas.DataFrame(candidates)
+        table["loss"] = losses
+        table = table.sort_values("loss", ignore_index=True)
+        return table.head(max(1, int(round(accept * samples))))
+
+    def _features(self, values):
+        # Quadratic terms of the parameters scaled to [0, 1]
+        low = numpy.array([low for low, high in self.bounds.values()], dtype=float)
+        high = numpy.array([high for low, high in self.bounds.values()], dtype=float)
+        scaled = (numpy.asarray(values, dtype=float) - low) / numpy.where(high > low, high - low, 1)
+        columns = [numpy.ones(len(scaled))] + list(scaled.T)
+        for i, j in itertools.combinations_with_replacement(range(scaled.shape[1]), 2):
+            columns.append(scaled[:, i] * scaled[:, j])
+        return numpy.column_stack(columns)
+
+    def surrogate(self, rounds=5, batch=None, explore=0.25, proposals=2000):
+        """
+        Surrogate-guided search: after an initial uniform design, each
+        round fits a quadratic surface to the losses so far and evaluates
+        the batch of unseen candidates it predicts best, with a fraction
+        explore of the batch drawn uniformly.
+
+        Args:
+            rounds: Rounds after the initial design.
+            batch: Candidates per round; defaults to the number of
+                   processes, at least the surface's number of terms.
+            explore: Fraction of each batch drawn uniformly.
+            proposals: Uniform candidates the surface ranks per round.
+
+        Returns:
+            (best candidate, its loss)
+        """
+        dimensions = len(self.bounds)
+        terms = 1 + dimensions + dimensions * (dimensions + 1) // 2
+        batch = batch or max(self.processes, terms)
+        self.evaluate(self.sample(max(2 * terms, batch)))
+        for i in range(rounds):
+            keys = list(self.losses)
+            fit, *rest = numpy.linalg.lstsq(
+                self._features(keys), numpy.array([self.losses[key] for key in keys]), rcond=None
+            )
+            candidates = self.sample(proposals)
+            predicted = self._features([self._key(c) for c in candidates]) @ fit
+            chosen = []
+            seen = set(self.losses)
+            exploit = batch - int(round(explore * batch))
+            for index in numpy.argsort(predicted):
+                key = self._key(candidates[index])
+                if key not in seen:
+                    seen.add(key)
+                    chosen.append(candidates[index])
+                if len(chosen) == exploit:
+                    break
+            chosen += self.sample(batch - len(chosen))
+            self.evaluate(chosen)
+        best = min(self.losses, key=self.losses.get)
+        return dict(zip(self.bounds, best)), self.losses[best]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Calibrate Patient-GPFellow parameters against observed headcounts."
+    )
+    parser.add_argument("observed", help="CSV with a column per series and a row per year")
+    parser.add_argument("--bound", nargs=3, action="append", required=True,
+                        metavar=("PARAMETER", "LOW", "HIGH"), help="Range of a parameter to tune")
+    parser.add_argument("--series", nargs="+", default=list(OBSERVED_SERIES))
+    parser.add_argument("--method", choices=("abc", "surrogate"), default="surrogate")
+    parser.add_argument("--samples", type=int, default=200, help="ABC candidates")
+    parser.add_argument("--accept", type=float, default=0.1, help="ABC fraction kept")
+    parser.add_argument("--rounds", type=int, default=5, help="Surrogate rounds")
+    parser.add_argument("--replicates", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", default="agent")
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--cache", metavar="DIR",
+                        help="Reuse and store runs in a result cache directory")
+    parser.add_argument("--output", default="calibration.csv")
+    args = parser.parse_args(argv)
+
+    bounds = {}
+    for name, low, high in args.bound:
+        if name not in SWEEP_PARAMETERS:
+            parser.error("Unknown parameter " + name)
+        bounds[name] = (SWEEP_PARAMETERS[name](low), SWEEP_PARAMETERS[name](high))
+    calibration = Calibration(
+        pandas.read_csv(args.observed),
+        bounds,
+        replicates=args.replicates,
+        seed=args.seed,
+        engine=args.engine,
+        processes=args.processes,
+        cache=ResultCache(args.cache) if args.cache else None,
+        names=args.series,
+    )
+    if args.method == "abc":
+        table = calibration.abc(args.samples, args.accept)
+        print("Accepted {0} candidates, loss up to {1:.3g}".format(len(table), table["loss"].max()))
+    else:
+        best, loss = calibration.surrogate(args.rounds)
+        table = calibration.history()
+        print("Best {0} with loss {1:.3g}".format(best, loss))
+    table.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
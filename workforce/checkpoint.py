@@ -0,0 +1,212 @@
+"""
+Checkpoints of a running PatientGPFellow model.
+
+A snapshot holds the model parameters, the scheduler counters, the
+next_id counter, the state of the random number generators (model.random
+and every stream of model.streams, including undrawn block values), the collected
+headcount series and every agent, breed by breed, as NumPy columns. It is
+pickled into one compact binary blob.
+
+Restoring a snapshot continues the run exactly where it left off, and can
+override parameters to fork policy variants from one warm state:
+
+    warm = PatientGPFellow(...)
+    warm.run_model(100)
+    state = warm.snapshot()
+    variants = [PatientGPFellow.restore(state, gpfellow_retirement_age=age)
+                for age in range(60, 71)]
+"""
+
+import pickle
+import zlib
+
+import numpy
+
+from workforce.agents import GPFellow, Patient, Trainee
+
+# Version of the snapshot layout, bumped when it changes
+FORMAT = 2
+
+BREEDS = {"GPFellow": GPFellow, "Trainee": Trainee, "Patient": Patient}
+
+# Model attributes that are saved and may be overridden on restore
+PARAMETERS = (
+    "height",
+    "width",
+    "initial_gpfellows",
+    "initial_trainees",
+    "initial_patients",
+    "patient_reproduce",
+    "gpfellow_trained_trainee",
+    "gpfellow_retirement_age",
+    "trainee_train_period",
+    "lazy_names",
+    "bulk_attendance",
+    "bulk_movement",
+    "bulk_births",
+    "event_schedule",
+    "array_schedule",
+)
+
+# Per-breed attributes saved on top of the PersonAgent ones
+BREED_ATTRIBUTES = {
+    "GPFellow": ("yearsOutTraining", "attendances"),
+    "Trainee": ("yearsInTraining",),
+    "Patient": ("attendance_count",),
+}
+
+
+def _agent_columns(breed, agents):
+    columns = {
+        "unique_id": numpy.array([a.unique_id for a in agents], dtype=numpy.int64),
+        "x": numpy.array([a.pos[0] for a in agents], dtype=numpy.int64),
+        "y": numpy.array([a.pos[1] for a in agents], dtype=numpy.int64),
+        "moore": numpy.array([a.moore for a in agents], dtype=bool),
+        "age": numpy.array([a.age for a in agents], dtype=numpy.int64),
+        "sex": numpy.array([a.sex_code for a in agents], dtype=numpy.int8),
+        # Unread lazy nicknames are saved as None and stay lazy
+        "nickname": [a._nickname for a in agents],
+    }
+    for name in BREED_ATTRIBUTES[breed]:
+        columns[name] = numpy.array([getattr(a, name) for a in agents], dtype=numpy.int64)
+    return columns
+
+
+def snapshot(model, compress=False):
+    """
+    Serialise a PatientGPFellow model to bytes.
+
+    Args:
+        model: The model to save. Its datacollector must be a mesa
+               DataCollector for the series to be saved.
+        compress: zlib-compress the snapshot; smaller but slower.
+    """
+    state = {
+        "format": FORMAT,
+        "parameters": {name: getattr(model, name) for name in PARAMETERS},
+        "steps": model.schedule.steps,
+        "time": model.schedule.time,
+        "current_id": model.current_id,
+        "running": model.running,
+        "random": model.random.getstate(),
+        "streams": model.streams.getstate(),
+        # Pending events of an EventActivationByBreed, or the step order
+        # of an ArrayActivationByBreed
+        "schedule": model.schedule.getstate() if hasattr(model.schedule, "getstate") else None,
+        "model_vars": getattr(model.datacollector, "model_vars", None),
+        "breeds": [
+            (breed.__name__, _agent_columns(breed.__name__, list(agents.values())))
+            for breed, agents in model.schedule.agents_by_breed.items()
+        ],
+        # Order of the fellows in each cell, which random.choice depends on
+        "gpfellow_cell_order": numpy.array(
+            [g.unique_id for cell in model.gpfellows_by_cell.values() for g in cell],
+            dtype=numpy.int64,
+        ),
+    }
+    data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+    return zlib.compress(data, 1) if compress else data
+
+
+def restore(data, model_class=None, **overrides):
+    """
+    Rebuild a model from a snapshot.
+
+    Args:
+        data: Bytes from snapshot(), compressed or not.
+        model_class: Class to build, PatientGPFellow by default.
+        overrides: Parameters to change from the saved ones, e.g.
+                   gpfellow_retirement_age for a policy variant.
+    """
+    if model_class is None:
+        from workforce.model import PatientGPFellow as model_class
+
+    if data[:1] == b"\x78":
+        data = zlib.decompress(data)
+    state = pickle.loads(data)
+    if state["format"] != FORMAT:
+        raise ValueError("Unsupported snapshot format %r" % state["format"])
+    unknown = set(overrides) - set(PARAMETERS)
+    if unknown:
+        raise TypeError("Unknown parameters: %s" % ", ".join(sorted(unknown)))
+
+    parameters = dict(state["parameters"], **overrides)
+    initial = {
+        name: parameters.pop(name)
+        for name in ("initial_gpfellows", "initial_trainees", "initial_patients")
+    }
+    model = model_class(
+        initial_gpfellows=0, initial_trainees=0, initial_patients=0, **parameters
+    )
+    for name, value in initial.items():
+        setattr(model, name, value)
+
+    # Agents added by an EventActivationByBreed start ageing from here
+    model.schedule.steps = state["steps"]
+    model.schedule.time = state["time"]
+
+    by_id = {}
+    grid = model.grid
+    # Breeds are stepped in the order they were first added
+    model.schedule.agents_by_breed.clear()
+    for breed_name, columns in state["breeds"]:
+        breed = BREEDS[breed_name]
+        names = ["unique_id", "moore", "age", "_nickname"] + list(BREED_ATTRIBUTES[breed_name])
+        rows = zip(
+            columns["unique_id"].tolist(),
+            columns["moore"].tolist(),
+            columns["age"].tolist(),
+            columns["nickname"],
+            *(columns[name].tolist() for name in BREED_ATTRIBUTES[breed_name])
+        )
+        sexes = columns["sex"].tolist()
+        keys = columns["x"] * model.height + columns["y"]
+        positions = [model.cell_positions[key] for key in keys.tolist()]
+        agents = model.schedule.agents_by_breed[breed]
+        # Set the saved attributes directly rather than re-running __init__,
+        # which would draw fresh training years
+        for row, sex, pos in zip(rows, sexes, positions):
+            agent = breed.__new__(breed)
+            agent.model = model
+            agent.pos = None
+            agent.sex_code = sex
+            for name, value in zip(names, row):
+                setattr(agent, name, value)
+            grid.place_agent(agent, pos)
+            model.schedule.add(agent)
+            by_id[agent.unique_id] = agent
+    for unique_id in state["gpfellow_cell_order"]:
+        gpfellow = by_id[int(unique_id)]
+        model.gpfellows_by_cell[gpfellow.pos].append(gpfellow)
+
+    # Keep the pending events unless overrides may have moved them, in
+    # which case the events drawn while adding the agents are used
+    if state.get("schedule") is not None and not overrides and hasattr(model.schedule, "setstate"):
+        model.schedule.setstate(state["schedule"])
+    model.current_id = state["current_id"]
+    model.running = state["running"]
+    if hasattr(model.datacollector, "model_vars"):
+        # Drop the collection made by the constructor
+        saved = state["model_vars"] or {}
+        model.datacollector.model_vars = {
+            name: list(saved.get(name, [])) for name in model.datacollector.model_vars
+        }
+    model.random.setstate(state["random"])
+    model.streams.setstate(state["streams"])
+    return model
+
+
+def save(model, path, compress=True):
+    """
+    Write a snapshot of the model to a file.
+    """
+    with open(path, "wb") as snapshot_file:
+        snapshot_file.write(snapshot(model, compress))
+
+
+def load(path, model_class=None, **overrides):
+    """
+    Restore a model from a file written by save().
+    """
+    with open(path, "rb") as snapshot_file:
+        return restore(snapshot_file.read(), model_class, **overrides)
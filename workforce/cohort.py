@@ -0,0 +1,188 @@
+"""
+Age-structured cohort version of the Patient-GPFellow model.
+
+Instead of individual agents the model holds headcounts by role, sex and
+age, and advances them a year at a time with binomial and multinomial draws.
+Memory and step cost depend on the number of age groups, not on the size of
+the population.
+"""
+
+import math
+
+import numpy
+from mesa import Model
+from mesa.datacollection import DataCollector
+
+from workforce.model import ENGINES, PatientGPFellow
+
+# Oldest age group tracked; anyone older is counted in the last group
+MAX_AGE = 120
+# Patients older than this die, as in Patient.step
+PATIENT_DEATH_AGE = 80
+
+
+def rounded_normal_pmf(mean, sd):
+    """
+    Probability of each age 0..MAX_AGE under round(normal(mean, sd)), the
+    distribution calcAge draws from. Mass outside the range is folded into
+    the end groups.
+    """
+    edges = numpy.arange(MAX_AGE + 2) - 0.5
+    cdf = numpy.array([0.5 * (1 + math.erf((e - mean) / (sd * math.sqrt(2)))) for e in edges])
+    cdf[0], cdf[-1] = 0.0, 1.0
+    return numpy.diff(cdf)
+
+
+# Distribution of round(random() * 5), calcYearsInTraining at start-up
+INITIAL_YEARS_IN_TRAINING = numpy.array([0.1, 0.2, 0.2, 0.2, 0.2, 0.1])
+
+
+class CohortPatientGPFellow(Model):
+    """
+    Patient-GPFellow Model over headcount matrices.
+
+    gpfellows and patients are (sex, age) arrays and trainees are
+    (sex, age, yearsInTraining) arrays, with sex indexed as in
+    person_properties.SEXES. Takes the same parameters and collects the same
+    DataCollector series as PatientGPFellow.
+    """
+
+    verbose = False  # Print-monitoring
+
+    description = PatientGPFellow.description
+
+    def __init__(
+        self,
+        height=20,
+        width=20,
+        initial_gpfellows=50,
+        initial_trainees=5,
+        initial_patients=0,
+        patient_reproduce=0.0,
+        gpfellow_trained_trainee=0.05,
+        gpfellow_retirement_age=65,
+        trainee_train_period=5,
+        seed=None,
+    ):
+        """
+        Create a new cohort Patient-GPFellow model.
+
+        Args:
+            Same as PatientGPFellow (height and width are kept for
+            compatibility but there is no grid), plus
+            seed: Seed for the model's NumPy generator.
+        """
+        super().__init__()
+        # Set parameters
+        self.height = height
+        self.width = width
+        self.initial_gpfellows = initial_gpfellows
+        self.initial_patients = initial_patients
+        self.initial_trainees = initial_trainees
+        self.patient_reproduce = patient_reproduce
+        self.gpfellow_trained_trainee = gpfellow_trained_trainee
+        self.gpfellow_retirement_age = gpfellow_retirement_age
+        self.trainee_train_period = trainee_train_period
+        self.steps = 0
+
+        self.rng = numpy.random.default_rng(seed)
+        self.trainee_age_pmf = rounded_normal_pmf(25, 2)
+        self.gpfellows = self._draw_cohort(initial_gpfellows, rounded_normal_pmf(45, 5))
+        self.patients = self._draw_cohort(initial_patients, rounded_normal_pmf(25, 2))
+        self.trainees = numpy.zeros((2, MAX_AGE + 1, trainee_train_period + 1), dtype=numpy.int64)
+        self._add_trainees(self._draw_cohort(initial_trainees, self.trainee_age_pmf))
+
+        self.datacollector = DataCollector(
+            {
+                "Patients": lambda m: int(m.patients.sum()),
+                "GPFellows": lambda m: int(m.gpfellows.sum()),
+                "Trainees": lambda m: int(m.trainees.sum()),
+            }
+        )
+        self.running = True
+        self.datacollector.collect(self)
+
+    def _draw_cohort(self, count, age_pmf):
+        """
+        Split count people into a (sex, age) matrix, sexes equally likely.
+        """
+        pmf = numpy.concatenate([age_pmf, age_pmf]) / 2
+        return self.rng.multinomial(count, pmf).reshape(2, MAX_AGE + 1)
+
+    def _add_trainees(self, cohort):
+        """
+        Add a (sex, age) matrix of new trainees, spread over years in
+        training as calcYearsInTraining would.
+        """
+        if self.steps > 0:
+            self.trainees[:, :, 0] += cohort
+            return
+        for (sex, age), count in numpy.ndenumerate(cohort):
+            if count:
+                years = self.rng.multinomial(count, INITIAL_YEARS_IN_TRAINING)
+                # Anyone already past the training period graduates next step
+                capped = numpy.zeros(self.trainee_train_period + 1, dtype=numpy.int64)
+                numpy.add.at(capped, numpy.minimum(numpy.arange(len(years)), self.trainee_train_period), years)
+                self.trainees[sex, age] += capped
+
+    @staticmethod
+    def _age(cohort):
+        """
+        Age a cohort by one year along axis 1, keeping the oldest group.
+        """
+        aged = numpy.zeros_like(cohort)
+        aged[:, 1:] = cohort[:, :-1]
+        aged[:, -1] += cohort[:, -1]
+        return aged
+
+    def step_gpfellows(self):
+        self.gpfellows = self._age(self.gpfellows)
+        # Exit the workforce
+        self.gpfellows[:, self.gpfellow_retirement_age + 1 :] = 0
+
+        # Start training new trainees
+        intake = self.rng.binomial(int(self.gpfellows.sum()), self.gpfellow_trained_trainee)
+        self._add_trainees(self._draw_cohort(intake, self.trainee_age_pmf))
+
+    def step_trainees(self):
+        aged = self._age(self.trainees)
+        # One more year in training, graduates collect in the last column
+        trainees = numpy.zeros_like(aged)
+        trainees[:, :, 1:] = aged[:, :, :-1]
+        trainees[:, :, -1] += aged[:, :, -1]
+        # Become gpfellows
+        self.gpfellows += trainees[:, :, self.trainee_train_period:].sum(axis=2)
+        trainees[:, :, self.trainee_train_period:] = 0
+        self.trainees = trainees
+
+    def step_patients(self):
+        self.patients = self._age(self.patients)
+        # Death or reproduction
+        self.patients[:, PATIENT_DEATH_AGE + 1 :] = 0
+        births = self.rng.binomial(int(self.patients.sum()), self.patient_reproduce)
+        boys = self.rng.binomial(births, 0.5)
+        self.patients[:, 0] += (births - boys, boys)
+
+    def step(self):
+        self.step_gpfellows()
+        self.step_trainees()
+        self.step_patients()
+        self.steps += 1
+        # collect data
+        self.datacollector.collect(self)
+        if self.verbose:
+            print(
+                [
+                    self.steps,
+                    int(self.patients.sum()),
+                    int(self.gpfellows.sum()),
+                    int(self.trainees.sum()),
+                ]
+            )
+
+    def run_model(self, step_count=200):
+        for i in range(step_count):
+            self.step()
+
+
+ENGINES["cohort"] = CohortPatientGPFellow
@@ -0,0 +1,309 @@
+"""
+A DataCollector that streams its rows to disk in typed column chunks.
+
+Mesa's DataCollector keeps every reported value in Python lists for the
+whole run. StreamingDataCollector buffers model- and agent-level rows as
+NumPy columns and, every ``chunk_rows`` rows, writes them out either as
+Arrow IPC record batches (when pyarrow is installed) or as an append-only
+store of ``.npy`` chunks. Results are read back memory-mapped with
+``read_table``. The model-level series, a few values per collection, are
+also kept in ``model_vars`` as by DataCollector; agent-level rows are only
+on disk.
+
+A new collector replaces any store already in its directory, so a model
+can be re-run or reset with the same path.
+
+Layout of a collector directory:
+
+    model.arrow, agents.arrow                    (pyarrow)
+    model/00000/000-<column>.npy, agents/00000/...   (NumPy fallback)
+"""
+
+import os
+import shutil
+
+import numpy
+
+
+def _pyarrow():
+    """
+    Import pyarrow on first use (it is slow to import), or return None if
+    it is not installed.
+    """
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError:  # optional dependency
+        return None
+    return pyarrow
+
+
+# Agent-level reporters collected by default: column name to agent attribute.
+# Attributes a breed does not have are recorded as missing.
+AGENT_REPORTERS = {
+    "Age": "age",
+    "Sex": "sex",
+    "Attendances": "attendance_count",
+    "YearsInTraining": "yearsInTraining",
+    "YearsOutTraining": "yearsOutTraining",
+}
+
+# Sampling uses a multiplicative hash of unique_id so the same agents are
+# followed from one collection to the next
+_HASH = 2654435761
+_HASH_SPACE = 2 ** 32
+
+
+def model_step(model):
+    """
+    The step number of any of the workforce engines.
+    """
+    if getattr(model, "schedule", None) is not None:
+        return model.schedule.steps
+    return model.steps
+
+
+def _report(reporter, obj, *args):
+    if isinstance(reporter, str):
+        return getattr(obj, reporter, None)
+    if isinstance(reporter, list):
+        return reporter[0](*reporter[1])
+    return reporter(obj, *args)
+
+
+def _to_column(values):
+    """
+    Convert a list of reported values to a typed NumPy column. Missing
+    (None) values become NaN in numeric columns and '' in text columns.
+    """
+    present = [v for v in values if v is not None]
+    if len(present) == len(values):
+        return numpy.asarray(values)
+    if present and isinstance(present[0], str):
+        return numpy.asarray(["" if v is None else v for v in values])
+    return numpy.asarray([numpy.nan if v is None else v for v in values], dtype=float)
+
+
+class _ColumnTable:
+    """
+    One table of the store: buffered column chunks and their writer.
+    """
+
+    def __init__(self, path, name, chunk_rows, use_arrow):
+        self.path = path
+        self.name = name
+        self.chunk_rows = chunk_rows
+        self.use_arrow = use_arrow
+        self.buffer = []
+        self.buffered_rows = 0
+        self.chunks_written = 0
+        self.writer = None
+        self.sink = None
+        # Start a fresh store over the one a previous run left here
+        shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+        if os.path.exists(os.path.join(path, name + ".arrow")):
+            os.remove(os.path.join(path, name + ".arrow"))
+
+    def append(self, columns):
+        rows = len(next(iter(columns.values())))
+        if rows == 0:
+            return
+        self.buffer.append(columns)
+        self.buffered_rows += rows
+        if self.buffered_rows >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        names = list(self.buffer[0])
+        chunk = {
+            name: numpy.concatenate([columns[name] for columns in self.buffer])
+            for name in names
+        }
+        self.buffer = []
+        self.buffered_rows = 0
+        if self.use_arrow:
+            pyarrow = _pyarrow()
+            batch = pyarrow.record_batch(list(chunk.values()), names=names)
+            if self.writer is None:
+                self.sink = pyarrow.OSFile(os.path.join(self.path, self.name + ".arrow"), "wb")
+                self.writer = pyarrow.ipc.new_stream(self.sink, batch.schema)
+            self.writer.write_batch(batch)
+            self.sink.flush()
+        else:
+            directory = os.path.join(self.path, self.name, "%05d" % self.chunks_written)
+            os.makedirs(directory, exist_ok=True)
+            # Prefix file names with the column's position to keep the order
+            for i, (name, column) in enumerate(chunk.items()):
+                numpy.save(os.path.join(directory, "%03d-%s.npy" % (i, name)), column)
+        self.chunks_written += 1
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.sink.close()
+            self.writer = None
+
+
+class StreamingDataCollector:
+    """
+    Collects model and agent reporters like mesa's DataCollector, but keeps
+    only the current chunk of agent rows in memory.
+    """
+
+    def __init__(
+        self,
+        model_reporters=None,
+        agent_reporters=None,
+        path="collector",
+        chunk_rows=65536,
+        every=1,
+        agent_sample=1.0,
+        use_arrow=None,
+    ):
+        """
+        Args:
+            model_reporters: Column name to reporter, as in DataCollector
+                             (lambda of the model, attribute name, or
+                             [function, args] list).
+            agent_reporters: Column name to agent attribute name or lambda
+                             of the agent.
+            path: Directory to write the store to; created if needed, and
+                  any store already there is replaced.
+            chunk_rows: Rows to buffer per table before writing a chunk.
+            every: Only collect on steps that are a multiple of this.
+            agent_sample: Fraction of agents to record at each collection,
+                          the same agents every time.
+            use_arrow: Write Arrow IPC; defaults to whether pyarrow is
+                       installed.
+        """
+        self.model_reporters = dict(model_reporters or {})
+        self.agent_reporters = dict(agent_reporters or {})
+        self.path = path
+        self.every = every
+        self.agent_sample = agent_sample
+        if use_arrow is None:
+            use_arrow = _pyarrow() is not None
+        elif use_arrow and _pyarrow() is None:
+            raise ImportError("use_arrow requires pyarrow")
+        self.use_arrow = use_arrow
+
+        os.makedirs(path, exist_ok=True)
+        self.tables = {
+            name: _ColumnTable(path, name, chunk_rows, use_arrow)
+            for name in ("model", "agents")
+        }
+        # Every collected model value, as DataCollector.model_vars, for
+        # ChartModule, checkpoints and the batch runners
+        self.model_vars = {name: [] for name in self.model_reporters}
+
+    def _sampled(self, agents):
+        if self.agent_sample >= 1:
+            return agents
+        limit = self.agent_sample * _HASH_SPACE
+        return [a for a in agents if (a.unique_id * _HASH) % _HASH_SPACE < limit]
+
+    def collect(self, model):
+        """
+        Record the reporters for the model's current step, if it is due.
+        """
+        step = model_step(model)
+        if step % self.every:
+            return
+
+        if self.model_reporters:
+            columns = {"Step": numpy.array([step])}
+            for name, reporter in self.model_reporters.items():
+                value = _report(reporter, model)
+                columns[name] = _to_column([value])
+                self.model_vars[name].append(value)
+            self.tables["model"].append(columns)
+
+        if self.agent_reporters:
+            agents = self._sampled(model.schedule.agents)
+            columns = {
+                "Step": numpy.full(len(agents), step),
+                "AgentID": numpy.array([a.unique_id for a in agents], dtype=numpy.int64),
+                "Breed": numpy.array([type(a).__name__ for a in agents]),
+            }
+            for name, reporter in self.agent_reporters.items():
+                column = _to_column([_report(reporter, a) for a in agents])
+                # Breeds come and go, so keep numeric agent columns as
+                # floats to give every chunk the same type
+                if column.dtype.kind in "biu":
+                    column = column.astype(float)
+                columns[name] = column
+            self.tables["agents"].append(columns)
+
+    def flush(self):
+        """
+        Write any buffered rows to disk.
+        """
+        for table in self.tables.values():
+            table.flush()
+
+    def close(self):
+        """
+        Write buffered rows and close the Arrow writers.
+        """
+        for table in self.tables.values():
+            table.close()
+
+    def get_model_vars_dataframe(self):
+        self.flush()
+        return read_dataframe(self.path, "model").set_index("Step")
+
+    def get_agent_vars_dataframe(self):
+        self.flush()
+        return read_dataframe(self.path, "agents").set_index(["Step", "AgentID"])
+
+
+def read_chunks(path, table="agents"):
+    """
+    Yield the chunks of a table as dicts of memory-mapped columns.
+    """
+    arrow_path = os.path.join(path, table + ".arrow")
+    if os.path.exists(arrow_path):
+        pyarrow = _pyarrow()
+        if pyarrow is None:
+            raise ImportError("reading %s requires pyarrow" % arrow_path)
+        with pyarrow.memory_map(arrow_path) as source:
+            for batch in pyarrow.ipc.open_stream(source):
+                yield {
+                    name: column.to_numpy(zero_copy_only=False)
+                    for name, column in zip(batch.schema.names, batch.columns)
+                }
+        return
+    directory = os.path.join(path, table)
+    if not os.path.isdir(directory):
+        return
+    for chunk in sorted(os.listdir(directory)):
+        chunk_dir = os.path.join(directory, chunk)
+        yield {
+            name[len("000-") : -len(".npy")]: numpy.load(os.path.join(chunk_dir, name), mmap_mode="r")
+            for name in sorted(os.listdir(chunk_dir))
+        }
+
+
+def read_table(path, table="agents"):
+    """
+    Return a table as a dict of columns. A table written as a single chunk
+    stays memory-mapped; several chunks are concatenated.
+    """
+    chunks = list(read_chunks(path, table))
+    if not chunks:
+        return {}
+    if len(chunks) == 1:
+        return chunks[0]
+    return {name: numpy.concatenate([c[name] for c in chunks]) for name in chunks[0]}
+
+
+def read_dataframe(path, table="agents"):
+    """
+    Return a table as a pandas DataFrame.
+    """
+    import pandas
+
+    return pandas.DataFrame(read_table(path, table))
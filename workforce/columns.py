@@ -0,0 +1,80 @@
+"""
+Struct-of-arrays storage for the agents of one breed.
+"""
+
+import numpy
+
+
+class AgentColumns:
+    """
+    A set of equal length NumPy columns holding one row per agent.
+
+    Rows are appended in batches and removed by boolean masks, so a whole
+    breed can be aged, retired or promoted without touching Python objects.
+    """
+
+    def __init__(self, dtypes, capacity=64):
+        """
+        dtypes: Mapping of column name to NumPy dtype.
+        capacity: Number of rows to allocate up front.
+        """
+        self.dtypes = dict(dtypes)
+        self.size = 0
+        self._data = {
+            name: numpy.zeros(capacity, dtype=dtype)
+            for name, dtype in self.dtypes.items()
+        }
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, name):
+        """
+        Return a writable view of the live rows of a column.
+        """
+        return self._data[name][: self.size]
+
+    def __setitem__(self, name, values):
+        self._data[name][: self.size] = values
+
+    def _reserve(self, size):
+        capacity = len(next(iter(self._data.values())))
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity)
+        for name, column in self._data.items():
+            grown = numpy.zeros(capacity, dtype=column.dtype)
+            grown[: self.size] = column[: self.size]
+            self._data[name] = grown
+
+    def append(self, **columns):
+        """
+        Append a batch of rows. Every column must be given, either as an
+        array of the batch length or as a scalar broadcast to all rows;
+        the batch length is that of the array columns.
+        """
+        count = max(
+            (numpy.size(values) for values in columns.values() if numpy.ndim(values)),
+            default=0,
+        )
+        if count == 0:
+            return
+        self._reserve(self.size + count)
+        for name in self.dtypes:
+            self._data[name][self.size : self.size + count] = columns[name]
+        self.size += count
+
+    def keep(self, mask):
+        """
+        Drop every row where mask is False, preserving the order of the rest.
+        """
+        kept = int(numpy.count_nonzero(mask))
+        for name, column in self._data.items():
+            column[:kept] = column[: self.size][mask]
+        self.size = kept
+
+    def take(self, mask):
+        """
+        Return a copy of the rows where mask is True as a dict of columns.
+        """
+        return {name: self[name][mask].copy() for name in self.dtypes}
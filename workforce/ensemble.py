@@ -0,0 +1,313 @@
+"""
+Streaming statistics of the Patient-GPFellow model over Monte Carlo replicates.
+
+run_ensemble runs one scenario with many seeds and folds each replicate's
+DataCollector series into running accumulators as it finishes, so memory
+does not grow with the number of replicates:
+
+    RunningMoments   Welford mean and variance of every series and year
+    P2Quantile       P-square streaming estimate of one quantile (Jain and
+                     Chlamtac, 1985), five markers per series and year
+
+Replicates are folded in seed order whatever the number of processes, so an
+ensemble is reproduced by its seed. With a tolerance, the run stops once
+the confidence interval of every mean is narrower than plus or minus the
+tolerance:
+
+    ensemble = run_ensemble({"gpfellow_retirement_age": 60}, replicates=500,
+                            tolerance=0.5)
+    ensemble.bands()    # mean, sd, half width and quantiles per year
+
+From the command line:
+
+    python -m workforce.ensemble --gpfellow-retirement-age 60 \\
+        --replicates 500 --tolerance 0.5 --output bands.csv
+"""
+
+import argparse
+import multiprocessing
+from statistics import NormalDist
+
+import numpy
+import pandas
+
+from workforce.batch import SWEEP_PARAMETERS, run_seed, run_series
+
+QUANTILES = (0.05, 0.5, 0.95)
+
+
+class RunningMoments:
+    """
+    Welford's running mean and variance of equally shaped arrays.
+    """
+
+    def __init__(self, shape):
+        self.count = 0
+        self.mean = numpy.zeros(shape)
+        self._m2 = numpy.zeros(shape)
+
+    def add(self, values):
+        self.count += 1
+        delta = values - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (values - self.mean)
+
+    @property
+    def variance(self):
+        """
+        Sample variance, nan below two values.
+        """
+        if self.count < 2:
+            return numpy.full(self.mean.shape, numpy.nan)
+        return self._m2 / (self.count - 1)
+
+    @property
+    def sem(self):
+        return numpy.sqrt(self.variance / self.count)
+
+
+class P2Quantile:
+    """
+    P-square estimate of the p quantile of equally shaped arrays, updated
+    element-wise with five markers per element.
+    """
+
+    def __init__(self, p, shape):
+        self.p = p
+        self.count = 0
+        shape = tuple(shape)
+        column = (5,) + (1,) * len(shape)
+        # Marker heights, actual positions and desired positions
+        self.heights = numpy.zeros((5,) + shape)
+        self.positions = numpy.arange(1.0, 6.0).reshape(column) + self.heights
+        self.desired = numpy.array([1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]).reshape(column) + self.heights
+        self.increments = numpy.array([0, p / 2, p, (1 + p) / 2, 1]).reshape(column)
+
+    def add(self, values):
+        if self.count < 5:
+            self.heights[self.count] = values
+            self.count += 1
+            if self.count == 5:
+                self.heights.sort(axis=0)
+            return
+        self.count += 1
+        q, n = self.heights, self.positions
+        # Extend the extreme markers and find the cell each value falls in
+        q[0] = numpy.minimum(q[0], values)
+        q[4] = numpy.maximum(q[4], values)
+        cell = numpy.clip((values[numpy.newaxis] >= q[1:4]).sum(axis=0), 0, 3)
+        n += numpy.arange(5).reshape((5,) + (1,) * values.ndim) > cell
+        self.desired += self.increments
+
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            move = ((d >= 1) & (n[i + 1] - n[i] > 1)) | ((d <= -1) & (n[i - 1] - n[i] < -1))
+            if not move.any():
+                continue
+            d = numpy.sign(d)
+            # Piecewise-parabolic prediction, falling back to linear when it
+            # would leave the neighbouring markers' range
+            parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+            )
+            neighbour = numpy.where(d > 0, q[i + 1], q[i - 1])
+            neighbour_position = numpy.where(d > 0, n[i + 1], n[i - 1])
+            linear = q[i] + d * (neighbour - q[i]) / (neighbour_position - n[i])
+            inside = (q[i - 1] < parabolic) & (parabolic < q[i + 1])
+            q[i] = numpy.where(move, numpy.where(inside, parabolic, linear), q[i])
+            n[i] = numpy.where(move, n[i] + d, n[i])
+
+    @property
+    def value(self):
+        if self.count < 5:
+            if self.count == 0:
+                return numpy.full(self.heights.shape[1:], numpy.nan)
+            return numpy.quantile(self.heights[: self.count], self.p, axis=0)
+        return self.heights[2].copy()
+
+
+class EnsembleStatistics:
+    """
+    Running mean, variance and quantiles of named series over replicates.
+    """
+
+    def __init__(self, names, steps, quantiles=QUANTILES):
+        """
+        Args:
+            names: Series names, e.g. the DataCollector's model reporters.
+            steps: Years per replicate; series have steps + 1 values.
+            quantiles: Quantiles to estimate, each in (0, 1).
+        """
+        self.names = list(names)
+        shape = (len(self.names), steps + 1)
+        self.moments = RunningMoments(shape)
+        self.quantiles = {p: P2Quantile(p, shape) for p in quantiles}
+
+    @property
+    def count(self):
+        return self.moments.count
+
+    def add(self, series):
+        """
+        Fold in one replicate's series, name to steps + 1 values.
+        """
+        values = numpy.array([series[name] for name in self.names], dtype=float)
+        self.moments.add(values)
+        for quantile in self.quantiles.values():
+            quantile.add(values)
+
+    def half_width(self, confidence=0.95):
+        """
+        Half width of the normal confidence interval of every mean.
+        """
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        return z * self.moments.sem
+
+    def converged(self, tolerance, confidence=0.95):
+        """
+        Whether every mean is known to within plus or minus tolerance.
+        """
+        if self.count < 2:
+            return False
+        return bool(numpy.all(self.half_width(confidence) <= tolerance))
+
+    def band_series(self, confidence=0.95):
+        """
+        Label to one value per year, with labels such as 'Patients mean',
+        'Patients sd', 'Patients ci' (the half width) and 'Patients 5%'.
+        """
+        columns = {}
+        half_width = self.half_width(confidence)
+        standard_deviation = numpy.sqrt(self.moments.variance)
+        for row, name in enumerate(self.names):
+            columns[name + " mean"] = self.moments.mean[row]
+            columns[name + " sd"] = standard_deviation[row]
+            columns[name + " ci"] = half_width[row]
+            for p, quantile in self.quantiles.items():
+                columns["{0} {1:g}%".format(name, 100 * p)] = quantile.value[row]
+        return columns
+
+    def bands(self, confidence=0.95):
+        """
+        DataFrame of band_series indexed by Step.
+        """
+        table = pandas.DataFrame(self.band_series(confidence))
+        table.index.name = "Step"
+        return table
+
+
+def _run_replicate(task):
+    engine, parameters, seed, steps, cache = task
+    return run_series(engine, parameters, seed, steps, cache)
+
+
+def run_ensemble(
+    parameters,
+    replicates=100,
+    steps=50,
+    engine="agent",
+    seed=0,
+    processes=None,
+    tolerance=None,
+    confidence=0.95,
+    min_replicates=10,
+    quantiles=QUANTILES,
+    cache=None,
+):
+    """
+    Run one scenario for up to a number of replicates and fold their series
+    into EnsembleStatistics.
+
+    Args:
+        parameters: Model parameters of the scenario.
+        replicates: Most replicates to run.
+        steps: Years to simulate per replicate.
+        engine: Key of workforce.model.ENGINES to run.
+        seed: Base seed; replicate i runs with batch.run_seed(seed, i), as
+              in batch_run.
+        processes: Worker processes; defaults to the number of CPUs. With
+                   1 the replicates run in this process.
+        tolerance: If given, stop once every mean's confidence interval is
+                   within plus or minus this many heads.
+        confidence: Level of the confidence intervals.
+        min_replicates: Replicates to fold before stopping early.
+        quantiles: Quantiles to estimate.
+        cache: Optional ResultCache to reuse and store replicates in.
+
+    Returns:
+        EnsembleStatistics of the replicates run.
+    """
+    if replicates < 1:
+        raise ValueError("Need at least 1 replicate, not %d" % replicates)
+    tasks = (
+        (engine, parameters, run_seed(seed, replicate), steps, cache)
+        for replicate in range(replicates)
+    )
+    statistics = None
+
+    def fold(series):
+        nonlocal statistics
+        if statistics is None:
+            statistics = EnsembleStatistics(series, steps, quantiles)
+        statistics.add(series)
+        return (
+            tolerance is not None
+            and statistics.count >= min_replicates
+            and statistics.converged(tolerance, confidence)
+        )
+
+    processes = processes or multiprocessing.cpu_count()
+    if processes == 1:
+        for task in tasks:
+            if fold(_run_replicate(task)):
+                break
+    else:
+        # imap folds in seed order, so the result does not depend on the
+        # number of processes; leaving the pool stops the replicates still
+        # running
+        with multiprocessing.Pool(processes) as pool:
+            for series in pool.imap(_run_replicate, tasks):
+                if fold(series):
+                    break
+    return statistics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run replicates of one Patient-GPFellow scenario and write their bands."
+    )
+    for name, kind in SWEEP_PARAMETERS.items():
+        parser.add_argument("--" + name.replace("_", "-"), type=kind, help="Value of " + name)
+    parser.add_argument("--replicates", type=int, default=100)
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--engine", default="agent")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--tolerance", type=float,
+                        help="Stop once every mean is known to within this many heads")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--output", default="bands.csv")
+    args = parser.parse_args(argv)
+
+    parameters = {
+        name: getattr(args, name)
+        for name in SWEEP_PARAMETERS
+        if getattr(args, name) is not None
+    }
+    statistics = run_ensemble(
+        parameters,
+        replicates=args.replicates,
+        steps=args.steps,
+        engine=args.engine,
+        seed=args.seed,
+        processes=args.processes,
+        tolerance=args.tolerance,
+        confidence=args.confidence,
+    )
+    statistics.bands(args.confidence).to_csv(args.output)
+    print("Wrote bands of {0} replicates to {1}".format(statistics.count, args.output))
+
+
+if __name__ == "__main__":
+    main()
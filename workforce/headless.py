@@ -0,0 +1,90 @@
+"""
+Headless runner: no visualization, no log files, fast to start.
+
+Runs one scenario for a number of years and replicates in this process and
+writes the DataCollector series of every replicate to a CSV file. Only the
+model, agents and scheduler are imported; the server, the process pool and
+the optional backends are never loaded, which keeps start-up cheap for
+short-lived worker processes.
+
+    python -m workforce.headless --years 50 --replicates 10 \\
+        --gpfellow-retirement-age 67 --output results.csv
+"""
+
+import argparse
+import csv
+import sys
+
+from workforce.model import ENGINES
+from workforce.scenario import PARAMETERS, headcount_kwargs, run_seed
+
+
+def run(parameters, years=50, replicates=1, engine="agent", seed=0, output=sys.stdout):
+    """
+    Run a scenario and write its series as CSV rows.
+
+    Args:
+        parameters: Model parameters.
+        years: Steps to run each replicate for.
+        replicates: Number of runs, each with its own seed.
+        engine: Key of workforce.model.ENGINES.
+        seed: Base seed the replicate seeds are derived from.
+        output: Open text file to write to.
+
+    Returns:
+        Number of rows written.
+    """
+    writer = None
+    rows = 0
+    for replicate in range(replicates):
+        replicate_seed = run_seed(seed, replicate)
+        model = ENGINES[engine](seed=replicate_seed, **headcount_kwargs(engine, parameters))
+        for i in range(years):
+            model.step()
+
+        series = model.datacollector.model_vars
+        if writer is None:
+            writer = csv.writer(output)
+            writer.writerow(["replicate", "seed", "Step"] + list(series))
+        for step, values in enumerate(zip(*series.values())):
+            writer.writerow([replicate, replicate_seed, step] + list(values))
+            rows += 1
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run the Patient-GPFellow model without visualization."
+    )
+    for name, kind in PARAMETERS.items():
+        parser.add_argument("--" + name.replace("_", "-"), type=kind)
+    parser.add_argument("--years", type=int, default=50)
+    parser.add_argument("--replicates", type=int, default=1)
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="agent")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="CSV file to write (default: stdout)")
+    parser.add_argument("--population", metavar="TABLE",
+                        help="Age/sex/role table (CSV or .npy) to draw the initial agents from")
+    parser.add_argument("--population-cache", metavar="DIR",
+                        help="Cache drawn populations in this directory")
+    args = parser.parse_args(argv)
+
+    parameters = {
+        name: getattr(args, name)
+        for name in PARAMETERS
+        if getattr(args, name) is not None
+    }
+    if args.population is not None:
+        if args.engine != "agent":
+            parser.error("--population needs the agent engine")
+        parameters["population"] = args.population
+        parameters["population_cache"] = args.population_cache
+    if args.output is None:
+        run(parameters, args.years, args.replicates, args.engine, args.seed)
+    else:
+        with open(args.output, "w", newline="") as output:
+            run(parameters, args.years, args.replicates, args.engine, args.seed, output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Per-step profiling of the Patient-GPFellow model.
+
+When a model is created with ``instrument=True`` it holds an
+Instrumentation object that the scheduler, the model and the agents report
+into: time per breed, per hot-path section (movement, attendance, names,
+data collection) and event counts (births, deaths, retirements,
+promotions, trainee starts, attendances). At the end of every step these
+are closed into one record:
+
+    {"step": 3,
+     "agents": {"GPFellow": 52, "Trainee": 7, "Patient": 412},
+     "seconds": {"GPFellow": 0.0003, "Patient": 0.0071, "movement": 0.0040,
+                 "attendance": 0.0006, "collect": 0.0001, "step": 0.0082},
+     "events": {"births": 9, "attendances": 35, "trainee_starts": 2}}
+
+With instrumentation off the model's ``instrument`` attribute is None and
+each hot path only pays for an ``is not None`` check.
+"""
+
+import json
+import time
+from collections import defaultdict
+
+# Events reported by the agents and the model
+EVENTS = (
+    "births",
+    "deaths",
+    "retirements",
+    "promotions",
+    "trainee_starts",
+    "attendances",
+    "names",
+)
+
+clock = time.perf_counter
+
+
+class Instrumentation:
+    """
+    Accumulates timings and event counts and keeps one record per step.
+    """
+
+    def __init__(self):
+        self.records = []
+        self._reset()
+
+    def _reset(self):
+        self.seconds = defaultdict(float)
+        self.events = defaultdict(int)
+
+    def add_time(self, section, seconds):
+        """
+        Add seconds spent in a section of the current step.
+        """
+        self.seconds[section] += seconds
+
+    def count(self, event, n=1):
+        """
+        Count n occurrences of an event in the current step.
+        """
+        self.events[event] += n
+
+    def end_step(self, model):
+        """
+        Close the current step into a record and start the next one.
+        """
+        record = {
+            "step": model.schedule.steps,
+            "agents": {
+                breed.__name__: len(agents)
+                for breed, agents in model.schedule.agents_by_breed.items()
+            },
+            "seconds": dict(self.seconds),
+            "events": dict(self.events),
+        }
+        self.records.append(record)
+        self._reset()
+        return record
+
+    @property
+    def last(self):
+        """
+        The most recent step record, or None before the first step.
+        """
+        return self.records[-1] if self.records else None
+
+    def to_dataframe(self):
+        """
+        All records as a DataFrame indexed by step, with one column per
+        agent count ("agents.Patient"), section ("seconds.movement") and
+        event ("events.births").
+        """
+        import pandas
+
+        return pandas.json_normalize(self.records).set_index("step").fillna(0)
+
+    def export(self, path):
+        """
+        Write the records to a JSON lines file.
+        """
+        with open(path, "w") as export_file:
+            for record in self.records:
+                export_file.write(json.dumps(record) + "\n")
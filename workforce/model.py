@@ -2,31 +2,40 @@
 Patient-GPFellow workforce model
 """
 
+import itertools
+from collections import defaultdict
+
 from mesa import Model
 from mesa.space import MultiGrid
 from mesa.datacollection import DataCollector
 
 from workforce.agents import GPFellow, Patient, Trainee
-from workforce.schedule import RandomActivationByBreed
-from workforce.person_properties import calcAge, calcSex, calcName
+from workforce.collector import AGENT_REPORTERS, StreamingDataCollector
+from workforce.instrument import Instrumentation, clock
+from workforce.columns import AgentColumns
+from workforce.schedule import ArrayActivationByBreed, EventActivationByBreed, RandomActivationByBreed
+from workforce.streams import RandomStreams
+from workforce.namepool import get_pool
+from workforce.population import bootstrap
+from workforce.person_properties import SEXES, calcAge, calcSex, calcNameCode, calcAges, calcSexCodes
 
 import numpy
 import logging
-import names
 
-# Create a logger for debugging
+# Create a logger for debugging; workforce.configure_logging() sends it to
+# workforce.log
 logger = logging.getLogger('model')
 logger.setLevel(logging.DEBUG)
-# create file handler which logs even debug messages
-fh = logging.FileHandler('workforce.log')
-fh.setLevel(logging.DEBUG)
-# create formatter and add it to the handlers
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-fh.setFormatter(formatter)
-# add the handlers to the logger
-logger.addHandler(fh)
 logger.info('Running model.py')
 
+# Headcount series collected by the agent model
+MODEL_REPORTERS = {
+    "Patients": lambda m: m.schedule.get_breed_count(Patient),
+    "GPFellows": lambda m: m.schedule.get_breed_count(GPFellow),
+    "Trainees": lambda m: m.schedule.get_breed_count(Trainee),
+}
+
+
 class PatientGPFellow(Model):
     """
     Patient-GPFellow Model
@@ -61,6 +70,19 @@ class PatientGPFellow(Model):
         gpfellow_trained_trainee=0.05,
         gpfellow_retirement_age=65,
         trainee_train_period=5,
+        lazy_names=False,
+        bulk_attendance=False,
+        bulk_movement=False,
+        bulk_births=False,
+        event_schedule=False,
+        array_schedule=False,
+        population=None,
+        population_cache=None,
+        collector_path=None,
+        collect_every=1,
+        agent_sample=1.0,
+        instrument=False,
+        seed=None,
     ):
         """
         Create a new Patient-GPFellow model with the given parameters.
@@ -69,8 +91,41 @@ class PatientGPFellow(Model):
             initial_gpfellows: Number of gpfellow to start with
             initial_patients: Number of wolves to start with
             patient_reproduce: Probability of each patient reproducing each step
+            lazy_names: If True, agents' nicknames are only drawn when read
+            bulk_attendance: If True, patients attend gpfellows all at once
+                             at the end of each step instead of one by one
+            bulk_movement: If True, all patients walk at once at the start
+                           of each step instead of one by one
+            bulk_births: If True, the number of births and trainee starts
+                         in each step is one binomial draw per breed and
+                         the parents are sampled at once, instead of one
+                         draw per agent
+            event_schedule: If True, gpfellows and trainees are not stepped;
+                            their retirements, graduations and trainee
+                            starts are scheduled as events when they are
+                            added (see EventActivationByBreed)
+            array_schedule: If True (and event_schedule is False), step
+                            each breed from a dense list, with adds and
+                            removes made during a breed's pass applied at
+                            its end (see ArrayActivationByBreed)
+            population: PopulationTable, or the path of a CSV or .npy
+                        age/sex/role table, to draw the initial agents
+                        from in bulk instead of the default age profiles
+                        (see workforce.population)
+            population_cache: Directory to cache seeded populations drawn
+                              from population in, as memory-mapped files
+            collector_path: If given, stream model and agent level results
+                            to this directory with a StreamingDataCollector
+                            instead of keeping them in memory
+            collect_every: Steps between streamed collections
+            agent_sample: Fraction of agents in streamed agent results
+            instrument: If True, record per-step timings and event counts
+                        in self.instrument (see workforce.instrument)
+            seed: Seed of the model's random streams and of model.random
+                  (picked up by Model.__new__), which shuffles the schedule
         """
         super().__init__()
+        self.streams = RandomStreams(seed)
         # Set parameters
         self.height = height
         self.width = width
@@ -78,66 +133,405 @@ class PatientGPFellow(Model):
         self.initial_patients = initial_patients
         self.initial_trainees = initial_trainees
         self.patient_reproduce = patient_reproduce
+        self.gpfellow_trained_trainee = gpfellow_trained_trainee
         self.gpfellow_retirement_age = gpfellow_retirement_age
         self.trainee_train_period = trainee_train_period
+        self.lazy_names = lazy_names
+        self.bulk_attendance = bulk_attendance
+        self.bulk_movement = bulk_movement
+        self.bulk_births = bulk_births
+        self.event_schedule = event_schedule
+        self.array_schedule = array_schedule
+        self.population = population
+        self.instrument = Instrumentation() if instrument else None
 
-        self.schedule = RandomActivationByBreed(self)
-        self.grid = MultiGrid(self.height, self.width, torus=True)
-        self.datacollector = DataCollector(
-            {
-                "Patients": lambda m: m.schedule.get_breed_count(Patient),
-                "GPFellows": lambda m: m.schedule.get_breed_count(GPFellow),
-                "Trainees": lambda m: m.schedule.get_breed_count(Trainee),
-            }
-        )
+        if event_schedule:
+            self.schedule = EventActivationByBreed(self, (GPFellow, Trainee))
+        elif array_schedule:
+            self.schedule = ArrayActivationByBreed(self)
+        else:
+            self.schedule = RandomActivationByBreed(self)
+        self.grid = MultiGrid(self.width, self.height, torus=True)
+        # One shared (x, y) tuple per cell, indexed by x * height + y, so
+        # agents in the same cell share their pos instead of each holding
+        # a tuple of its own
+        self.cell_positions = [(x, y) for x in range(self.width) for y in range(self.height)]
+        # The gpfellows in each occupied cell, kept in step with the grid
+        self.gpfellows_by_cell = defaultdict(list)
+        if collector_path is None:
+            self.datacollector = DataCollector(MODEL_REPORTERS)
+        else:
+            self.datacollector = StreamingDataCollector(
+                MODEL_REPORTERS,
+                AGENT_REPORTERS,
+                collector_path,
+                every=collect_every,
+                agent_sample=agent_sample,
+            )
+
+        if population is not None:
+            bootstrap(self, population, seed, population_cache)
+        else:
+            demographics = self.streams.demographics
+            # Initialise by creating gpfellows:
+            for i in range(self.initial_gpfellows):
+                pos = self.random_cell()
+                age = calcAge(45, 5, demographics)
+                sex = calcSex(demographics)
+                nickname = self.new_nickname(sex)
+                gpfellow = GPFellow(self.next_id(), pos, self, True, age, sex, nickname)
+                self.place_gpfellow(gpfellow, pos)
+                self.schedule.add(gpfellow)
+
+            # Initialise by creating trainees:
+            for i in range(self.initial_trainees):
+                pos = self.random_cell()
+                age = calcAge(25, 2, demographics)
+                sex = calcSex(demographics)
+                nickname = self.new_nickname(sex)
+                trainee = Trainee(self.next_id(), pos, self, True, age, sex, nickname)
+                self.grid.place_agent(trainee, pos)
+                self.schedule.add(trainee)
 
-        # Initialise by creating gpfellows:
-        for i in range(self.initial_gpfellows):
-            x = self.random.randrange(self.width)
-            y = self.random.randrange(self.height)
-            age = calcAge(45,5)
-            sex = calcSex()
-            nickname = calcName(sex)
-            gpfellow = GPFellow(self.next_id(), (x, y), self, True, age, sex, nickname)
-            self.grid.place_agent(gpfellow, (x, y))
-            self.schedule.add(gpfellow)
-
-        # Initialise by creating trainees:
-        for i in range(self.initial_trainees):
-            x = self.random.randrange(self.width)
-            y = self.random.randrange(self.height)
-            age = calcAge(25, 2)
-            sex = calcSex()
-            nickname = calcName(sex)
-            trainee = Trainee(self.next_id(), (x, y), self, True, age, sex, nickname)
-            self.grid.place_agent(trainee, (x, y))
-            self.schedule.add(trainee)
-
-        # Initialise by creating patients:
-        for i in range(self.initial_patients):
-            x = self.random.randrange(self.width)
-            y = self.random.randrange(self.height)
-            age = calcAge(25, 2)
-            sex = calcSex()
-            nickname = calcName(sex)
-            patient = Patient(self.next_id(), (x, y), self, True, age, sex, nickname)
-            self.grid.place_agent(patient, (x, y))
-            self.schedule.add(patient)
+            # Initialise by creating patients:
+            for i in range(self.initial_patients):
+                pos = self.random_cell()
+                age = calcAge(25, 2, demographics)
+                sex = calcSex(demographics)
+                nickname = self.new_nickname(sex)
+                patient = Patient(self.next_id(), pos, self, True, age, sex, nickname)
+                self.grid.place_agent(patient, pos)
+                self.schedule.add(patient)
 
         self.running = True
         self.datacollector.collect(self)
+        if self.instrument is not None:
+            # Step 0 records the cost of building the population
+            self.instrument.end_step(self)
+
+    def random_cell(self):
+        """
+        A uniformly random cell for a new agent of the initial population.
+        """
+        movement = self.streams.movement
+        x = movement.integers(self.width)
+        return self.cell_positions[x * self.height + movement.integers(self.height)]
+
+    def snapshot(self, compress=False):
+        """
+        Serialise the full model state to bytes, see workforce.checkpoint.
+        """
+        from workforce.checkpoint import snapshot
+
+        return snapshot(self, compress)
+
+    @classmethod
+    def restore(cls, data, **overrides):
+        """
+        Rebuild a model from snapshot() bytes, optionally overriding
+        parameters such as gpfellow_retirement_age.
+        """
+        from workforce.checkpoint import restore
+
+        return restore(data, cls, **overrides)
+
+    def fork(self, **overrides):
+        """
+        Return an independent copy of this model from its current state.
+        """
+        return self.restore(self.snapshot(), **overrides)
+
+    def new_nickname(self, sex):
+        """
+        The nickname of a new agent, as a compact NamePool code, or None in
+        lazy-nickname mode.
+        """
+        if self.lazy_names:
+            return None
+        if self.instrument is None:
+            return calcNameCode(sex, self.streams.names)
+        start = clock()
+        nickname = calcNameCode(sex, self.streams.names)
+        self.instrument.add_time("names", clock() - start)
+        self.instrument.count("names")
+        return nickname
+
+    def new_nicknames(self, sex_codes):
+        """
+        The nicknames of new agents, as NamePool codes drawn in one batch,
+        or Nones in lazy-nickname mode.
+        """
+        if self.lazy_names:
+            return [None] * len(sex_codes)
+        if self.instrument is None:
+            return get_pool().draw_codes(sex_codes, self.streams.names).tolist()
+        start = clock()
+        nicknames = get_pool().draw_codes(sex_codes, self.streams.names).tolist()
+        self.instrument.add_time("names", clock() - start)
+        self.instrument.count("names", len(nicknames))
+        return nicknames
+
+    def allocate_ids(self, count):
+        """
+        Reserve a block of unique ids, as next_id() would one at a time.
+        """
+        ids = range(self.current_id + 1, self.current_id + 1 + count)
+        self.current_id += count
+        return ids
+
+    def create_agents(self, breed, positions, moores, ages, sex_codes):
+        """
+        Create new agents of one breed at once: their ids are allocated as
+        one block, they are appended to their grid cells in one pass and
+        added to the schedule in one pass.
+
+        Args:
+            breed: GPFellow, Trainee or Patient.
+            positions: (x, y) cell of each agent.
+            moores: moore flag of each agent.
+            ages: Age of each agent.
+            sex_codes: Index into SEXES of each agent's sex.
+
+        Returns:
+            The list of new agents.
+        """
+        sex_codes = numpy.asarray(sex_codes).tolist()
+        nicknames = self.new_nicknames(sex_codes)
+        cell_positions = self.cell_positions
+        agents = [
+            breed(unique_id, cell_positions[x * self.height + y], self, moore, age, SEXES[sex], nickname)
+            for unique_id, (x, y), moore, age, sex, nickname in zip(
+                self.allocate_ids(len(sex_codes)),
+                positions,
+                moores,
+                numpy.asarray(ages).tolist(),
+                sex_codes,
+                nicknames,
+            )
+        ]
+        cells = self.grid._grid
+        for agent in agents:
+            x, y = agent.pos
+            cells[x][y].append(agent)
+        if breed is GPFellow:
+            for agent in agents:
+                self.gpfellows_by_cell[agent.pos].append(agent)
+        # Rebuild the set of empty cells when it is next needed
+        self.grid._empties_built = False
+        self.schedule.add_agents(breed, agents)
+        return agents
+
+    def start_trainees(self):
+        """
+        Start this step's trainees at once: their number is one binomial
+        draw over the gpfellows that do not retire this step, who are then
+        sampled without replacement. Each trainee starts one random cell
+        away from their gpfellow.
+        """
+        gpfellows = [
+            gpfellow
+            for gpfellow in self.schedule.agents_by_breed[GPFellow].values()
+            if gpfellow.age < self.gpfellow_retirement_age
+        ]
+        intake = self.streams.intake.generator
+        count = int(intake.binomial(len(gpfellows), self.gpfellow_trained_trainee))
+        if not count:
+            return
+        gpfellows = [gpfellows[index] for index in intake.choice(len(gpfellows), count, replace=False).tolist()]
+        x, y = self._walk(
+            numpy.array([gpfellow.pos[0] for gpfellow in gpfellows]),
+            numpy.array([gpfellow.pos[1] for gpfellow in gpfellows]),
+            [gpfellow.moore for gpfellow in gpfellows],
+        )
+        demographics = self.streams.demographics
+        self.create_agents(
+            Trainee,
+            zip(x.tolist(), y.tolist()),
+            [gpfellow.moore for gpfellow in gpfellows],
+            calcAges(25, 2, count, demographics),
+            calcSexCodes(count, demographics),
+        )
+        if self.instrument is not None:
+            self.instrument.count("trainee_starts", count)
+
+    def reproduce_patients(self):
+        """
+        Add this step's babies at once: their number is one binomial draw
+        over the patients, who are then sampled without replacement as
+        parents. Each baby starts in its parent's cell.
+        """
+        patients = list(self.schedule.agents_by_breed[Patient].values())
+        births = self.streams.births.generator
+        count = int(births.binomial(len(patients), self.patient_reproduce))
+        if not count:
+            return
+        parents = [patients[index] for index in births.choice(len(patients), count, replace=False).tolist()]
+        self.create_agents(
+            Patient,
+            [parent.pos for parent in parents],
+            [parent.moore for parent in parents],
+            numpy.zeros(count, dtype=numpy.int64),
+            calcSexCodes(count, self.streams.demographics),
+        )
+        if self.instrument is not None:
+            self.instrument.count("births", count)
+
+    def place_gpfellow(self, gpfellow, pos):
+        """
+        Place a gpfellow on the grid and in the per-cell index.
+        """
+        self.grid.place_agent(gpfellow, pos)
+        self.gpfellows_by_cell[pos].append(gpfellow)
+
+    def remove_gpfellow(self, gpfellow):
+        """
+        Remove a gpfellow from the grid and the per-cell index.
+        """
+        gpfellows = self.gpfellows_by_cell[gpfellow.pos]
+        gpfellows.remove(gpfellow)
+        if not gpfellows:
+            del self.gpfellows_by_cell[gpfellow.pos]
+        self.grid.remove_agent(gpfellow)
+
+    def move_patients(self):
+        """
+        Move every patient one random cell, including staying put, at once.
+
+        Offsets are drawn as one array and wrapped on the torus, then the
+        patients are grouped by their new cell with a counting sort and the
+        grid's cell lists are rebuilt from the groups, so Patient.pos and
+        the MultiGrid stay in sync.
+        """
+        patients = list(self.schedule.agents_by_breed[Patient].values())
+        if not patients:
+            return
+        grid = self.grid
+        cells = grid._grid
+        xy = numpy.fromiter(
+            itertools.chain.from_iterable(p.pos for p in patients),
+            dtype=numpy.int64,
+            count=2 * len(patients),
+        )
+        x, y = xy[0::2], xy[1::2]
+        old_keys = numpy.unique(x * grid.height + y)
+        x, y = self._walk(x, y, [p.moore for p in patients])
+
+        # Take the patients out of the cells they were in
+        for key in old_keys.tolist():
+            cell = cells[key // grid.height][key % grid.height]
+            cell[:] = [agent for agent in cell if type(agent) is not Patient]
+
+        keys = x * grid.height + y
+        positions = self.cell_positions
+        for patient, key in zip(patients, keys.tolist()):
+            patient.pos = positions[key]
+
+        # Counting sort by new cell: sizes from bincount, order from a
+        # stable sort of the small integer keys
+        counts = numpy.bincount(keys, minlength=grid.num_cells)
+        order = numpy.argsort(keys, kind="stable")
+        patients = [patients[index] for index in order.tolist()]
+        start = 0
+        for key, count in zip(numpy.flatnonzero(counts).tolist(), counts[counts > 0].tolist()):
+            cells[key // grid.height][key % grid.height].extend(patients[start : start + count])
+            start += count
+        # Rebuild the set of empty cells when it is next needed
+        grid._empties_built = False
+
+    def _walk(self, x, y, moore):
+        """
+        Move every (x, y) one random cell, including staying put, on the
+        torus, in all 8 directions where moore is True and otherwise only
+        up, down, left and right.
+        """
+        uniforms = self.streams.movement.random(len(x))
+        step = MOORE_OFFSETS[(uniforms * len(MOORE_OFFSETS)).astype(numpy.int64)]
+        if not all(moore):
+            von_neumann = ~numpy.array(moore)
+            choice = (uniforms[von_neumann] * len(VON_NEUMANN_OFFSETS)).astype(numpy.int64)
+            step[von_neumann] = VON_NEUMANN_OFFSETS[choice]
+        return (x + step[:, 0]) % self.width, (y + step[:, 1]) % self.height
+
+    def attend_patients(self):
+        """
+        Attend every patient sharing a cell with a gpfellow, one cell at a time.
+
+        Each patient attends one of the gpfellows in its cell at random, and
+        the attendances are added to the gpfellows' workload.
+        """
+        patients = list(self.schedule.agents_by_breed[Patient].values())
+        if not patients or not self.gpfellows_by_cell:
+            return
+        stride = max(self.grid.width, self.grid.height)
+        keys = numpy.array([x * stride + y for x, y in (p.pos for p in patients)])
+        staffed = numpy.array([x * stride + y for x, y in self.gpfellows_by_cell])
+        attending = numpy.flatnonzero(numpy.isin(keys, staffed))
+        # Group the attending patients by cell
+        attending = attending[numpy.argsort(keys[attending], kind="stable")]
+        cells, starts, counts = numpy.unique(
+            keys[attending], return_index=True, return_counts=True
+        )
+        for cell, start, count in zip(cells, starts, counts):
+            gpfellows = self.gpfellows_by_cell[divmod(int(cell), stride)]
+            workload = numpy.bincount(
+                self.streams.attendance.integers(len(gpfellows), size=count),
+                minlength=len(gpfellows),
+            )
+            for gpfellow, attendances in zip(gpfellows, workload):
+                gpfellow.attendances += int(attendances)
+            for index in attending[start : start + count]:
+                patients[index].attendance_count += 1
+        if self.instrument is not None:
+            self.instrument.count("attendances", len(attending))
 
     def step(self):
-        self.schedule.step()
-        # collect data
-        self.datacollector.collect(self)
+        instrument = self.instrument
+        # Trainees are started before the schedule steps, so that like
+        # trainees started by stepped gpfellows they are stepped this step
+        start_trainees = self.bulk_births and not self.event_schedule
+        if instrument is None:
+            if self.bulk_movement:
+                self.move_patients()
+            if start_trainees:
+                self.start_trainees()
+            self.schedule.step()
+            if self.bulk_births:
+                self.reproduce_patients()
+            if self.bulk_attendance:
+                self.attend_patients()
+            # collect data
+            self.datacollector.collect(self)
+        else:
+            start = clock()
+            if self.bulk_movement:
+                self.move_patients()
+                instrument.add_time("movement", clock() - start)
+            if start_trainees:
+                intake_start = clock()
+                self.start_trainees()
+                instrument.add_time("intake", clock() - intake_start)
+            self.schedule.step()
+            if self.bulk_births:
+                births_start = clock()
+                self.reproduce_patients()
+                instrument.add_time("births", clock() - births_start)
+            if self.bulk_attendance:
+                attend_start = clock()
+                self.attend_patients()
+                instrument.add_time("attendance", clock() - attend_start)
+            # collect data
+            collect_start = clock()
+            self.datacollector.collect(self)
+            instrument.add_time("collect", clock() - collect_start)
+            instrument.add_time("step", clock() - start)
+            instrument.end_step(self)
         if self.verbose:
             print(
                 [
                     self.schedule.time,
                     self.schedule.get_breed_count(Patient),
                     self.schedule.get_breed_count(GPFellow),
-                    self.schedule.get_breed_count(Trainees),
+                    self.schedule.get_breed_count(Trainee),
                 ]
             )
 
@@ -146,13 +540,243 @@ class PatientGPFellow(Model):
         if self.verbose:
             print("Initial number patients: ", self.schedule.get_breed_count(Patient))
             print("Initial number gpfellows: ", self.schedule.get_breed_count(GPFellow))
-            print("Initial number trainees: ", self.schedule.get_breed_count(Trainees))
+            print("Initial number trainees: ", self.schedule.get_breed_count(Trainee))
 
         for i in range(step_count):
             self.step()
+        if isinstance(self.datacollector, StreamingDataCollector):
+            self.datacollector.close()
 
         if self.verbose:
             print("")
             print("Final number patients: ", self.schedule.get_breed_count(Patient))
             print("Final number gpfellows: ", self.schedule.get_breed_count(GPFellow))
-            print("Final number trainees: ", self.schedule.get_breed_count(Trainees))
+            print("Final number trainees: ", self.schedule.get_breed_count(Trainee))
+
+
+# Neighbourhood offsets (including the centre cell) used by the columnar walk
+MOORE_OFFSETS = numpy.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+VON_NEUMANN_OFFSETS = numpy.array([(0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)])
+
+# Columns kept for every breed by the columnar engine
+PERSON_COLUMNS = {
+    "unique_id": numpy.int64,
+    "age": numpy.int64,
+    "sex": numpy.int8,
+    "x": numpy.int64,
+    "y": numpy.int64,
+}
+
+
+class ColumnarPatientGPFellow(Model):
+    """
+    Patient-GPFellow Model with each breed held as NumPy columns.
+
+    Takes the same parameters and collects the same DataCollector series as
+    PatientGPFellow, but ages, retires, promotes and reproduces whole breeds
+    at once with vectorised masks instead of calling step() on each agent.
+    Agents have no names or Python objects, so there is nothing to draw on a
+    CanvasGrid; use it for headcount projections.
+    """
+
+    verbose = False  # Print-monitoring
+
+    description = PatientGPFellow.description
+
+    def __init__(
+        self,
+        height=20,
+        width=20,
+        initial_gpfellows=50,
+        initial_trainees=5,
+        initial_patients=0,
+        patient_reproduce=0.0,
+        gpfellow_trained_trainee=0.05,
+        gpfellow_retirement_age=65,
+        trainee_train_period=5,
+        moore=True,
+        seed=None,
+    ):
+        """
+        Create a new columnar Patient-GPFellow model.
+
+        Args:
+            Same as PatientGPFellow, plus
+            moore: If True patients walk in all 8 directions, otherwise only
+                   up, down, left and right.
+            seed: Seed of the model's random streams.
+        """
+        super().__init__()
+        # Set parameters
+        self.height = height
+        self.width = width
+        self.initial_gpfellows = initial_gpfellows
+        self.initial_patients = initial_patients
+        self.initial_trainees = initial_trainees
+        self.patient_reproduce = patient_reproduce
+        self.gpfellow_trained_trainee = gpfellow_trained_trainee
+        self.gpfellow_retirement_age = gpfellow_retirement_age
+        self.trainee_train_period = trainee_train_period
+        self.moore = moore
+        self.steps = 0
+
+        self.streams = RandomStreams(seed)
+        self.gpfellows = AgentColumns(
+            dict(PERSON_COLUMNS, yearsOutTraining=numpy.int64)
+        )
+        self.trainees = AgentColumns(
+            dict(PERSON_COLUMNS, yearsInTraining=numpy.int64)
+        )
+        self.patients = AgentColumns(
+            dict(PERSON_COLUMNS, attendance_count=numpy.int64)
+        )
+        self.datacollector = DataCollector(
+            {
+                "Patients": lambda m: len(m.patients),
+                "GPFellows": lambda m: len(m.gpfellows),
+                "Trainees": lambda m: len(m.trainees),
+            }
+        )
+
+        # Initialise the three breeds in one batch each
+        ages = calcAges(45, 5, self.initial_gpfellows, self.streams.demographics)
+        self.gpfellows.append(
+            yearsOutTraining=ages - 25,
+            **self._new_people(self.initial_gpfellows, ages, *self._random_cells(self.initial_gpfellows))
+        )
+        ages = calcAges(25, 2, self.initial_trainees, self.streams.demographics)
+        self.trainees.append(
+            yearsInTraining=self._initial_years_in_training(self.initial_trainees),
+            **self._new_people(self.initial_trainees, ages, *self._random_cells(self.initial_trainees))
+        )
+        ages = calcAges(25, 2, self.initial_patients, self.streams.demographics)
+        self.patients.append(
+            attendance_count=0,
+            **self._new_people(self.initial_patients, ages, *self._random_cells(self.initial_patients))
+        )
+
+        self.running = True
+        self.datacollector.collect(self)
+
+    def _allocate_ids(self, count):
+        """
+        Reserve a block of unique ids, as next_id() would one at a time.
+        """
+        ids = numpy.arange(self.current_id + 1, self.current_id + 1 + count)
+        self.current_id += count
+        return ids
+
+    def _random_cells(self, count):
+        movement = self.streams.movement
+        return movement.integers(self.width, size=count), movement.integers(self.height, size=count)
+
+    def _new_people(self, count, ages, x, y):
+        return dict(
+            unique_id=self._allocate_ids(count),
+            age=ages,
+            sex=calcSexCodes(count, self.streams.demographics),
+            x=x,
+            y=y,
+        )
+
+    def _initial_years_in_training(self, count):
+        # Mirrors calcYearsInTraining: only trainees created before the first
+        # step completes start part-way through their training
+        if self.steps > 0:
+            return numpy.zeros(count, dtype=numpy.int64)
+        return numpy.rint(self.streams.demographics.random(count) * 5).astype(numpy.int64)
+
+    def _walk(self, x, y):
+        """
+        Move every (x, y) one random cell, including staying put, on the torus.
+        """
+        offsets = MOORE_OFFSETS if self.moore else VON_NEUMANN_OFFSETS
+        choice = offsets[self.streams.movement.integers(len(offsets), size=len(x))]
+        return (x + choice[:, 0]) % self.width, (y + choice[:, 1]) % self.height
+
+    def step_gpfellows(self):
+        fellows = self.gpfellows
+        fellows["age"] += 1
+        fellows["yearsOutTraining"] += 1
+        # Exit the workforce
+        fellows.keep(fellows["age"] <= self.gpfellow_retirement_age)
+
+        # Start training new trainees next to their fellow
+        starts = self.streams.intake.random(len(fellows)) < self.gpfellow_trained_trainee
+        count = int(numpy.count_nonzero(starts))
+        if count:
+            x, y = self._walk(fellows["x"][starts], fellows["y"][starts])
+            self.trainees.append(
+                yearsInTraining=self._initial_years_in_training(count),
+                **self._new_people(count, calcAges(25, 2, count, self.streams.demographics), x, y)
+            )
+
+    def step_trainees(self):
+        trainees = self.trainees
+        trainees["age"] += 1
+        trainees["yearsInTraining"] += 1
+
+        # Become gpfellows, keeping age, sex and position
+        graduates = trainees["yearsInTraining"] >= self.trainee_train_period
+        count = int(numpy.count_nonzero(graduates))
+        if count:
+            fellows = trainees.take(graduates)
+            self.gpfellows.append(
+                unique_id=self._allocate_ids(count),
+                age=fellows["age"],
+                sex=fellows["sex"],
+                x=fellows["x"],
+                y=fellows["y"],
+                yearsOutTraining=fellows["age"] - 25,
+            )
+            trainees.keep(~graduates)
+
+    def step_patients(self):
+        patients = self.patients
+        patients["x"], patients["y"] = self._walk(patients["x"], patients["y"])
+        patients["age"] += 1
+
+        # Attend a gpfellow if one shares the cell
+        staffed = numpy.zeros((self.width, self.height), dtype=bool)
+        staffed[self.gpfellows["x"], self.gpfellows["y"]] = True
+        patients["attendance_count"] += staffed[patients["x"], patients["y"]]
+
+        # Death or reproduction
+        patients.keep(patients["age"] <= 80)
+        parents = self.streams.births.random(len(patients)) < self.patient_reproduce
+        count = int(numpy.count_nonzero(parents))
+        if count:
+            self.patients.append(
+                attendance_count=0,
+                **self._new_people(
+                    count,
+                    0,
+                    patients["x"][parents],
+                    patients["y"][parents],
+                )
+            )
+
+    def step(self):
+        self.step_gpfellows()
+        self.step_trainees()
+        self.step_patients()
+        self.steps += 1
+        # collect data
+        self.datacollector.collect(self)
+        if self.verbose:
+            print([self.steps, len(self.patients), len(self.gpfellows), len(self.trainees)])
+
+    def run_model(self, step_count=200):
+        for i in range(step_count):
+            self.step()
+
+
+# Engines selectable by name, all sharing PatientGPFellow's parameters
+ENGINES = {
+    "agent": PatientGPFellow,
+    "columnar": ColumnarPatientGPFellow,
+}
+
+# The cohort engine adds itself to ENGINES. It is imported last, as it takes
+# PatientGPFellow's description
+import workforce.cohort  # noqa: E402,F401
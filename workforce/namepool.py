@@ -0,0 +1,101 @@
+"""
+Name generation from the census distributions shipped with ``names``.
+
+``names.get_full_name`` re-opens and scans its distribution files on every
+call. The pool reads them once per process into compact arrays and then
+draws any number of names with a single ``searchsorted``.
+"""
+
+from functools import lru_cache
+
+import names
+import numpy
+
+# names samples a cumulative percentage in [0, 90) and picks the first entry
+# whose cumulative frequency exceeds it
+CUMULATIVE_LIMIT = 90
+
+
+def _load(filename):
+    """
+    Read a names distribution file into (names, cumulative) arrays.
+    """
+    nicknames = []
+    cumulative = []
+    with open(filename) as name_file:
+        for line in name_file:
+            fields = line.split()
+            if fields:
+                nicknames.append(fields[0].capitalize())
+                cumulative.append(float(fields[2]))
+    return numpy.array(nicknames, dtype=bytes), numpy.array(cumulative)
+
+
+class NamePool:
+    """
+    First and last name distributions held in memory.
+
+    First names are kept per sex code (0 female, 1 male, as in
+    person_properties.SEXES).
+    """
+
+    def __init__(self, files=names.FILES):
+        """
+        files: Mapping with 'first:female', 'first:male' and 'last' keys,
+               as in names.FILES.
+        """
+        self.first = (_load(files['first:female']), _load(files['first:male']))
+        self.last = _load(files['last'])
+
+    @staticmethod
+    def _sample(distribution, size, rng):
+        nicknames, cumulative = distribution
+        selected = rng.random(size) * CUMULATIVE_LIMIT
+        index = numpy.searchsorted(cumulative, selected, side='right')
+        return numpy.minimum(index, len(nicknames) - 1)
+
+    def draw_codes(self, sex_codes, rng=numpy.random):
+        """
+        Return an int64 array of name codes, one per sex code. A code packs
+        the first and last name indices and is turned into text by name().
+
+        Args:
+            sex_codes: Array-like of 0 (female) / 1 (male) codes.
+            rng: Generator (or numpy.random) to draw from.
+        """
+        sex_codes = numpy.asarray(sex_codes)
+        first = numpy.empty(len(sex_codes), dtype=numpy.int64)
+        for code, distribution in enumerate(self.first):
+            chosen = sex_codes == code
+            first[chosen] = self._sample(distribution, int(chosen.sum()), rng)
+        last = self._sample(self.last, len(sex_codes), rng)
+        return first * len(self.last[0]) + last
+
+    def name(self, sex_code, code):
+        """
+        The full name a code from draw_codes() stands for.
+        """
+        first, last = divmod(code, len(self.last[0]))
+        return '{0} {1}'.format(
+            self.first[sex_code][0][first].decode(), self.last[0][last].decode()
+        )
+
+    def draw(self, sex_codes, rng=numpy.random):
+        """
+        Return a list of full names, one per sex code.
+
+        Args:
+            sex_codes: Array-like of 0 (female) / 1 (male) codes.
+            rng: Generator (or numpy.random) to draw from.
+        """
+        sex_codes = numpy.asarray(sex_codes)
+        codes = self.draw_codes(sex_codes, rng)
+        return [self.name(sex, code) for sex, code in zip(sex_codes.tolist(), codes.tolist())]
+
+
+@lru_cache(maxsize=None)
+def get_pool():
+    """
+    Return the process-wide NamePool, loading it on first use.
+    """
+    return NamePool()
@@ -0,0 +1,333 @@
+"""
+Database persistence for the Patient-GPFellow model.
+
+Implements the tables in ``ddl.sql``: the initial population is read from
+PERSON_AGENT, GP_FELLOW, GP_TRAINEE and LOCATION, model parameters from
+SCENARIO.SCENARIO_PARAMETERS, and results are written to SCENARIO_RESULT
+and AGENT_RESULT.
+
+Any DB-API connection factory can back the ConnectionPool; SQLite is used
+as a local stand-in for the MySQL schema (see ``sqlite_pool`` and
+``create_sqlite_schema``). Results are queued by the step loop and written
+by a background thread in large executemany transactions, so stepping never
+waits on the database:
+
+    pool = sqlite_pool("workforce.db")
+    model = build_model(pool, scenario_id=1)
+    run_scenario(model, pool, scenario_id=1, steps=50)
+"""
+
+import contextlib
+import datetime
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+
+from workforce.agents import GPFellow, Patient, Trainee
+
+DDL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ddl.sql")
+
+# SCENARIO_PARAMETERS keys that are passed on to the model
+SCENARIO_PARAMETERS = (
+    "height",
+    "width",
+    "patient_reproduce",
+    "gpfellow_trained_trainee",
+    "gpfellow_retirement_age",
+    "trainee_train_period",
+)
+
+BREED_NAMES = {GPFellow: "GPFellow", Trainee: "Trainee", Patient: "Patient"}
+
+
+def sqlite_ddl(path=DDL_PATH):
+    """
+    Translate the MySQL ``ddl.sql`` into statements SQLite accepts.
+    """
+    with open(path) as ddl_file:
+        ddl = ddl_file.read()
+    ddl = ddl.replace("mortimer_workforce.", "")
+    # INTEGER PRIMARY KEY columns are SQLite's auto-incrementing row ids
+    ddl = re.sub(r"\bINT\(11\)", "INTEGER", ddl)
+    ddl = re.sub(r"\s+AUTO_INCREMENT\b(?!=)", "", ddl)
+    # Drop MySQL table options
+    ddl = re.sub(r"\)\s*(AUTO_INCREMENT=\d+\s*)?ENGINE=[^;]*;", ");", ddl)
+    return ddl
+
+
+def create_sqlite_schema(connection, path=DDL_PATH):
+    """
+    (Re)create every table of ``ddl.sql`` on an SQLite connection.
+    """
+    connection.executescript(sqlite_ddl(path))
+    connection.commit()
+
+
+class ConnectionPool:
+    """
+    A fixed-size pool of DB-API connections shared between threads.
+    """
+
+    def __init__(self, connect, size=4, placeholder="?"):
+        """
+        connect: Callable returning a new DB-API connection.
+        size: Number of connections to open.
+        placeholder: Parameter marker of the driver ('?' for sqlite3,
+                     '%s' for MySQL drivers).
+        """
+        self.placeholder = placeholder
+        self._connections = queue.LifoQueue()
+        for i in range(size):
+            self._connections.put(connect())
+
+    @contextlib.contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the duration of a with block, committing on
+        success and rolling back on error.
+        """
+        connection = self._connections.get()
+        try:
+            yield connection
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+        finally:
+            self._connections.put(connection)
+
+    def close(self):
+        while not self._connections.empty():
+            self._connections.get().close()
+
+
+def sqlite_pool(path, size=4):
+    """
+    A ConnectionPool of SQLite connections to one database file.
+    """
+    def connect():
+        connection = sqlite3.connect(path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    return ConnectionPool(connect, size, "?")
+
+
+def load_scenario(pool, scenario_id):
+    """
+    Return the model parameters stored in SCENARIO.SCENARIO_PARAMETERS.
+    """
+    sql = "SELECT SCENARIO_PARAMETERS FROM SCENARIO WHERE SCENARIO_ID = {0}".format(pool.placeholder)
+    with pool.connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute(sql, (scenario_id,))
+        row = cursor.fetchone()
+    if row is None:
+        raise KeyError("No scenario %r" % scenario_id)
+    parameters = json.loads(row[0] or "{}")
+    return {name: parameters[name] for name in SCENARIO_PARAMETERS if name in parameters}
+
+
+def location_cell(location_id, width, height):
+    """
+    Grid cell of a LOCATION_ID: locations are laid out row by row and wrap
+    around the torus.
+    """
+    index = (location_id or 1) - 1
+    return index % width, (index // width) % height
+
+
+def load_population(pool, model, year=None):
+    """
+    Add every PERSON_AGENT to an (empty) model.
+
+    People with a GP_FELLOW row become GPFellows, with a GP_TRAINEE row
+    Trainees, and everyone else Patients. Ages come from DATE_OF_BIRTH and
+    training years from YEAR_FELLOWED / YEAR_STARTED_TRAINING, counted to
+    the given year (this year by default).
+    """
+    if year is None:
+        year = datetime.date.today().year
+    sql = """
+        SELECT p.PERSON_AGENT_ID, p.DATE_OF_BIRTH, p.SEX, p.LOCATION_ID,
+            f.YEAR_FELLOWED, f.PERSON_AGENT_ID, t.YEAR_STARTED_TRAINING, t.PERSON_AGENT_ID
+        FROM PERSON_AGENT p
+        LEFT JOIN GP_FELLOW f ON f.PERSON_AGENT_ID = p.PERSON_AGENT_ID
+        LEFT JOIN GP_TRAINEE t ON t.PERSON_AGENT_ID = p.PERSON_AGENT_ID
+        ORDER BY p.PERSON_AGENT_ID
+    """
+    with pool.connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute(sql)
+        rows = cursor.fetchall()
+
+    for person_id, birth, sex, location_id, fellowed, fellow_id, started, trainee_id in rows:
+        age = year - int(str(birth)[:4])
+        pos = location_cell(location_id, model.grid.width, model.grid.height)
+        nickname = model.new_nickname(sex)
+        if fellow_id is not None:
+            agent = GPFellow(person_id, pos, model, True, age, sex, nickname)
+            if fellowed is not None:
+                agent.yearsOutTraining = year - fellowed
+            model.place_gpfellow(agent, pos)
+        elif trainee_id is not None:
+            agent = Trainee(person_id, pos, model, True, age, sex, nickname)
+            if started is not None:
+                agent.yearsInTraining = year - started
+            model.grid.place_agent(agent, pos)
+        else:
+            agent = Patient(person_id, pos, model, True, age, sex, nickname)
+            model.grid.place_agent(agent, pos)
+        model.schedule.add(agent)
+    # New agents get ids after the loaded ones
+    model.current_id = max([model.current_id] + [row[0] for row in rows])
+
+
+def build_model(pool, scenario_id, model_class=None, year=None, **parameters):
+    """
+    Create a model from a SCENARIO row and the stored population.
+
+    Args:
+        pool: ConnectionPool to read from.
+        scenario_id: SCENARIO_ID whose parameters to use.
+        model_class: PatientGPFellow by default.
+        year: Year the population's ages are counted to.
+        parameters: Extra model parameters, overriding the scenario's.
+    """
+    if model_class is None:
+        from workforce.model import PatientGPFellow as model_class
+
+    kwargs = dict(load_scenario(pool, scenario_id), **parameters)
+    model = model_class(initial_gpfellows=0, initial_trainees=0, initial_patients=0, **kwargs)
+    load_population(pool, model, year)
+    # Replace the empty start-up collection with the loaded headcounts
+    for values in model.datacollector.model_vars.values():
+        values.clear()
+    model.datacollector.collect(model)
+    return model
+
+
+class ResultWriter:
+    """
+    Writes per-step results from a background thread.
+
+    write_step() only snapshots the model's rows and queues them; the
+    writer thread batches queued rows into executemany calls of up to
+    batch_rows rows, one transaction per batch.
+    """
+
+    SCENARIO_SQL = "INSERT INTO SCENARIO_RESULT (SCENARIO_ID, STEP, PATIENTS, GP_FELLOWS, GP_TRAINEES) VALUES ({0})"
+    AGENT_SQL = (
+        "INSERT INTO AGENT_RESULT (SCENARIO_ID, STEP, AGENT_ID, AGENT_TYPE, AGE, SEX, "
+        "ATTENDANCES, YEARS_IN_TRAINING) VALUES ({0})"
+    )
+
+    def __init__(self, pool, scenario_id, agents=True, batch_rows=50000):
+        """
+        pool: ConnectionPool to write through.
+        scenario_id: SCENARIO_ID the results belong to.
+        agents: Also write AGENT_RESULT rows for every agent.
+        batch_rows: Most rows per executemany transaction.
+        """
+        self.pool = pool
+        self.scenario_id = scenario_id
+        self.agents = agents
+        self.batch_rows = batch_rows
+        self.rows_written = 0
+        self.error = None
+        self._sql = {
+            "scenario": self.SCENARIO_SQL.format(", ".join([pool.placeholder] * 5)),
+            "agent": self.AGENT_SQL.format(", ".join([pool.placeholder] * 8)),
+        }
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="ResultWriter", daemon=True)
+        self._thread.start()
+
+    def write_step(self, model):
+        """
+        Queue the model's current headcounts and agent states.
+        """
+        if self.error is not None:
+            raise self.error
+        step = model.schedule.steps
+        counts = model.schedule.get_breed_count
+        self._queue.put((
+            "scenario",
+            [(self.scenario_id, step, counts(Patient), counts(GPFellow), counts(Trainee))],
+        ))
+        if self.agents:
+            self._queue.put((
+                "agent",
+                [
+                    (
+                        self.scenario_id,
+                        step,
+                        agent.unique_id,
+                        BREED_NAMES[type(agent)],
+                        agent.age,
+                        agent.sex,
+                        getattr(agent, "attendance_count", None),
+                        getattr(agent, "yearsInTraining", None),
+                    )
+                    for agent in model.schedule.agents
+                ],
+            ))
+
+    def _run(self):
+        pending = {"scenario": [], "agent": []}
+        done = False
+        while not done:
+            item = self._queue.get()
+            # Take everything already queued before writing
+            while True:
+                if item is None:
+                    done = True
+                else:
+                    table, rows = item
+                    pending[table].extend(rows)
+                if done or sum(map(len, pending.values())) >= self.batch_rows:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                self._flush(pending)
+            except Exception as error:  # surfaced on the next write_step/close
+                self.error = error
+                return
+
+    def _flush(self, pending):
+        for table, rows in pending.items():
+            for start in range(0, len(rows), self.batch_rows):
+                batch = rows[start : start + self.batch_rows]
+                with self.pool.connection() as connection:
+                    connection.cursor().executemany(self._sql[table], batch)
+                self.rows_written += len(batch)
+            rows.clear()
+
+    def close(self):
+        """
+        Wait for every queued row to be written.
+        """
+        self._queue.put(None)
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+def run_scenario(model, pool, scenario_id, steps, agents=True):
+    """
+    Step a model, writing the start state and every step to the database.
+    """
+    writer = ResultWriter(pool, scenario_id, agents)
+    writer.write_step(model)
+    for i in range(steps):
+        model.step()
+        writer.write_step(model)
+    writer.close()
+    return writer.rows_written
@@ -2,17 +2,25 @@
 Generalized behavior for random walking, one grid cell at a time.
 """
 
-from mesa import Agent
+from workforce.namepool import get_pool
+from workforce.person_properties import SEXES
 
 
-class PersonAgent(Agent):
+class PersonAgent:
     """
     Class implementing Person methods in a generalized manner.
 
     Not indended to be used on its own, but to inherit its methods to multiple
     other agents.
+
+    Provides the interface of mesa's Agent (unique_id, model, pos, random,
+    step, advance) without subclassing it, so that agents can use
+    __slots__ and carry no per-agent __dict__. Sex is kept as a code into
+    SEXES and the nickname as a NamePool code, turned into text when read.
     """
 
+    __slots__ = ("unique_id", "model", "pos", "moore", "sex_code", "_nickname")
+
     grid = None
     x = None
     y = None
@@ -26,21 +34,62 @@ class PersonAgent(Agent):
                 Otherwise, only up, down, left, right.
         age: Persons age
         sex: Persons Sex
-        nickname: A random name
+        nickname: A name, a NamePool name code, or None to draw one the
+                  first time it is read (lazy-nickname mode)
         """
-        super().__init__(unique_id, model)
+        self.unique_id = unique_id
+        self.model = model
         self.pos = pos
         self.moore = moore
         self.age = age
         self.sex = sex
-        self.nickname = nickname
+        self._nickname = nickname
+
+    @property
+    def random(self):
+        return self.model.random
+
+    @property
+    def sex(self):
+        return SEXES[self.sex_code]
+
+    @sex.setter
+    def sex(self, sex):
+        self.sex_code = SEXES.index(sex)
+
+    @property
+    def nickname(self):
+        nickname = self._nickname
+        if nickname is None:
+            nickname = int(get_pool().draw_codes([self.sex_code], self.model.streams.names)[0])
+            self._nickname = nickname
+        if isinstance(nickname, str):
+            return nickname
+        return get_pool().name(self.sex_code, nickname)
+
+    @nickname.setter
+    def nickname(self, nickname):
+        self._nickname = nickname
+
+    def step(self):
+        pass
+
+    def advance(self):
+        pass
 
     def random_move(self):
         """
         Step one cell in any allowable direction.
         """
+        model = self.model
         # Pick the next cell from the adjacent cells.
-        next_moves = self.model.grid.get_neighborhood(self.pos, self.moore, True)
-        next_move = self.random.choice(next_moves)
-        # Now move:
-        self.model.grid.move_agent(self, next_move)
+        next_moves = model.grid.get_neighborhood(self.pos, self.moore, True)
+        streams = getattr(model, "streams", None)
+        if streams is None:
+            # A plain mesa model, such as test_person_agent.WalkerWorld,
+            # without the workforce model's streams and cell positions
+            model.grid.move_agent(self, self.random.choice(next_moves))
+            return
+        x, y = streams.movement.choice(next_moves)
+        # Now move, to the model's shared tuple for the cell:
+        model.grid.move_agent(self, model.cell_positions[x * model.height + y])
@@ -1,11 +1,27 @@
 # A function for generating a sex
 import numpy
-import names
-
-def calcAge(mean,mu):
-    return round(numpy.random.normal(mean, mu))
-def calcSex():
-    return 'M' if (round(numpy.random.random()) == 1) else 'F'
-def calcName(sex):
-    sexWord = 'male' if sex == 'M' else 'female'
-    return names.get_full_name(gender=sexWord)
\ No newline at end of file
+
+from workforce.namepool import get_pool
+
+# Sex codes used by the columnar engines: index 0 is 'F', index 1 is 'M'
+SEXES = ('F', 'M')
+
+# rng is numpy.random or anything with the same methods, such as a
+# stream of workforce.streams.RandomStreams
+def calcAge(mean,mu,rng=numpy.random):
+    return round(rng.normal(mean, mu))
+def calcSex(rng=numpy.random):
+    return 'M' if (round(rng.random()) == 1) else 'F'
+def calcName(sex, rng=numpy.random):
+    return get_pool().draw([SEXES.index(sex)], rng)[0]
+def calcNameCode(sex, rng=numpy.random):
+    return int(get_pool().draw_codes([SEXES.index(sex)], rng)[0])
+
+# Vectorised versions for drawing many agents at once
+def calcAges(mean, mu, size, rng=numpy.random):
+    return numpy.rint(rng.normal(mean, mu, size)).astype(numpy.int64)
+def calcSexCodes(size, rng=numpy.random):
+    return (rng.random(size) >= 0.5).astype(numpy.int8)
+def calcNames(sexes, rng=numpy.random):
+    codes = [SEXES.index(sex) for sex in sexes]
+    return get_pool().draw(codes, rng)
@@ -0,0 +1,264 @@
+"""
+Bootstrap of the initial population from an age/sex/role distribution.
+
+By default PatientGPFellow draws its starting agents from made-up normal
+age profiles, one agent at a time. A PopulationTable instead holds the
+real distribution, e.g. the registry pyramid, with the PERSON_AGENT
+columns of ddl.sql:
+
+    ROLE           GP_FELLOW, GP_TRAINEE or PATIENT (the person has a
+                   GP_FELLOW row, a GP_TRAINEE row or neither)
+    SEX            F or M
+    AGE            age in years, or DATE_OF_BIRTH to count it from
+    LOCATION_ID    optional; placed as persistence.location_cell does,
+                   otherwise people are spread uniformly over the grid
+    COUNT          optional number of people in the row (default 1), so
+                   both an aggregated table and a raw export work
+
+Any headcount is drawn from it with one weighted choice of rows per role,
+and the agents are bulk-loaded with model.create_agents:
+
+    model = PatientGPFellow(initial_gpfellows=5000, initial_patients=100000,
+                            population="registry.csv", seed=1)
+
+The draws come from a generator spawned from the model's seed next to its
+streams, so the population does not change the rest of the run. With a
+cache directory, a seeded population is saved as a .npy file and later
+runs with the same table, headcounts, grid and seed memory-map it instead
+of sampling again.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy
+
+from workforce.agents import GPFellow, Patient, Trainee
+from workforce.person_properties import SEXES
+from workforce.streams import STREAMS
+
+# Role of each breed in the ROLE column, in the order breeds are created
+ROLES = {"GP_FELLOW": GPFellow, "GP_TRAINEE": Trainee, "PATIENT": Patient}
+
+# Layout of a generated (and cached) population, one row per person
+PERSON_DTYPE = numpy.dtype(
+    [("role", numpy.int8), ("age", numpy.int16), ("sex", numpy.int8), ("x", numpy.int32), ("y", numpy.int32)]
+)
+
+
+class PopulationTable:
+    """
+    People per role, age, sex and (optionally) location.
+    """
+
+    def __init__(self, roles, ages, sexes, counts, locations=None):
+        """
+        Args:
+            roles: Index into ROLES of each row.
+            ages: Age in years of each row.
+            sexes: Index into SEXES of each row.
+            counts: Number of people (or relative weight) of each row.
+            locations: LOCATION_ID of each row, or None.
+        """
+        self.roles = numpy.asarray(roles, dtype=numpy.int8)
+        self.ages = numpy.asarray(ages, dtype=numpy.int16)
+        self.sexes = numpy.asarray(sexes, dtype=numpy.int8)
+        self.counts = numpy.asarray(counts, dtype=numpy.float64)
+        self.locations = None if locations is None else numpy.asarray(locations, dtype=numpy.int64)
+        if (self.counts < 0).any():
+            raise ValueError("Negative COUNT in population table")
+
+    @classmethod
+    def from_frame(cls, frame, year=None):
+        """
+        Build a table from a DataFrame with the columns described above.
+
+        Args:
+            frame: pandas DataFrame.
+            year: Year ages are counted to from DATE_OF_BIRTH (this year by
+                  default).
+        """
+        frame = frame.rename(columns=str.upper)
+        if "AGE" not in frame:
+            if year is None:
+                year = datetime.date.today().year
+            frame = frame.assign(AGE=year - frame["DATE_OF_BIRTH"].astype(str).str[:4].astype(int))
+        if "COUNT" not in frame:
+            frame = frame.assign(COUNT=1)
+        roles = frame["ROLE"].astype(str).str.upper()
+        unknown = set(roles) - set(ROLES)
+        if unknown:
+            raise ValueError("Unknown ROLE values: %s" % ", ".join(sorted(unknown)))
+        sexes = frame["SEX"].astype(str).str.upper()
+        unknown = set(sexes) - set(SEXES)
+        if unknown:
+            raise ValueError("Unknown SEX values: %s" % ", ".join(sorted(unknown)))
+        frame = frame.assign(
+            ROLE=roles.map(list(ROLES).index), SEX=sexes.map(SEXES.index)
+        )
+        # One row per distinct person type, in a fixed order, so raw exports
+        # stay small and the digest does not depend on the row order
+        keys = ["ROLE", "AGE", "SEX"] + (["LOCATION_ID"] if "LOCATION_ID" in frame else [])
+        frame = frame.groupby(keys, as_index=False)["COUNT"].sum()
+        return cls(
+            frame["ROLE"],
+            frame["AGE"],
+            frame["SEX"],
+            frame["COUNT"],
+            frame["LOCATION_ID"] if "LOCATION_ID" in frame else None,
+        )
+
+    @classmethod
+    def from_array(cls, array, year=None):
+        """
+        Build a table from a NumPy structured array with the columns
+        described above.
+        """
+        import pandas
+
+        return cls.from_frame(pandas.DataFrame.from_records(array), year)
+
+    @classmethod
+    def read_csv(cls, path, year=None):
+        """
+        Read a table from a CSV file with the columns described above.
+        """
+        import pandas
+
+        return cls.from_frame(pandas.read_csv(path), year)
+
+    @classmethod
+    def load(cls, path, year=None):
+        """
+        Read a table from a CSV file or a .npy file of a structured array.
+        """
+        if str(path).endswith(".npy"):
+            return cls.from_array(numpy.load(path), year)
+        return cls.read_csv(path, year)
+
+    def digest(self):
+        """
+        SHA-256 of the table's contents.
+        """
+        digest = hashlib.sha256()
+        for column in (self.roles, self.ages, self.sexes, self.counts, self.locations):
+            if column is not None:
+                digest.update(numpy.ascontiguousarray(column).tobytes())
+        return digest.hexdigest()
+
+    def __repr__(self):
+        # Stands for the contents in ResultCache keys
+        return "PopulationTable({0})".format(self.digest()[:16])
+
+    def sample(self, headcounts, width, height, rng):
+        """
+        Draw a population with one weighted choice of rows per role.
+
+        Args:
+            headcounts: Number of people per role, in ROLES order.
+            width, height: Grid the people are placed on.
+            rng: numpy Generator to draw from.
+
+        Returns:
+            Array of PERSON_DTYPE rows, grouped by role in ROLES order.
+        """
+        people = numpy.empty(sum(headcounts), dtype=PERSON_DTYPE)
+        start = 0
+        for role, headcount in enumerate(headcounts):
+            if not headcount:
+                continue
+            rows = numpy.flatnonzero(self.roles == role)
+            weights = self.counts[rows]
+            if not weights.sum():
+                raise ValueError("No {0} people in the population table".format(list(ROLES)[role]))
+            rows = rows[rng.choice(len(rows), size=headcount, p=weights / weights.sum())]
+            chosen = people[start : start + headcount]
+            chosen["role"] = role
+            chosen["age"] = self.ages[rows]
+            chosen["sex"] = self.sexes[rows]
+            if self.locations is None:
+                chosen["x"] = rng.integers(width, size=headcount)
+                chosen["y"] = rng.integers(height, size=headcount)
+            else:
+                # As persistence.location_cell
+                index = numpy.maximum(self.locations[rows], 1) - 1
+                chosen["x"] = index % width
+                chosen["y"] = (index // width) % height
+            start += headcount
+        return people
+
+
+def population_generator(model):
+    """
+    A Generator for the model's population, spawned from its seed after
+    (and independent of) its RandomStreams.
+    """
+    seed_sequence = numpy.random.SeedSequence(
+        model.streams.seed_sequence.entropy, spawn_key=(len(STREAMS),)
+    )
+    return numpy.random.default_rng(seed_sequence)
+
+
+def generate(model, table, headcounts, seed=None, cache=None):
+    """
+    The model's initial population, memory-mapped from the cache when it
+    has been generated before.
+
+    Args:
+        model: PatientGPFellow being initialised.
+        table: PopulationTable to draw from.
+        headcounts: Number of people per role, in ROLES order.
+        seed: The model's seed; unseeded populations are never cached.
+        cache: Optional directory of generated populations.
+    """
+    if cache is None or seed is None:
+        return table.sample(headcounts, model.width, model.height, population_generator(model))
+    text = json.dumps([table.digest(), list(headcounts), model.width, model.height, seed])
+    path = os.path.join(cache, "population-" + hashlib.sha256(text.encode()).hexdigest() + ".npy")
+    try:
+        return numpy.load(path, mmap_mode="r")
+    except FileNotFoundError:
+        pass
+    people = table.sample(headcounts, model.width, model.height, population_generator(model))
+    os.makedirs(cache, exist_ok=True)
+    # Write under a temporary name, so readers never map a partial file
+    descriptor, temporary = tempfile.mkstemp(dir=cache, suffix=".tmp")
+    with os.fdopen(descriptor, "wb") as output:
+        numpy.save(output, people)
+    os.replace(temporary, path)
+    return people
+
+
+def bootstrap(model, population, seed=None, cache=None):
+    """
+    Add the model's initial_gpfellows, initial_trainees and initial_patients
+    drawn from a population table, one create_agents call per breed.
+
+    Args:
+        model: PatientGPFellow being initialised.
+        population: PopulationTable, or a path for PopulationTable.load.
+        seed: The model's seed, for the cache.
+        cache: Optional directory of generated populations.
+    """
+    headcounts = (model.initial_gpfellows, model.initial_trainees, model.initial_patients)
+    if not any(headcounts):
+        return
+    if not isinstance(population, PopulationTable):
+        population = PopulationTable.load(population)
+    people = generate(model, population, headcounts, seed, cache)
+    start = 0
+    for breed, headcount in zip(ROLES.values(), headcounts):
+        if not headcount:
+            continue
+        chosen = people[start : start + headcount]
+        model.create_agents(
+            breed,
+            zip(chosen["x"].tolist(), chosen["y"].tolist()),
+            [True] * headcount,
+            chosen["age"],
+            chosen["sex"],
+        )
+        start += headcount
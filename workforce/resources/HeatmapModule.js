@@ -0,0 +1,106 @@
+// Per-cell heatmap of the workforce grid, drawn from the frames sent by
+// workforce.server.HeatmapGrid. A frame is {full, cells}, where cells is a
+// flat list of [key, gpfellows, trainees, patients, key, ...] and
+// key = x * grid_height + y. A full frame replaces every count, otherwise
+// only the listed cells changed. Clicking a cell fetches its agents from
+// /cell?x=..&y=.. and lists them under the grid; under a SessionServer
+// the request names the session, given in the model_params message.
+const HeatmapModule = function (
+  canvas_width,
+  canvas_height,
+  grid_width,
+  grid_height
+) {
+  const BREEDS = 3;
+  const METRICS = {
+    Patients: (counts, i) => counts[i + 2],
+    "GP Fellows": (counts, i) => counts[i],
+    Trainees: (counts, i) => counts[i + 1],
+    "Fellows per patient": (counts, i) =>
+      counts[i + 2] > 0 ? counts[i] / counts[i + 2] : 0,
+  };
+
+  const parent = document.createElement("div");
+  const select = document.createElement("select");
+  for (const name in METRICS) {
+    select.appendChild(new Option(name, name));
+  }
+  const canvas = document.createElement("canvas");
+  canvas.width = canvas_width;
+  canvas.height = canvas_height;
+  canvas.style.cursor = "pointer";
+  const detail = document.createElement("div");
+  parent.appendChild(select);
+  parent.appendChild(document.createElement("br"));
+  parent.appendChild(canvas);
+  parent.appendChild(detail);
+  document.getElementById("elements").appendChild(parent);
+
+  const context = canvas.getContext("2d");
+  const cellWidth = canvas_width / grid_width;
+  const cellHeight = canvas_height / grid_height;
+  let counts = new Int32Array(grid_width * grid_height * BREEDS);
+  let session = null;
+  ws.addEventListener("message", (message) => {
+    const msg = JSON.parse(message.data);
+    if (msg.type === "model_params" && msg.session) session = msg.session;
+  });
+
+  const draw = () => {
+    const metric = METRICS[select.value];
+    const values = new Float64Array(grid_width * grid_height);
+    let max = 0;
+    for (let key = 0; key < values.length; key++) {
+      values[key] = metric(counts, key * BREEDS);
+      max = Math.max(max, values[key]);
+    }
+    context.clearRect(0, 0, canvas_width, canvas_height);
+    for (let key = 0; key < values.length; key++) {
+      if (values[key] === 0) continue;
+      const x = Math.floor(key / grid_height);
+      // Row 0 is at the bottom, as on a CanvasGrid
+      const y = grid_height - (key % grid_height) - 1;
+      context.fillStyle = `rgba(170, 0, 0, ${values[key] / max})`;
+      context.fillRect(x * cellWidth, y * cellHeight, cellWidth, cellHeight);
+    }
+  };
+  select.onchange = draw;
+
+  canvas.onclick = (event) => {
+    const rect = canvas.getBoundingClientRect();
+    const x = Math.floor((event.clientX - rect.left) / cellWidth);
+    const y = grid_height - Math.floor((event.clientY - rect.top) / cellHeight) - 1;
+    const query = session ? `&session=${session}` : "";
+    fetch(`/cell?x=${x}&y=${y}${query}`)
+      .then((response) => response.json())
+      .then((cell) => {
+        const rows = cell.agents.map(
+          (agent) =>
+            "<tr>" +
+            Object.entries(agent)
+              .filter(([name]) => name !== "Shape" && name !== "Layer")
+              .map(([name, value]) => `<td>${name}: ${value}</td>`)
+              .join("") +
+            "</tr>"
+        );
+        detail.innerHTML =
+          `Cell (${x}, ${y}): ${cell.agents.length} agents` +
+          `<table>${rows.join("")}</table>`;
+      });
+  };
+
+  this.render = (frame) => {
+    if (frame.full) counts.fill(0);
+    const cells = frame.cells;
+    for (let i = 0; i < cells.length; i += BREEDS + 1) {
+      counts.set(cells.slice(i + 1, i + 1 + BREEDS), cells[i] * BREEDS);
+    }
+    draw();
+  };
+
+  this.reset = () => {
+    counts.fill(0);
+    detail.innerHTML = "";
+    context.clearRect(0, 0, canvas_width, canvas_height);
+  };
+};
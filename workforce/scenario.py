@@ -0,0 +1,46 @@
+"""
+What a headcount run is made of, shared by the batch and headless runners
+so their results for the same seed stay identical.
+
+Only NumPy is imported, so the headless runner can use it without loading
+the batch runner's process pool or cache.
+"""
+
+import numpy
+
+# Scenario parameters, with their command line types
+PARAMETERS = {
+    "height": int,
+    "width": int,
+    "initial_gpfellows": int,
+    "initial_trainees": int,
+    "initial_patients": int,
+    "patient_reproduce": float,
+    "gpfellow_trained_trainee": float,
+    "gpfellow_retirement_age": int,
+    "trainee_train_period": int,
+}
+
+
+def run_seed(seed, run_id):
+    """
+    Deterministic 32 bit seed for one run (or replicate) of a scenario.
+    """
+    return int(numpy.random.SeedSequence([seed, run_id]).generate_state(1)[0])
+
+
+def headcount_kwargs(engine, parameters):
+    """
+    The model keyword arguments of a run that only collects headcounts:
+    the parameters, plus the fast modes of the agent engine unless they
+    are given.
+    """
+    kwargs = dict(parameters)
+    if engine == "agent":
+        # Headcount runs never read nicknames or need patients to walk,
+        # or births to be drawn, one at a time
+        kwargs.setdefault("lazy_names", True)
+        kwargs.setdefault("bulk_movement", True)
+        kwargs.setdefault("bulk_births", True)
+        kwargs.setdefault("array_schedule", True)
+    return kwargs
@@ -1,7 +1,10 @@
+import heapq
 from collections import defaultdict
 
 from mesa.time import RandomActivation
 
+from workforce.instrument import clock
+
 
 class RandomActivationByBreed(RandomActivation):
     """
@@ -30,6 +33,18 @@ class RandomActivationByBreed(RandomActivation):
         agent_class = type(agent)
         self.agents_by_breed[agent_class][agent.unique_id] = agent
 
+    def add_agents(self, breed, agents):
+        """
+        Add new agents of one breed to the schedule in one pass.
+
+        Args:
+            breed: Class of every agent in agents.
+            agents: The agents, with unique ids not yet in the schedule.
+        """
+        by_id = {agent.unique_id: agent for agent in agents}
+        self._agents.update(by_id)
+        self.agents_by_breed[breed].update(by_id)
+
     def remove(self, agent):
         """
         Remove all instances of a given agent from the schedule.
@@ -49,8 +64,21 @@ class RandomActivationByBreed(RandomActivation):
                       the next one.
         """
         if by_breed:
-            for agent_class in self.agents_by_breed:
-                self.step_breed(agent_class)
+            instrument = getattr(self.model, "instrument", None)
+            # A breed's first agent may be added while another breed steps;
+            # it is stepped after the breeds that were already there
+            breeds = list(self.agents_by_breed)
+            i = 0
+            while i < len(breeds):
+                if instrument is None:
+                    self.step_breed(breeds[i])
+                else:
+                    start = clock()
+                    self.step_breed(breeds[i])
+                    instrument.add_time(breeds[i].__name__, clock() - start)
+                i += 1
+                if len(breeds) < len(self.agents_by_breed):
+                    breeds = list(self.agents_by_breed)
             self.steps += 1
             self.time += 1
         else:
@@ -72,4 +100,287 @@ class RandomActivationByBreed(RandomActivation):
         """
         Returns the current number of agents of certain breed in the queue.
         """
-        return len(self.agents_by_breed[breed_class].values())
+        return len(self.agents_by_breed.get(breed_class, ()))
+
+    def elapsed(self, agent):
+        """
+        Years an agent has aged without being stepped; agents stepped by
+        this scheduler age themselves.
+        """
+        return 0
+
+
+class ArrayActivationByBreed(RandomActivationByBreed):
+    """
+    A RandomActivationByBreed that steps each breed from a dense list.
+
+    Each breed's agents are kept in a list, shuffled in place at the start
+    of its pass, with a map from unique id to list index so an agent is
+    removed in O(1) by moving the last agent into its slot. Adds and
+    removes made during a breed's pass change agents_by_breed at once but
+    are applied to the lists when the pass ends, so:
+
+    - an agent removed during a pass is not stepped after its removal,
+      even if it had not had its turn yet
+    - an agent added during a pass is first stepped in the next pass of
+      its breed: later in this step if its breed has not had its pass yet
+      (a trainee started by a gpfellow), otherwise in the next step (a
+      baby, or a gpfellow promoted from a trainee)
+    """
+
+    def __init__(self, model):
+        super().__init__(model)
+        # Breed to its agents, in the order of the last pass
+        self.arrays = defaultdict(list)
+        self._slots = {}
+        # Breeds shuffled since their slots were last written
+        self._stale = set()
+        # (added, agent) changes made during the running pass, else None
+        self._pending = None
+        self._removed = set()
+
+    def add(self, agent):
+        super().add(agent)
+        if self._pending is None:
+            self._append(agent)
+        else:
+            self._pending.append((True, agent))
+
+    def add_agents(self, breed, agents):
+        agents = list(agents)
+        super().add_agents(breed, agents)
+        if self._pending is None:
+            for agent in agents:
+                self._append(agent)
+        else:
+            self._pending.extend((True, agent) for agent in agents)
+
+    def remove(self, agent):
+        super().remove(agent)
+        if self._pending is None:
+            self._swap_remove(agent)
+        else:
+            self._removed.add(agent.unique_id)
+            self._pending.append((False, agent))
+
+    def _append(self, agent):
+        array = self.arrays[type(agent)]
+        self._slots[agent.unique_id] = len(array)
+        array.append(agent)
+
+    def _swap_remove(self, agent):
+        breed = type(agent)
+        array = self.arrays[breed]
+        if breed in self._stale:
+            self._slots.update((other.unique_id, i) for i, other in enumerate(array))
+            self._stale.discard(breed)
+        index = self._slots.pop(agent.unique_id)
+        last = array.pop()
+        if index < len(array):
+            array[index] = last
+            self._slots[last.unique_id] = index
+
+    def step_breed(self, breed):
+        """
+        Shuffle a breed's list in place and step its agents, deferring adds
+        and removes to the end of the pass.
+
+        Args:
+            breed: Class object of the breed to run.
+        """
+        array = self.arrays[breed]
+        self.model.random.shuffle(array)
+        self._stale.add(breed)
+        self._pending = []
+        removed = self._removed
+        try:
+            for agent in array:
+                if agent.unique_id not in removed:
+                    agent.step()
+        finally:
+            pending, self._pending = self._pending, None
+            self._removed = set()
+            for added, agent in pending:
+                if added:
+                    self._append(agent)
+                else:
+                    self._swap_remove(agent)
+
+    def getstate(self):
+        """
+        The step order of every breed, for checkpoints.
+        """
+        return {
+            "order": {
+                breed.__name__: [agent.unique_id for agent in array]
+                for breed, array in self.arrays.items()
+            }
+        }
+
+    def setstate(self, state):
+        for breed, array in self.arrays.items():
+            order = state["order"].get(breed.__name__)
+            if order is not None:
+                by_id = {agent.unique_id: agent for agent in array}
+                array[:] = [by_id[unique_id] for unique_id in order]
+                self._stale.add(breed)
+
+
+class YearlyAttribute:
+    """
+    An agent attribute that goes up by one every step, such as age, for
+    breeds advanced by EventActivationByBreed.
+
+    Agents stepped one by one increment it themselves. Under
+    EventActivationByBreed they are not stepped, and the value read is the
+    stored one plus the years elapsed since the agent was scheduled. The
+    stored value lives in the slot this attribute replaces on the class.
+    """
+
+    def __init__(self, slot):
+        self.slot = slot
+
+    def __get__(self, agent, owner=None):
+        if agent is None:
+            return self
+        return self.slot.__get__(agent) + agent.model.schedule.elapsed(agent)
+
+    def __set__(self, agent, value):
+        self.slot.__set__(agent, value - agent.model.schedule.elapsed(agent))
+
+
+def derive_yearly_attributes(breed):
+    """
+    Turn the slots named in breed.yearly_attributes into YearlyAttributes.
+
+    Until the first EventActivationByBreed of a breed does this, they stay
+    plain slots, so runs with the other schedulers never pay for the
+    derivation. Agents of other models keep working afterwards, as their
+    schedulers report no elapsed years.
+    """
+    for name in getattr(breed, "yearly_attributes", ()):
+        slot = breed.__dict__[name]
+        if not isinstance(slot, YearlyAttribute):
+            setattr(breed, name, YearlyAttribute(slot))
+
+
+class EventActivationByBreed(RandomActivationByBreed):
+    """
+    A RandomActivationByBreed where some breeds are not stepped but advance
+    through scheduled events.
+
+    Agents of an event breed register their future events when added, by
+    calling schedule_event() from their schedule_events(schedule,
+    first_step) method. Each event breed keeps a priority queue of
+    (step, sequence, unique_id, action) entries, and when its turn comes in
+    a step the scheduler pops the due entries and calls agent.action() on
+    the agents still scheduled. Their YearlyAttributes are derived from the
+    step they were first due to be stepped in, so stepping costs O(events)
+    instead of O(agents).
+    """
+
+    def __init__(self, model, event_breeds):
+        """
+        Args:
+            model: The model to schedule.
+            event_breeds: Agent classes advanced by events.
+        """
+        super().__init__(model)
+        self.event_breeds = tuple(event_breeds)
+        for breed in self.event_breeds:
+            derive_yearly_attributes(breed)
+        self.events = defaultdict(list)
+        self.first_step = {}
+        self._sequence = 0
+        # Breeds whose turn has come in the running step, None between steps
+        self._stepped = None
+
+    def add(self, agent):
+        """
+        Add an Agent object to the schedule, registering its events if it
+        belongs to an event breed.
+
+        Args:
+            agent: An Agent to be added to the schedule.
+        """
+        super().add(agent)
+        breed = type(agent)
+        if breed in self.event_breeds:
+            self._register(breed, [agent])
+
+    def add_agents(self, breed, agents):
+        agents = list(agents)
+        super().add_agents(breed, agents)
+        if breed in self.event_breeds:
+            self._register(breed, agents)
+
+    def _register(self, breed, agents):
+        # As with stepping, an agent added after its breed's turn in this
+        # step first ages in the next one
+        first_step = self.steps
+        if self._stepped is not None and breed in self._stepped:
+            first_step += 1
+        for agent in agents:
+            self.first_step[agent.unique_id] = first_step
+            agent.schedule_events(self, first_step)
+
+    def remove(self, agent):
+        """
+        Remove an agent; its pending events are dropped when they come due.
+        """
+        super().remove(agent)
+        self.first_step.pop(agent.unique_id, None)
+
+    def schedule_event(self, agent, step, action):
+        """
+        Call agent.action() at the agent's breed's turn in the given step.
+        Events of one step run in the order they were scheduled.
+        """
+        heapq.heappush(self.events[type(agent)], (step, self._sequence, agent.unique_id, action))
+        self._sequence += 1
+
+    def elapsed(self, agent):
+        first_step = self.first_step.get(agent.unique_id)
+        if first_step is None:
+            return 0
+        now = self.steps
+        if self._stepped is not None and type(agent) in self._stepped:
+            now += 1
+        return now - first_step
+
+    def step(self, by_breed=True):
+        self._stepped = set()
+        try:
+            super().step(by_breed)
+        finally:
+            self._stepped = None
+
+    def step_breed(self, breed):
+        """
+        Run the due events of an event breed, or step every agent of any
+        other breed.
+
+        Args:
+            breed: Class object of the breed to run.
+        """
+        self._stepped.add(breed)
+        if breed not in self.event_breeds:
+            super().step_breed(breed)
+            return
+        events = self.events[breed]
+        agents = self.agents_by_breed[breed]
+        while events and events[0][0] <= self.steps:
+            step, sequence, unique_id, action = heapq.heappop(events)
+            agent = agents.get(unique_id)
+            if agent is not None:
+                getattr(agent, action)()
+
+    def getstate(self):
+        """
+        The pending events, for checkpoints.
+        """
+        return {"events": dict(self.events), "sequence": self._sequence}
+
+    def setstate(self, state):
+        self.events = defaultdict(list, {breed: list(events) for breed, events in state["events"].items()})
+        self._sequence = state["sequence"]
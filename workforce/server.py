@@ -1,9 +1,50 @@
-from mesa.visualization.ModularVisualization import ModularServer
+import contextvars
+import os
+import threading
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy
+import tornado.web
+from mesa.visualization.ModularVisualization import ModularServer, SocketHandler, TextElement, VisualizationElement
 from mesa.visualization.modules import CanvasGrid, ChartModule
 from mesa.visualization.UserParam import UserSettableParameter
 
 from workforce.agents import Patient, GPFellow, Trainee
+from workforce.batch import SWEEP_PARAMETERS, cached_series, run_series
+from workforce.cache import ResultCache
+from workforce.ensemble import run_ensemble
 from workforce.model import PatientGPFellow
+from workforce.sessions import SessionServer
+
+# Years of the headcount projection shown next to the grid
+PROJECTION_YEARS = 50
+
+# Replicates and years behind the ensemble bands on the chart, kept small
+# enough to finish while the model is watched, stopping early once every
+# mean is known to within BAND_TOLERANCE heads
+BAND_REPLICATES = 20
+BAND_YEARS = 30
+BAND_TOLERANCE = 1.0
+
+# "agents" draws every agent on a CanvasGrid, "heatmap" draws per-cell
+# headcounts with a HeatmapGrid, which scales to large populations
+VIEW = os.environ.get("WORKFORCE_VIEW", "agents")
+
+# If set, serve up to this many browser sessions, each with its own model
+# stepped off the event loop (see workforce.sessions)
+SESSIONS = int(os.environ.get("WORKFORCE_SESSIONS", 0))
+
+# Breeds counted per cell by the heatmap, in the order they are sent
+HEATMAP_BREEDS = (GPFellow, Trainee, Patient)
+
+# The websocket connection a frame is being rendered for, when the elements
+# are rendered by a ViewerSocketHandler
+VIEWER = contextvars.ContextVar("viewer", default=None)
+
+# Runs the projection (and ensemble bands) of new settings, so rendering
+# never waits for a headless simulation
+BACKGROUND = ThreadPoolExecutor(max_workers=1)
 
 
 def workforce_portrayal(agent):
@@ -19,6 +60,7 @@ def workforce_portrayal(agent):
         portrayal["Age"] = agent.age
         portrayal["Sex"] = agent.sex
         portrayal["Nickname"] = agent.nickname
+        portrayal["Attendances"] = agent.attendances
 
     if type(agent) is Trainee:
         portrayal["Shape"] = "workforce/resources/trainee.png"
@@ -42,13 +84,291 @@ def workforce_portrayal(agent):
     return portrayal
 
 
-canvas_element = CanvasGrid(workforce_portrayal, 20, 20, 500, 500)
+def scenario_parameters(model):
+    """
+    The settings of a model that decide its headcounts; run_series adds the
+    fast headless flags.
+    """
+    return {name: getattr(model, name) for name in SWEEP_PARAMETERS}
+
+
+def in_background(model, function, *args):
+    """
+    A Future of function(*args) run in BACKGROUND, cancelled if the model
+    is discarded (e.g. by another reset) before it starts.
+    """
+    future = BACKGROUND.submit(function, *args)
+    weakref.finalize(model, future.cancel)
+    return future
+
+
+def cell_counts(model):
+    """
+    Headcount of each of HEATMAP_BREEDS per cell, as an array of shape
+    (breeds, cells) indexed by x * height + y.
+    """
+    height = model.grid.height
+    counts = numpy.zeros((len(HEATMAP_BREEDS), model.grid.width * height), dtype=numpy.int64)
+    for row, breed in zip(counts, HEATMAP_BREEDS):
+        agents = model.schedule.agents_by_breed.get(breed, {})
+        keys = numpy.fromiter(
+            (x * height + y for x, y in (agent.pos for agent in agents.values())),
+            dtype=numpy.int64,
+            count=len(agents),
+        )
+        row += numpy.bincount(keys, minlength=len(row))
+    return counts
+
+
+class HeatmapGrid(VisualizationElement):
+    """
+    Draws per-cell headcounts of each breed, or the ratio of gpfellows to
+    patients, as a heatmap instead of drawing every agent.
+
+    Each frame is {"full": bool, "cells": [key, gpfellows, trainees,
+    patients, key, ...]} with key = x * height + y. The first frame a
+    viewer gets of a model lists every occupied cell; later frames only the
+    cells whose counts changed since that viewer's last frame. A viewer is
+    the connection rendering the frame (see ViewerServer), so tabs sharing
+    one model, or a reloaded page, each get their own deltas; without one
+    it is the model, as for the sessions of a SessionServer. Clicking a
+    cell fetches its agents' portrayals from CellHandler.
+    """
+
+    local_includes = ["HeatmapModule.js"]
+    local_dir = os.path.join(os.path.dirname(__file__), "resources")
+
+    def __init__(self, grid_width, grid_height, canvas_width=500, canvas_height=500):
+        super().__init__()
+        self.js_code = "elements.push(new HeatmapModule({0}, {1}, {2}, {3}));".format(
+            canvas_width, canvas_height, grid_width, grid_height
+        )
+        # The model and counts of each viewer's last frame, shared by the
+        # threads a SessionServer renders its sessions in
+        self._counts = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def render(self, model):
+        counts = cell_counts(model)
+        viewer = VIEWER.get()
+        if viewer is None:
+            viewer = model
+        with self._lock:
+            last_model, last = self._counts.get(viewer, (None, None))
+            self._counts[viewer] = (weakref.ref(model), counts)
+        # A new viewer, or a reset to a new model, gets a full frame
+        full = last_model is None or last_model() is not model
+        if full:
+            changed = numpy.flatnonzero(counts.any(axis=0))
+        else:
+            changed = numpy.flatnonzero((counts != last).any(axis=0))
+        cells = numpy.column_stack([changed, counts[:, changed].T])
+        return {"full": full, "cells": cells.ravel().tolist()}
+
+
+class ViewerSocketHandler(SocketHandler):
+    """
+    mesa's SocketHandler, rendering frames as the VIEWER of its elements.
+    """
+
+    def on_message(self, message):
+        token = VIEWER.set(self)
+        try:
+            super().on_message(message)
+        finally:
+            VIEWER.reset(token)
+
+
+class ViewerServer(ModularServer):
+    """
+    A ModularServer whose connections are the viewers of its elements.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # ModularServer registers mesa's SocketHandler for /ws
+        for rule in self.wildcard_router.rules:
+            if rule.target is SocketHandler:
+                rule.target = ViewerSocketHandler
+
+
+class CellHandler(tornado.web.RequestHandler):
+    """
+    Serves the portrayals of the agents in one cell, GET /cell?x=..&y=..
+    plus &session=.. for a session of a SessionServer.
+    """
+
+    def get(self):
+        model = self.application.model
+        session = self.get_argument("session", None)
+        if session is not None:
+            session = getattr(self.application, "sessions", {}).get(session)
+            if session is None or session.model is None:
+                raise tornado.web.HTTPError(404)
+            model = session.model
+        try:
+            pos = (int(self.get_argument("x")), int(self.get_argument("y")))
+        except ValueError:
+            raise tornado.web.HTTPError(400)
+        if model.grid.out_of_bounds(pos):
+            raise tornado.web.HTTPError(404)
+        agents = model.grid.get_cell_list_contents([pos])
+        self.write({"agents": [workforce_portrayal(agent) for agent in agents]})
+
+
+class ProfileElement(TextElement):
+    """
+    Shows the instrumentation record of the latest step, when enabled.
+    """
+
+    def render(self, model):
+        if model.instrument is None or model.instrument.last is None:
+            return ""
+        record = model.instrument.last
+        seconds = ", ".join(
+            "{0} {1:.1f} ms".format(name, 1000 * t) for name, t in record["seconds"].items()
+        )
+        events = ", ".join(
+            "{0} {1}".format(name, n) for name, n in record["events"].items()
+        )
+        return "Step {0} time: {1}<br>Events: {2}".format(record["step"], seconds, events)
+
+
+class ProjectionElement(TextElement):
+    """
+    Shows the headcounts the current settings and seed lead to over
+    PROJECTION_YEARS. A scenario in the result cache is shown at once;
+    otherwise it is run headless in the background (then cached) and shown
+    from the first frame after it finishes.
+    """
+
+    def __init__(self, cache=None):
+        super().__init__()
+        self.cache = cache
+        # A Future of the projection of each model, made when it is first
+        # rendered; the lock keeps the threads of a SessionServer from
+        # starting a model's projection twice
+        self._series = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def render(self, model):
+        if model._seed is None:
+            return "Set a seed to see the projection"
+        with self._lock:
+            future = self._series.get(model)
+            if future is None:
+                # Reset: a new model with possibly new settings
+                if self.cache is None:
+                    self.cache = ResultCache()
+                parameters = scenario_parameters(model)
+                series = cached_series("agent", parameters, model._seed, PROJECTION_YEARS, self.cache)
+                if series is None:
+                    future = in_background(
+                        model, run_series, "agent", parameters, model._seed, PROJECTION_YEARS, self.cache
+                    )
+                else:
+                    future = Future()
+                    future.set_result(series)
+                self._series[model] = future
+        if not future.done():
+            return "Projecting {0} years...".format(PROJECTION_YEARS)
+        series = future.result()
+        rows = "".join(
+            "<tr><td>{0}</td>{1}</tr>".format(
+                year, "".join("<td>{0}</td>".format(values[year]) for values in series.values())
+            )
+            for year in range(0, PROJECTION_YEARS + 1, 10)
+        )
+        header = "".join("<th>{0}</th>".format(name) for name in series)
+        return "Projection<table><tr><th>Year</th>{0}</tr>{1}</table>".format(header, rows)
+
+
+class BandChartModule(ChartModule):
+    """
+    A ChartModule that also draws ensemble bands for the current settings
+    (see workforce.ensemble). Labels collected by the model's DataCollector
+    are charted from the running model; labels of the bands, such as
+    'GPFellows mean' or 'GPFellows 95%', from an ensemble of replicates at
+    the model's current year. The ensemble runs in the background, and the
+    bands are left out (null) until it finishes, after its last year and
+    for an unseeded model.
+    """
+
+    def __init__(
+        self,
+        series,
+        replicates=BAND_REPLICATES,
+        years=BAND_YEARS,
+        tolerance=BAND_TOLERANCE,
+        cache=None,
+        **kwargs
+    ):
+        super().__init__(series, **kwargs)
+        self.replicates = replicates
+        self.years = years
+        self.tolerance = tolerance
+        self.cache = cache
+        # A Future of the band series of each model, made when it is first
+        # rendered, under the lock as for ProjectionElement
+        self._bands = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def band_series(self, parameters, seed):
+        """
+        The band series of an ensemble of the scenario.
+        """
+        statistics = run_ensemble(
+            parameters,
+            replicates=self.replicates,
+            steps=self.years,
+            seed=seed,
+            processes=1,
+            tolerance=self.tolerance,
+            cache=self.cache,
+        )
+        return statistics.band_series()
+
+    def render(self, model):
+        values = super().render(model)
+        bands = {}
+        # As for the projection, an unseeded model has no ensemble to show
+        if model._seed is not None:
+            with self._lock:
+                future = self._bands.get(model)
+                if future is None:
+                    if self.cache is None:
+                        self.cache = ResultCache()
+                    future = in_background(model, self.band_series, scenario_parameters(model), model._seed)
+                    self._bands[model] = future
+            if future.done():
+                bands = future.result()
+        collected = getattr(model, self.data_collector_name).model_vars
+        year = model.schedule.steps
+        for i, series in enumerate(self.series):
+            label = series["Label"]
+            if label in bands and year <= self.years:
+                value = float(bands[label][year])
+                # nan (e.g. a spread of one replicate) is not valid JSON
+                values[i] = value if value == value else 0
+            elif label not in collected:
+                values[i] = None
+        return values
+
+
+if VIEW == "heatmap":
+    canvas_element = HeatmapGrid(20, 20, 500, 500)
+else:
+    canvas_element = CanvasGrid(workforce_portrayal, 20, 20, 500, 500)
 
 # Define the Line chart elements
-chart_element = ChartModule(
+chart_element = BandChartModule(
     [{"Label": "Patients", "Color": "#AA0000"}
     , {"Label": "GPFellows", "Color": "#666666"}
     , {"Label": "Trainees", "Color": "#32a885"}
+    , {"Label": "GPFellows 5%", "Color": "#BBBBBB"}
+    , {"Label": "GPFellows 95%", "Color": "#BBBBBB"}
+    , {"Label": "Trainees 5%", "Color": "#9fd9c8"}
+    , {"Label": "Trainees 95%", "Color": "#9fd9c8"}
     ]
 )
 
@@ -82,12 +402,29 @@ model_params = {
         "slider", "Trainee Train Period (Yrs)", 5, 1, 15, 1,
         description="",
     ),
+    "seed": UserSettableParameter(
+        "number", "Random seed", 1,
+        description="Runs with the same settings and seed are identical",
+    ),
+    "instrument": UserSettableParameter(
+        "checkbox", "Profile steps", False,
+        description="Show per-step timings and event counts",
+    ),
 }
 
 # Server instance
-server = ModularServer(
-    PatientGPFellow, [canvas_element, chart_element]
-    , "Patient GPFellow Workforce"
-    , model_params
-)
+if SESSIONS:
+    server = SessionServer(
+        PatientGPFellow, [canvas_element, chart_element, ProjectionElement(), ProfileElement()]
+        , "Patient GPFellow Workforce"
+        , model_params
+        , max_sessions=SESSIONS
+    )
+else:
+    server = ViewerServer(
+        PatientGPFellow, [canvas_element, chart_element, ProjectionElement(), ProfileElement()]
+        , "Patient GPFellow Workforce"
+        , model_params
+    )
 server.port = 8521
+server.add_handlers(r".*", [(r"/cell", CellHandler)])
@@ -0,0 +1,212 @@
+"""
+A visualization server that runs one model per browser session off the
+event loop.
+
+mesa's ModularServer steps its single model inside the Tornado handler, so
+a slow step freezes every connected browser and all browsers share, and
+step, the same model. SessionServer takes the same arguments but gives
+each websocket connection a Session with its own parameters and model.
+Models are built, stepped and rendered in a thread pool, while the event
+loop only moves messages:
+
+    server = SessionServer(PatientGPFellow, elements, "Workforce", model_params,
+                           max_sessions=4)
+    server.launch()
+
+After the first frame is asked for, a session keeps stepping its model up
+to `ahead` years past the last frame it sent. When the browser asks for
+the next frame it gets the latest state, so years it was too slow to draw
+are skipped rather than queued. Connections beyond max_sessions are
+closed with code 1013 (try again later).
+"""
+
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import tornado.escape
+import tornado.ioloop
+import tornado.locks
+from tornado.websocket import WebSocketClosedError
+from mesa.visualization.ModularVisualization import ModularServer, SocketHandler, is_user_param
+
+# Years a session may run ahead of the frame its browser last drew
+AHEAD = 5
+MAX_SESSIONS = 4
+
+
+class Session:
+    """
+    One connection's parameters and model. Every use of the model is
+    serialised by a lock and runs in the server's executor.
+    """
+
+    def __init__(self, application):
+        """
+        Args:
+            application: The SessionServer, for its model class, parameters,
+                         visualization elements and executor.
+        """
+        self.application = application
+        self.id = uuid.uuid4().hex
+        self.model_kwargs = dict(application.model_kwargs)
+        self.model = None
+        self.lock = tornado.locks.Lock()
+        # Steps taken since the last frame was rendered
+        self.steps_ahead = 0
+        self.closed = False
+        self._running_ahead = False
+
+    def _run(self, function, *args):
+        return tornado.ioloop.IOLoop.current().run_in_executor(
+            self.application.executor, function, *args
+        )
+
+    def _new_model(self):
+        kwargs = {}
+        for name, value in self.model_kwargs.items():
+            if is_user_param(value):
+                if value.param_type == "static_text":
+                    continue
+                value = value.value
+            kwargs[name] = value
+        model = self.application.model_cls(**kwargs)
+        model.running = True
+        return model
+
+    def _render(self):
+        return {
+            "type": "viz_state",
+            "data": [element.render(self.model) for element in self.application.visualization_elements],
+        }
+
+    def set_param(self, name, value):
+        """
+        Change a user parameter of this session; used by the next reset.
+        """
+        if name in self.application.user_params:
+            self.model_kwargs[name] = value
+
+    async def reset(self):
+        """
+        Build a new model from this session's parameters and return its
+        first frame.
+        """
+        async with self.lock:
+            self.model = await self._run(self._new_model)
+            self.steps_ahead = 0
+            return await self._run(self._render)
+
+    async def next_frame(self):
+        """
+        The frame of the latest state, at least one step past the last
+        frame, or the end message once the model has stopped.
+        """
+        async with self.lock:
+            if self.steps_ahead == 0:
+                if not self.model.running:
+                    return {"type": "end"}
+                await self._run(self.model.step)
+            self.steps_ahead = 0
+            frame = await self._run(self._render)
+        if not self._running_ahead:
+            tornado.ioloop.IOLoop.current().spawn_callback(self._run_ahead)
+        return frame
+
+    async def _run_ahead(self):
+        self._running_ahead = True
+        try:
+            while not self.closed and self.steps_ahead < self.application.ahead:
+                # Take the lock per step, so frames are never more than one
+                # step late
+                async with self.lock:
+                    if not self.model.running:
+                        break
+                    await self._run(self.model.step)
+                    self.steps_ahead += 1
+        finally:
+            self._running_ahead = False
+
+    def close(self):
+        self.closed = True
+
+
+class SessionSocketHandler(SocketHandler):
+    """
+    A websocket connection with its own Session.
+    """
+
+    session = None
+
+    def open(self):
+        application = self.application
+        if len(application.sessions) >= application.max_sessions:
+            self.close(1013, "Too many sessions")
+            return
+        self.session = Session(application)
+        application.sessions[self.session.id] = self.session
+        # The session id tells element scripts which model is theirs, e.g.
+        # for the heatmap's /cell requests
+        self.write_message(
+            {"type": "model_params", "params": application.user_params, "session": self.session.id}
+        )
+
+    def on_close(self):
+        if self.session is not None:
+            self.session.close()
+            self.application.sessions.pop(self.session.id, None)
+
+    async def on_message(self, message):
+        if self.session is None:
+            # Closed by open() for being over max_sessions
+            return
+        msg = tornado.escape.json_decode(message)
+        if msg["type"] == "get_step" and self.session.model is not None:
+            reply = await self.session.next_frame()
+        elif msg["type"] in ("get_step", "reset"):
+            reply = await self.session.reset()
+        elif msg["type"] == "submit_params":
+            self.session.set_param(msg["param"], msg["value"])
+            return
+        else:
+            return
+        try:
+            self.write_message(reply)
+        except WebSocketClosedError:
+            pass
+
+
+class SessionServer(ModularServer):
+    """
+    A ModularServer with one model per connection, run in a thread pool.
+    """
+
+    def __init__(
+        self,
+        model_cls,
+        visualization_elements,
+        name="Mesa Model",
+        model_params=None,
+        port=None,
+        max_sessions=MAX_SESSIONS,
+        workers=None,
+        ahead=AHEAD,
+    ):
+        """
+        Args:
+            model_cls, visualization_elements, name, model_params, port:
+                As for ModularServer.
+            max_sessions: Most connections served at once.
+            workers: Threads building, stepping and rendering models;
+                     defaults to max_sessions.
+            ahead: Years a session may step past its last frame.
+        """
+        super().__init__(model_cls, visualization_elements, name, model_params, port)
+        self.max_sessions = max_sessions
+        self.ahead = ahead
+        self.sessions = {}
+        self.executor = ThreadPoolExecutor(max_workers=workers or max_sessions)
+        # ModularServer registers mesa's SocketHandler for /ws; serve
+        # sessions there instead
+        for rule in self.wildcard_router.rules:
+            if rule.target is SocketHandler:
+                rule.target = SessionSocketHandler
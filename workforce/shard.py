@@ -0,0 +1,307 @@
+"""
+Spatially sharded Patient-GPFellow simulation over worker processes.
+
+The torus is cut into vertical strips of columns, one per shard. Each shard
+is a ShardModel in its own process, with its own RandomActivationByBreed,
+random streams and DataCollector, holding only the agents in its strip.
+Every step the coordinator exchanges agents between shards over pipes in
+two rounds:
+
+    move   each shard walks its patients (bulk movement) and returns the
+           ones that left its strip; they are delivered before attendance
+    step   each shard adds the arrivals, steps its schedule, collects its
+           headcounts and returns the trainees placed outside its strip,
+           who are delivered at the start of the next step
+
+Agents cross as plain tuples of their saved attributes (see
+workforce.checkpoint). The coordinator sums the shards' DataCollector
+series into model_vars:
+
+    with ShardedPatientGPFellow(shards=4, seed=1, initial_patients=100000) as model:
+        model.run_model(50)
+    model.get_model_vars_dataframe()
+
+Headcounts match the single process model statistically; unique ids are
+interleaved between shards so they stay unique, but differ from a single
+process run.
+"""
+
+import multiprocessing
+from collections import defaultdict
+
+import numpy
+
+from workforce.agents import GPFellow, Patient, Trainee
+from workforce.checkpoint import BREEDS, BREED_ATTRIBUTES
+from workforce.model import MODEL_REPORTERS, PatientGPFellow
+
+# Initial populations split between the shards by the area of their strip
+INITIAL_POPULATIONS = ("initial_gpfellows", "initial_trainees", "initial_patients")
+
+
+def shard_seeds(seed, shards):
+    """
+    A 32 bit seed for each shard plus one for the population split, all
+    derived from seed (fresh entropy if it is None).
+    """
+    children = numpy.random.SeedSequence(seed).spawn(shards + 1)
+    return [int(child.generate_state(1)[0]) for child in children]
+
+
+def strip_bounds(width, shards):
+    """
+    First columns of each shard's strip plus the width, e.g. [0, 7, 14, 20].
+    """
+    if not 1 <= shards <= width:
+        raise ValueError("Need between 1 and %d shards for width %d" % (width, width))
+    return numpy.linspace(0, width, shards + 1).astype(int).tolist()
+
+
+def agent_state(agent):
+    """
+    The attributes an agent needs to be rebuilt in another shard.
+    """
+    breed = type(agent).__name__
+    return (
+        breed,
+        agent.unique_id,
+        agent.pos,
+        agent.moore,
+        agent.age,
+        agent.sex_code,
+        agent._nickname,
+    ) + tuple(getattr(agent, name) for name in BREED_ATTRIBUTES[breed])
+
+
+class ShardModel(PatientGPFellow):
+    """
+    The part of a PatientGPFellow model in one strip of columns.
+
+    The grid has the full width so positions mean the same in every shard,
+    but only agents with x in [x_start, x_stop) are kept.
+    """
+
+    def __init__(self, index, shards, x_start, x_stop, **parameters):
+        """
+        Args:
+            index: This shard's number.
+            shards: Number of shards.
+            x_start, x_stop: Columns of this shard's strip.
+            parameters: PatientGPFellow parameters, with this shard's share
+                        of the initial populations.
+        """
+        self.index = index
+        self.shards = shards
+        self.x_start = x_start
+        self.x_stop = x_stop
+        parameters["bulk_movement"] = True
+        super().__init__(**parameters)
+
+    def next_id(self):
+        # Shard i hands out ids i, i + shards, i + 2 * shards, ...
+        self.current_id += 1
+        return self.current_id * self.shards + self.index
+
+    def allocate_ids(self, count):
+        ids = super().allocate_ids(count)
+        return range(ids.start * self.shards + self.index, ids.stop * self.shards + self.index, self.shards)
+
+    def random_cell(self):
+        movement = self.streams.movement
+        x = self.x_start + movement.integers(self.x_stop - self.x_start)
+        return self.cell_positions[x * self.height + movement.integers(self.height)]
+
+    def owner(self, x, bounds):
+        """
+        The shard whose strip holds column x.
+        """
+        return int(numpy.searchsorted(bounds, x, side="right")) - 1
+
+    def emigrate(self, breeds, bounds):
+        """
+        Remove the agents of the given breeds that are outside this strip
+        and return their states, keyed by the shard they move to.
+        """
+        leaving = defaultdict(list)
+        for breed in breeds:
+            for agent in list(self.schedule.agents_by_breed.get(breed, {}).values()):
+                x = agent.pos[0]
+                if self.x_start <= x < self.x_stop:
+                    continue
+                leaving[self.owner(x, bounds)].append(agent_state(agent))
+                if breed is GPFellow:
+                    self.remove_gpfellow(agent)
+                else:
+                    self.grid.remove_agent(agent)
+                self.schedule.remove(agent)
+        return dict(leaving)
+
+    def immigrate(self, states):
+        """
+        Add agents sent by other shards.
+        """
+        for state in states:
+            breed_name, unique_id, pos, moore, age, sex, nickname = state[:7]
+            breed = BREEDS[breed_name]
+            # Set the saved attributes directly, as checkpoint.restore does
+            agent = breed.__new__(breed)
+            agent.model = self
+            agent.pos = None
+            agent.unique_id = unique_id
+            agent.moore = moore
+            agent.age = age
+            agent.sex_code = sex
+            agent._nickname = nickname
+            for name, value in zip(BREED_ATTRIBUTES[breed_name], state[7:]):
+                setattr(agent, name, value)
+            pos = self.cell_positions[pos[0] * self.height + pos[1]]
+            if breed is GPFellow:
+                self.place_gpfellow(agent, pos)
+            else:
+                self.grid.place_agent(agent, pos)
+            self.schedule.add(agent)
+
+    def latest(self):
+        """
+        The last collected value of every series.
+        """
+        return {name: values[-1] for name, values in self.datacollector.model_vars.items()}
+
+    def step(self):
+        # Patients have already been moved and exchanged by the coordinator
+        if self.bulk_births and not self.event_schedule:
+            self.start_trainees()
+        self.schedule.step()
+        if self.bulk_births:
+            self.reproduce_patients()
+        if self.bulk_attendance:
+            self.attend_patients()
+        self.datacollector.collect(self)
+
+
+def run_shard(connection, index, shards, bounds, parameters):
+    """
+    Worker process loop: build a shard and answer the coordinator's
+    commands until it sends 'close'.
+    """
+    model = ShardModel(index, shards, bounds[index], bounds[index + 1], **parameters)
+    connection.send(model.latest())
+    while True:
+        command, arrivals = connection.recv()
+        if command == "close":
+            break
+        model.immigrate(arrivals)
+        if command == "move":
+            model.move_patients()
+            connection.send(model.emigrate((Patient,), bounds))
+        elif command == "step":
+            model.step()
+            connection.send((model.latest(), model.emigrate((Trainee,), bounds)))
+    connection.close()
+
+
+class ShardedPatientGPFellow:
+    """
+    Coordinator of a PatientGPFellow model split across worker processes.
+
+    Takes the PatientGPFellow parameters plus the number of shards, and
+    keeps the summed headcount series in model_vars, like a DataCollector.
+    """
+
+    def __init__(self, shards=2, seed=None, **parameters):
+        """
+        Args:
+            shards: Number of worker processes (strips of columns).
+            seed: Seed the shard seeds and the population split are derived
+                  from.
+            parameters: PatientGPFellow parameters (bulk_movement is always
+                        on in the shards).
+        """
+        width = parameters.get("width", 20)
+        self.bounds = strip_bounds(width, shards)
+        self.shards = shards
+        self.steps = 0
+
+        # Uniform placement puts a multinomial share of each population in
+        # each strip
+        seeds = shard_seeds(seed, shards)
+        rng = numpy.random.default_rng(seeds[-1])
+        areas = numpy.diff(self.bounds) / width
+        shares = {
+            name: rng.multinomial(parameters.get(name, getattr(PatientGPFellow, name)), areas)
+            for name in INITIAL_POPULATIONS
+        }
+
+        self.connections = []
+        self.processes = []
+        for index in range(shards):
+            shard_parameters = dict(parameters, seed=seeds[index])
+            for name in INITIAL_POPULATIONS:
+                shard_parameters[name] = int(shares[name][index])
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=run_shard,
+                args=(child, index, shards, self.bounds, shard_parameters),
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+        self.model_vars = {name: [] for name in MODEL_REPORTERS}
+        self._merge([connection.recv() for connection in self.connections])
+        # Agents waiting to be delivered to each shard
+        self._arrivals = [[] for i in range(shards)]
+
+    def _merge(self, rows):
+        for name, values in self.model_vars.items():
+            values.append(sum(row[name] for row in rows))
+
+    def _exchange(self, command):
+        """
+        Send a command with each shard's arrivals and collect the replies.
+        """
+        for connection, arrivals in zip(self.connections, self._arrivals):
+            connection.send((command, arrivals))
+        self._arrivals = [[] for i in range(self.shards)]
+        return [connection.recv() for connection in self.connections]
+
+    def _route(self, departures):
+        for leaving in departures:
+            for destination, states in leaving.items():
+                self._arrivals[destination].extend(states)
+
+    def step(self):
+        self._route(self._exchange("move"))
+        replies = self._exchange("step")
+        self._merge([latest for latest, leaving in replies])
+        self._route([leaving for latest, leaving in replies])
+        self.steps += 1
+
+    def run_model(self, step_count=200):
+        for i in range(step_count):
+            self.step()
+
+    def get_model_vars_dataframe(self):
+        import pandas
+
+        return pandas.DataFrame(self.model_vars)
+
+    def close(self):
+        """
+        Stop the worker processes.
+        """
+        for connection in self.connections:
+            connection.send(("close", []))
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.connections = []
+        self.processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
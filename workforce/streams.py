@@ -0,0 +1,123 @@
+"""
+Seeded random number streams owned by one model.
+
+Every draw the agent model makes comes from a RandomStreams object built
+from the model's seed, so a run is reproduced bit for bit by its seed alone.
+The seed is split with numpy.random.SeedSequence into one independent
+Generator per purpose:
+
+    demographics  ages, sexes and training years of new agents
+    names         nicknames (a separate stream, so reading lazy nicknames
+                  does not change the rest of the run)
+    movement      initial positions and random walk steps
+    attendance    which gpfellow a patient attends
+    births        patient reproduction
+    intake        gpfellows starting trainees
+
+Scalar draws are served from pre-drawn blocks of uniforms and standard
+normals, which avoids a Python-to-C call into NumPy per draw:
+
+    streams = RandomStreams(seed=42)
+    age = round(streams.demographics.normal(45, 5))
+    if streams.births.random() < 0.05:
+        ...
+"""
+
+import numpy
+
+STREAMS = ("demographics", "names", "movement", "attendance", "births", "intake")
+
+# Values drawn per block refill
+BLOCK_SIZE = 4096
+
+
+class BufferedStream:
+    """
+    One Generator plus blocks of uniforms and standard normals drawn ahead.
+
+    Calls with a size are passed straight to the Generator; scalar calls
+    are taken from the blocks.
+    """
+
+    def __init__(self, seed_sequence, block_size=BLOCK_SIZE):
+        """
+        Args:
+            seed_sequence: numpy.random.SeedSequence for this stream.
+            block_size: Number of values drawn per block.
+        """
+        self.generator = numpy.random.Generator(numpy.random.PCG64(seed_sequence))
+        self.block_size = block_size
+        self._uniforms = []
+        self._normals = []
+
+    def random(self, size=None):
+        """
+        Uniform float in [0, 1), or an array of them.
+        """
+        if size is not None:
+            return self.generator.random(size)
+        if not self._uniforms:
+            self._uniforms = self.generator.random(self.block_size).tolist()
+        return self._uniforms.pop()
+
+    def normal(self, loc=0.0, scale=1.0, size=None):
+        """
+        Normally distributed float, or an array of them.
+        """
+        if size is not None:
+            return self.generator.normal(loc, scale, size)
+        if not self._normals:
+            self._normals = self.generator.standard_normal(self.block_size).tolist()
+        return loc + scale * self._normals.pop()
+
+    def integers(self, high, size=None):
+        """
+        Integer in [0, high), or an array of them.
+        """
+        if size is not None:
+            return self.generator.integers(high, size=size)
+        return int(self.random() * high)
+
+    def choice(self, sequence):
+        """
+        A uniformly chosen element of a non-empty sequence.
+        """
+        return sequence[int(self.random() * len(sequence))]
+
+    def getstate(self):
+        return {
+            "generator": self.generator.bit_generator.state,
+            "uniforms": list(self._uniforms),
+            "normals": list(self._normals),
+        }
+
+    def setstate(self, state):
+        self.generator.bit_generator.state = state["generator"]
+        self._uniforms = list(state["uniforms"])
+        self._normals = list(state["normals"])
+
+
+class RandomStreams:
+    """
+    The model's streams, one BufferedStream attribute per name in STREAMS.
+    """
+
+    def __init__(self, seed=None, block_size=BLOCK_SIZE):
+        """
+        Args:
+            seed: Integer seed, or None for fresh entropy.
+            block_size: Number of values drawn per block refill.
+        """
+        self.seed_sequence = numpy.random.SeedSequence(seed)
+        for name, child in zip(STREAMS, self.seed_sequence.spawn(len(STREAMS))):
+            setattr(self, name, BufferedStream(child, block_size))
+
+    def getstate(self):
+        """
+        The state of every stream, including the undrawn block values.
+        """
+        return {name: getattr(self, name).getstate() for name in STREAMS}
+
+    def setstate(self, state):
+        for name in STREAMS:
+            getattr(self, name).setstate(state[name])
@@ -0,0 +1,72 @@
+"""
+Tests of the compact agent classes.
+"""
+
+import pytest
+
+from workforce.agents import GPFellow, Patient, Trainee
+from workforce.collector import read_table
+from workforce.model import PatientGPFellow
+from workforce.namepool import get_pool
+from workforce.person_properties import SEXES
+from workforce.server import workforce_portrayal
+
+SCENARIO = dict(initial_gpfellows=10, initial_trainees=5, initial_patients=30, patient_reproduce=0.05)
+
+
+def test_agents_carry_no_dict():
+    model = PatientGPFellow(seed=1, **SCENARIO)
+    for breed in (GPFellow, Trainee, Patient):
+        agent = next(iter(model.schedule.agents_by_breed[breed].values()))
+        assert not hasattr(agent, "__dict__")
+        with pytest.raises(AttributeError):
+            agent.colour = "red"
+
+
+def test_sex_and_nickname_read_as_text():
+    model = PatientGPFellow(seed=1, initial_gpfellows=0, initial_trainees=0, initial_patients=0)
+    agent = Patient(1, (0, 0), model, True, 30, "M", 7)
+    assert (agent.sex, agent.sex_code) == ("M", SEXES.index("M"))
+    assert agent.nickname == get_pool().name(agent.sex_code, 7)
+    agent.sex = "F"
+    agent.nickname = "Ada Lovelace"
+    assert (agent.sex, agent.sex_code, agent.nickname) == ("F", 0, "Ada Lovelace")
+
+
+def test_lazy_nicknames_are_drawn_once_when_read():
+    model = PatientGPFellow(seed=1, lazy_names=True, **SCENARIO)
+    agent = next(iter(model.schedule.agents_by_breed[Patient].values()))
+    assert agent._nickname is None
+    nickname = agent.nickname
+    assert isinstance(nickname, str) and nickname
+    assert agent.nickname == nickname
+
+
+def test_lazy_names_leave_the_run_unchanged():
+    runs = []
+    for lazy_names in (False, True):
+        model = PatientGPFellow(seed=2, lazy_names=lazy_names, **SCENARIO)
+        model.run_model(10)
+        runs.append(model.datacollector.model_vars)
+    assert runs[0] == runs[1]
+
+
+def test_portrayal_and_reporters_see_text_values(tmp_path):
+    model = PatientGPFellow(seed=1, collector_path=str(tmp_path), **SCENARIO)
+    model.datacollector.close()
+    assert set(read_table(str(tmp_path), "agents")["Sex"]) == set(SEXES)
+    for agent in model.schedule.agents:
+        portrayal = workforce_portrayal(agent)
+        assert portrayal["Sex"] in SEXES
+        assert portrayal["Sex"] == agent.sex
+        assert portrayal["Age"] == agent.age
+        assert portrayal["Nickname"] == agent.nickname
+        assert " " in portrayal["Nickname"]
+
+
+def test_agents_share_the_cell_position_tuples():
+    model = PatientGPFellow(seed=1, **SCENARIO)
+    model.run_model(3)
+    for agent in model.schedule.agents:
+        x, y = agent.pos
+        assert agent.pos is model.cell_positions[x * model.height + y]
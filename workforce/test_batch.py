@@ -0,0 +1,35 @@
+"""
+Tests of the parameter-sweep runner.
+"""
+
+from workforce.batch import batch_run, parameter_grid, run_seed
+
+SCENARIO = dict(initial_gpfellows=10, initial_trainees=2, initial_patients=20)
+
+
+def test_parameter_grid_crosses_lists_and_keeps_single_values():
+    grid = parameter_grid(gpfellow_retirement_age=[60, 65], trainee_train_period=5)
+    assert grid == [
+        {"gpfellow_retirement_age": 60, "trainee_train_period": 5},
+        {"gpfellow_retirement_age": 65, "trainee_train_period": 5},
+    ]
+
+
+def test_run_seeds_depend_on_the_run_only():
+    assert run_seed(0, 3) == run_seed(0, 3)
+    assert len({run_seed(0, run_id) for run_id in range(100)}) == 100
+
+
+def test_table_has_a_row_per_run_and_step():
+    table = batch_run(dict(SCENARIO, gpfellow_retirement_age=[60, 70]), replicates=2, steps=5, processes=1)
+    assert len(table) == 2 * 2 * 6
+    assert table["run_id"].unique().tolist() == [0, 1, 2, 3]
+    assert set(table["gpfellow_retirement_age"]) == {60, 70}
+    assert {"Patients", "GPFellows", "Trainees"} <= set(table.columns)
+
+
+def test_results_do_not_depend_on_the_number_of_processes():
+    parameters = dict(SCENARIO, patient_reproduce=[0.02, 0.05])
+    serial = batch_run(parameters, replicates=2, steps=5, processes=1)
+    pooled = batch_run(parameters, replicates=2, steps=5, processes=2, chunksize=1)
+    assert serial.equals(pooled)
@@ -0,0 +1,77 @@
+"""
+Tests of the on-disk result cache.
+"""
+
+import os
+
+from workforce.batch import cached_series, run_series
+from workforce.cache import ResultCache, scenario_key
+from workforce.population import PopulationTable
+
+PARAMETERS = dict(initial_gpfellows=10, initial_trainees=2, initial_patients=30, patient_reproduce=0.05)
+
+
+def test_a_hit_returns_the_series_of_the_run(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    run = run_series("agent", PARAMETERS, 3, 10, cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert run_series("agent", PARAMETERS, 3, 10, cache) == run
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert run_series("agent", PARAMETERS, 3, 10) == run
+
+
+def test_shorter_runs_are_answered_from_the_prefix(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    run = run_series("agent", PARAMETERS, 3, 10, cache)
+    prefix = cached_series("agent", PARAMETERS, 3, 4, cache)
+    assert prefix == {name: values[:5] for name, values in run.items()}
+    assert cached_series("agent", PARAMETERS, 3, 11, cache) is None
+
+
+def test_defaults_and_ignored_parameters_share_an_entry(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    run_series("agent", PARAMETERS, 3, 5, cache)
+    assert cached_series("agent", dict(PARAMETERS, height=20), 3, 5, cache) is not None
+    assert cached_series("agent", dict(PARAMETERS, lazy_names=False), 3, 5, cache) is not None
+    assert cached_series("agent", dict(PARAMETERS, initial_patients=31), 3, 5, cache) is None
+    assert cached_series("agent", PARAMETERS, 4, 5, cache) is None
+    assert scenario_key("agent", dict(instrument=True), 1) == scenario_key("agent", {}, 1)
+
+
+def test_population_files_are_keyed_by_their_contents(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    path = str(tmp_path / "table.csv")
+    with open(path, "w") as table:
+        table.write("ROLE,SEX,AGE,COUNT\nGP_FELLOW,F,50,2\nGP_TRAINEE,M,28,1\nPATIENT,F,30,10\n")
+    parameters = dict(PARAMETERS, population=path)
+    run_series("agent", parameters, 3, 5, cache)
+    assert cached_series("agent", parameters, 3, 5, cache) is not None
+    assert scenario_key("agent", parameters, 3) == scenario_key(
+        "agent", dict(PARAMETERS, population=PopulationTable.load(path)), 3
+    )
+    with open(path, "a") as table:
+        table.write("PATIENT,M,70,10\n")
+    assert cached_series("agent", parameters, 3, 5, cache) is None
+
+
+def test_unseeded_runs_are_not_cached(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    run_series("agent", PARAMETERS, None, 5, cache)
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    sizes = []
+    for age, seed in enumerate((1, 2, 0)):
+        before = set(os.listdir(str(tmp_path)))
+        run_series("agent", PARAMETERS, seed, 5, cache)
+        (entry,) = set(os.listdir(str(tmp_path))) - before
+        entry = os.path.join(str(tmp_path), entry)
+        os.utime(entry, (1000 + age, 1000 + age))
+        sizes.append(os.path.getsize(entry))
+    cache.max_bytes = sizes[1] + sizes[2]
+    cache.evict()
+    assert cached_series("agent", PARAMETERS, 1, 5, cache) is None
+    assert cached_series("agent", PARAMETERS, 2, 5, cache) is not None
+    assert cached_series("agent", PARAMETERS, 0, 5, cache) is not None
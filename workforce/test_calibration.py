@@ -0,0 +1,115 @@
+"""
+Tests of the calibration searches.
+"""
+
+import numpy
+import pytest
+
+from workforce import calibration
+from workforce.batch import run_seed, run_series
+from workforce.calibration import Calibration
+
+FIXED = dict(initial_gpfellows=10, initial_trainees=2, initial_patients=20)
+BOUNDS = {"gpfellow_trained_trainee": (0.01, 0.2), "gpfellow_retirement_age": (55, 70)}
+
+
+def observed_run(steps=5, **parameters):
+    return run_series("agent", dict(FIXED, **parameters), run_seed(0, 0), steps)
+
+
+def synthetic(task):
+    """
+    A stand-in for calibration._simulate whose series is a known function
+    of the parameters.
+    """
+    engine, parameters, seed, steps, cache = task
+    years = numpy.arange(steps + 1)
+    return {
+        "GPFellows": (parameters["gpfellow_retirement_age"] * (1 + 0.1 * years)).tolist(),
+        "Trainees": (100 * parameters["gpfellow_trained_trainee"] * years).tolist(),
+    }
+
+
+def observed_like(observed):
+    return {name: numpy.nan_to_num(values).tolist() for name, values in observed.items()}
+
+
+def test_loss_is_the_rms_difference_of_the_replicate_mean():
+    observed = {"GPFellows": [10, 12, numpy.nan], "Trainees": [2, 2, 2]}
+    search = Calibration(observed, BOUNDS, FIXED, replicates=2, processes=1)
+    series = [
+        {"GPFellows": [10, 10, 50, 99], "Trainees": [2, 2, 2, 99]},
+        {"GPFellows": [10, 14, 70, 99], "Trainees": [2, 2, 6, 99]},
+    ]
+    # Only year 2 of Trainees is off, by 2; the nan year is skipped
+    assert search.loss(series) == pytest.approx(numpy.sqrt(4 / 5))
+    assert search.loss([observed_like(observed)]) == 0
+
+
+def test_candidates_are_drawn_within_the_bounds():
+    search = Calibration(observed_run(), BOUNDS, FIXED, processes=1, seed=4)
+    candidates = search.sample(50)
+    assert all(0.01 <= c["gpfellow_trained_trainee"] <= 0.2 for c in candidates)
+    assert all(isinstance(c["gpfellow_retirement_age"], int) for c in candidates)
+    assert {c["gpfellow_retirement_age"] for c in candidates} <= set(range(55, 71))
+    assert Calibration(observed_run(), BOUNDS, FIXED, processes=1, seed=4).sample(50) == candidates
+
+
+def test_evaluated_candidates_are_memoized(monkeypatch):
+    tasks = []
+
+    def counted(task):
+        tasks.append(task)
+        return synthetic(task)
+
+    monkeypatch.setattr(calibration, "_simulate", counted)
+    search = Calibration(observed_run(), BOUNDS, FIXED, replicates=3, processes=1)
+    candidate = {"gpfellow_trained_trainee": 0.05, "gpfellow_retirement_age": 60}
+    other = {"gpfellow_trained_trainee": 0.1, "gpfellow_retirement_age": 60}
+    first = search.evaluate([candidate, candidate, other])
+    assert len(tasks) == 6
+    assert first[0] == first[1]
+    assert search.evaluate([other, candidate]) == [first[2], first[0]]
+    assert len(tasks) == 6
+    # Every candidate runs with the same seeds
+    assert [task[2] for task in tasks[:3]] == [task[2] for task in tasks[3:]] == search.seeds
+
+
+def test_the_loss_of_the_observed_parameters_is_lowest():
+    candidate = {"gpfellow_trained_trainee": 0.1, "gpfellow_retirement_age": 60}
+    observed = observed_run(10, **candidate)
+    search = Calibration(observed, BOUNDS, FIXED, replicates=1, processes=1)
+    losses = search.evaluate([candidate, dict(candidate, gpfellow_trained_trainee=0.2)])
+    assert losses[0] == 0
+    assert losses[1] > 0
+
+
+def test_process_pool_gives_the_same_losses():
+    candidates = Calibration(observed_run(), BOUNDS, FIXED, seed=1, processes=1).sample(3)
+    losses = [
+        Calibration(observed_run(), BOUNDS, FIXED, replicates=2, processes=processes).evaluate(candidates)
+        for processes in (1, 2)
+    ]
+    assert losses[0] == losses[1]
+
+
+def test_surrogate_finds_the_minimum_of_a_synthetic_model(monkeypatch):
+    monkeypatch.setattr(calibration, "_simulate", synthetic)
+    truth = {"gpfellow_trained_trainee": 0.08, "gpfellow_retirement_age": 63}
+    observed = synthetic(("agent", truth, 0, 10, None))
+    search = Calibration(observed, BOUNDS, FIXED, replicates=1, processes=1, seed=2)
+    best, loss = search.surrogate(rounds=4, batch=8)
+    assert best["gpfellow_retirement_age"] == 63
+    assert best["gpfellow_trained_trainee"] == pytest.approx(0.08, abs=0.02)
+    assert loss == search.history()["loss"].iloc[0]
+
+
+def test_abc_keeps_the_closest_fraction(monkeypatch):
+    monkeypatch.setattr(calibration, "_simulate", synthetic)
+    observed = synthetic(("agent", {"gpfellow_trained_trainee": 0.1, "gpfellow_retirement_age": 60}, 0, 5, None))
+    search = Calibration(observed, BOUNDS, FIXED, replicates=1, processes=1, seed=3)
+    posterior = search.abc(samples=100, accept=0.1)
+    assert len(posterior) == 10
+    assert posterior["loss"].is_monotonic_increasing
+    assert posterior["loss"].max() <= search.history()["loss"].iloc[10]
+    assert (abs(posterior["gpfellow_retirement_age"] - 60) <= 3).all()
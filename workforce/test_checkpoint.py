@@ -0,0 +1,81 @@
+"""
+Tests of model snapshots, restores and forks.
+"""
+
+import pytest
+
+from workforce.checkpoint import load, save
+from workforce.model import PatientGPFellow
+
+SCENARIO = dict(
+    initial_gpfellows=30, initial_trainees=5, initial_patients=60,
+    patient_reproduce=0.05, gpfellow_trained_trainee=0.1, seed=8,
+)
+
+# Scheduler and bulk-mode combinations a snapshot must round-trip
+MODES = {
+    "default": {},
+    "bulk": dict(bulk_movement=True, bulk_births=True, bulk_attendance=True),
+    "event": dict(event_schedule=True),
+    "array": dict(array_schedule=True, bulk_births=True),
+}
+
+
+def agent_state(model):
+    """
+    Everything observable about each agent, by breed in step order.
+    """
+    return [
+        (
+            breed.__name__,
+            sorted(
+                (a.unique_id, a.pos, a.moore, a.age, a.sex, a.nickname)
+                + tuple(getattr(a, name, None) for name in ("yearsInTraining", "yearsOutTraining"))
+                for a in agents.values()
+            ),
+        )
+        for breed, agents in model.schedule.agents_by_breed.items()
+    ]
+
+
+def run(model, steps):
+    for i in range(steps):
+        model.step()
+    return model
+
+
+@pytest.mark.parametrize("mode", sorted(MODES))
+def test_a_restored_model_continues_exactly(mode):
+    model = run(PatientGPFellow(**dict(SCENARIO, **MODES[mode])), 10)
+    restored = PatientGPFellow.restore(model.snapshot())
+    assert agent_state(restored) == agent_state(model)
+    run(model, 10)
+    run(restored, 10)
+    assert restored.datacollector.model_vars == model.datacollector.model_vars
+    assert agent_state(restored) == agent_state(model)
+    assert restored.current_id == model.current_id
+
+
+def test_compressed_snapshots_round_trip_through_files(tmp_path):
+    model = run(PatientGPFellow(**SCENARIO), 5)
+    path = str(tmp_path / "model.snapshot")
+    save(model, path)
+    restored = load(path)
+    assert agent_state(restored) == agent_state(model)
+    assert len(PatientGPFellow.snapshot(model, compress=True)) < len(model.snapshot())
+
+
+def test_forks_are_independent_and_take_overrides():
+    model = run(PatientGPFellow(**SCENARIO), 10)
+    early = model.fork(gpfellow_retirement_age=40)
+    early.step()
+    model.step()
+    assert early.gpfellow_retirement_age == 40
+    assert model.gpfellow_retirement_age == 65
+    assert early.datacollector.model_vars["GPFellows"][-1] < model.datacollector.model_vars["GPFellows"][-1]
+
+
+def test_unknown_overrides_are_rejected():
+    model = PatientGPFellow(**SCENARIO)
+    with pytest.raises(TypeError):
+        model.fork(retirement_age=60)
@@ -0,0 +1,35 @@
+"""
+Tests of the age-structured cohort engine.
+"""
+
+import numpy
+
+from workforce.batch import compare_engines
+from workforce.cohort import MAX_AGE, CohortPatientGPFellow, rounded_normal_pmf
+
+
+def test_rounded_normal_pmf_matches_rounded_normal_draws():
+    pmf = rounded_normal_pmf(45, 5)
+    assert len(pmf) == MAX_AGE + 1
+    assert abs(pmf.sum() - 1) < 1e-12
+    draws = numpy.rint(numpy.random.default_rng(0).normal(45, 5, 200000)).astype(int)
+    observed = numpy.bincount(draws, minlength=MAX_AGE + 1) / len(draws)
+    assert numpy.abs(observed - pmf).max() < 0.005
+
+
+def test_starts_with_the_initial_headcounts():
+    model = CohortPatientGPFellow(initial_gpfellows=40, initial_trainees=7, initial_patients=90, seed=1)
+    series = model.datacollector.model_vars
+    assert (series["GPFellows"][0], series["Trainees"][0], series["Patients"][0]) == (40, 7, 90)
+
+
+def test_agrees_with_the_agent_engine():
+    comparison = compare_engines(
+        dict(initial_gpfellows=50, initial_trainees=5, initial_patients=50,
+             patient_reproduce=0.05, gpfellow_retirement_age=60),
+        replicates=30, steps=15, processes=1,
+    )
+    z = comparison["cohort"]["z"].abs()
+    # Means of 30 replicates of each engine; a real difference in dynamics
+    # shows up as z scores far beyond this
+    assert numpy.nanmax(z.to_numpy()) < 4.5
@@ -0,0 +1,51 @@
+"""
+Tests of the streaming DataCollector.
+"""
+
+from workforce.collector import StreamingDataCollector, read_table
+from workforce.model import MODEL_REPORTERS, PatientGPFellow
+
+SCENARIO = dict(initial_gpfellows=20, initial_trainees=3, initial_patients=40, patient_reproduce=0.05)
+
+
+def run(steps, **kwargs):
+    model = PatientGPFellow(seed=6, **dict(SCENARIO, **kwargs))
+    model.run_model(steps)
+    return model
+
+
+def test_model_vars_hold_the_same_series_as_a_datacollector(tmp_path):
+    streamed = run(10, collector_path=str(tmp_path))
+    kept = run(10)
+    assert streamed.datacollector.model_vars == kept.datacollector.model_vars
+    frame = streamed.datacollector.get_model_vars_dataframe()
+    assert frame.index.tolist() == list(range(11))
+    assert frame["Patients"].tolist() == kept.datacollector.model_vars["Patients"]
+
+
+def test_agent_rows_cover_every_agent_at_every_step(tmp_path):
+    model = run(5, collector_path=str(tmp_path))
+    steps = read_table(str(tmp_path), "agents")["Step"].tolist()
+    series = model.datacollector.model_vars
+    headcounts = [sum(values) for values in zip(*(series[name] for name in MODEL_REPORTERS))]
+    assert [steps.count(step) for step in range(6)] == headcounts
+
+
+def test_a_new_collector_replaces_the_store_in_its_path(tmp_path):
+    run(10, collector_path=str(tmp_path))
+    model = run(3, collector_path=str(tmp_path))
+    assert read_table(str(tmp_path), "model")["Step"].tolist() == [0, 1, 2, 3]
+    assert len(model.datacollector.model_vars["Patients"]) == 4
+
+
+def test_chunks_are_read_back_in_order(tmp_path):
+    collector = StreamingDataCollector(
+        {"Patients": "initial_patients"}, path=str(tmp_path), chunk_rows=2, use_arrow=False
+    )
+    model = PatientGPFellow(seed=1)
+    for step in range(5):
+        model.schedule.steps = step
+        collector.collect(model)
+    collector.close()
+    assert read_table(str(tmp_path), "model")["Step"].tolist() == [0, 1, 2, 3, 4]
+    assert collector.model_vars["Patients"] == [0] * 5
@@ -0,0 +1,34 @@
+"""
+Tests of the struct-of-arrays agent storage.
+"""
+
+import numpy
+
+from workforce.columns import AgentColumns
+
+DTYPES = {"unique_id": numpy.int64, "age": numpy.int64}
+
+
+def test_append_broadcasts_scalars_to_the_array_columns():
+    columns = AgentColumns(DTYPES, capacity=2)
+    columns.append(unique_id=numpy.arange(5), age=30)
+    assert len(columns) == 5
+    assert columns["unique_id"].tolist() == [0, 1, 2, 3, 4]
+    assert columns["age"].tolist() == [30] * 5
+
+
+def test_append_of_an_empty_batch_with_scalars_adds_nothing():
+    columns = AgentColumns(DTYPES)
+    columns.append(unique_id=numpy.arange(0), age=0)
+    assert len(columns) == 0
+
+
+def test_keep_and_take_follow_the_mask():
+    columns = AgentColumns(DTYPES)
+    columns.append(unique_id=numpy.arange(4), age=numpy.array([20, 70, 30, 80]))
+    old = columns["age"] > 65
+    taken = columns.take(old)
+    columns.keep(~old)
+    assert taken["unique_id"].tolist() == [1, 3]
+    assert columns["unique_id"].tolist() == [0, 2]
+    assert columns["age"].tolist() == [20, 30]
@@ -0,0 +1,80 @@
+"""
+Tests of the streaming ensemble statistics.
+"""
+
+import numpy
+import pytest
+
+from workforce.batch import run_seed, run_series
+from workforce.ensemble import P2Quantile, RunningMoments, run_ensemble
+
+PARAMETERS = dict(initial_gpfellows=10, initial_trainees=2, initial_patients=30, patient_reproduce=0.05)
+
+
+def test_running_moments_match_numpy():
+    values = numpy.random.default_rng(1).normal(10, 3, size=(200, 2, 4))
+    moments = RunningMoments((2, 4))
+    for value in values:
+        moments.add(value)
+    assert moments.count == 200
+    assert numpy.allclose(moments.mean, values.mean(axis=0))
+    assert numpy.allclose(moments.variance, values.var(axis=0, ddof=1))
+    assert numpy.allclose(moments.sem, values.std(axis=0, ddof=1) / numpy.sqrt(200))
+
+
+def test_running_moments_need_two_values_for_a_variance():
+    moments = RunningMoments(3)
+    moments.add(numpy.ones(3))
+    assert numpy.isnan(moments.variance).all()
+
+
+def test_p2_quantiles_are_close_to_the_sample_quantiles():
+    rng = numpy.random.default_rng(2)
+    values = numpy.stack([rng.normal(0, 1, 2000), rng.exponential(5, 2000)], axis=1)
+    for p in (0.05, 0.5, 0.95):
+        quantile = P2Quantile(p, (2,))
+        for value in values:
+            quantile.add(value)
+        exact = numpy.quantile(values, p, axis=0)
+        spread = values.std(axis=0)
+        assert (numpy.abs(quantile.value - exact) < 0.05 * spread).all()
+
+
+def test_p2_quantiles_of_few_values_are_exact():
+    quantile = P2Quantile(0.5, (1,))
+    assert numpy.isnan(quantile.value).all()
+    for value in (3.0, 1.0, 2.0):
+        quantile.add(numpy.array([value]))
+    assert quantile.value.tolist() == [2.0]
+
+
+def test_ensemble_folds_the_replicates_of_its_seed():
+    statistics = run_ensemble(PARAMETERS, replicates=6, steps=5, seed=3, processes=1)
+    runs = [run_series("agent", PARAMETERS, run_seed(3, i), 5) for i in range(6)]
+    assert statistics.count == 6
+    for row, name in enumerate(statistics.names):
+        values = numpy.array([run[name] for run in runs], dtype=float)
+        assert numpy.allclose(statistics.moments.mean[row], values.mean(axis=0))
+    bands = statistics.band_series()
+    assert len(bands["Patients mean"]) == 6
+    assert {"Patients sd", "Patients ci", "Patients 5%", "Patients 50%", "Patients 95%"} <= set(bands)
+
+
+def test_ensembles_do_not_depend_on_the_processes():
+    one = run_ensemble(PARAMETERS, replicates=6, steps=5, seed=3, processes=1)
+    two = run_ensemble(PARAMETERS, replicates=6, steps=5, seed=3, processes=2)
+    assert numpy.array_equal(one.moments.mean, two.moments.mean)
+    assert numpy.array_equal(one.quantiles[0.95].value, two.quantiles[0.95].value)
+
+
+def test_ensembles_stop_once_the_means_are_known():
+    loose = run_ensemble(PARAMETERS, replicates=200, steps=5, seed=3, processes=1, tolerance=1000)
+    assert loose.count == 10
+    tight = run_ensemble(PARAMETERS, replicates=15, steps=5, seed=3, processes=1, tolerance=1e-9)
+    assert tight.count == 15
+
+
+def test_ensembles_need_a_replicate():
+    for replicates in (0, -1):
+        with pytest.raises(ValueError, match="replicate"):
+            run_ensemble(PARAMETERS, replicates=replicates, steps=5, processes=1)
@@ -0,0 +1,58 @@
+"""
+Tests of the headless runner.
+"""
+
+import csv
+import io
+import os
+import subprocess
+import sys
+
+from workforce.headless import main, run
+from workforce.scenario import run_seed
+
+
+def test_rows_per_replicate_and_step():
+    output = io.StringIO()
+    rows = run({"initial_patients": 30}, years=4, replicates=3, seed=1, output=output)
+    table = list(csv.DictReader(io.StringIO(output.getvalue())))
+    assert rows == len(table) == 3 * 5
+    assert {row["seed"] for row in table} == {str(run_seed(1, r)) for r in range(3)}
+    assert [row["Step"] for row in table[:5]] == ["0", "1", "2", "3", "4"]
+
+
+def test_command_line_writes_the_same_rows(tmp_path):
+    path = str(tmp_path / "run.csv")
+    main(["--years", "3", "--initial-patients", "30", "--seed", "2", "--output", path])
+    expected = io.StringIO()
+    run({"initial_patients": 30}, years=3, seed=2, output=expected)
+    with open(path, newline="") as output:
+        assert output.read() == expected.getvalue()
+
+
+def test_import_does_not_load_the_server_or_open_logs(tmp_path):
+    code = (
+        "import sys, workforce.headless; "
+        "print(sorted(m for m in ('workforce.server', 'workforce.batch', 'multiprocessing.pool') "
+        "if m in sys.modules))"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=str(tmp_path), capture_output=True, text=True,
+        env=dict(os.environ, PYTHONPATH=root),
+    )
+    assert result.stdout.strip() == "[]", result.stderr
+    assert not (tmp_path / "workforce.log").exists()
+
+
+def test_replicates_match_the_batch_runs_of_their_seeds():
+    from workforce.batch import run_series
+
+    output = io.StringIO()
+    run({"initial_patients": 30, "patient_reproduce": 0.05}, years=4, replicates=2, seed=5, output=output)
+    table = list(csv.DictReader(io.StringIO(output.getvalue())))
+    for replicate in range(2):
+        series = run_series("agent", {"initial_patients": 30, "patient_reproduce": 0.05}, run_seed(5, replicate), 4)
+        rows = [row for row in table if row["replicate"] == str(replicate)]
+        for name, values in series.items():
+            assert [int(row[name]) for row in rows] == values
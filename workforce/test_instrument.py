@@ -0,0 +1,44 @@
+"""
+Tests of per-step instrumentation.
+"""
+
+import json
+
+from workforce.model import PatientGPFellow
+
+SCENARIO = dict(initial_gpfellows=20, initial_trainees=3, initial_patients=80, patient_reproduce=0.1, seed=9)
+
+
+def test_instrumentation_does_not_change_the_run():
+    runs = []
+    for instrument in (False, True):
+        model = PatientGPFellow(instrument=instrument, **SCENARIO)
+        model.run_model(10)
+        runs.append(model.datacollector.model_vars)
+    assert runs[0] == runs[1]
+
+
+def test_one_record_per_step_with_agent_counts_and_events():
+    model = PatientGPFellow(instrument=True, **SCENARIO)
+    model.run_model(5)
+    records = model.instrument.records
+    assert [record["step"] for record in records] == list(range(6))
+    series = model.datacollector.model_vars
+    for step, record in enumerate(records):
+        assert record["agents"].get("Patient", 0) == series["Patients"][step]
+    births = sum(record["events"].get("births", 0) for record in records[1:])
+    deaths = sum(record["events"].get("deaths", 0) for record in records[1:])
+    assert series["Patients"][-1] - series["Patients"][0] == births - deaths
+    assert all(record["seconds"]["step"] > 0 for record in records[1:])
+
+
+def test_records_export_as_json_lines_and_a_dataframe(tmp_path):
+    model = PatientGPFellow(instrument=True, **SCENARIO)
+    model.run_model(3)
+    path = str(tmp_path / "records.jsonl")
+    model.instrument.export(path)
+    with open(path) as export_file:
+        assert [json.loads(line) for line in export_file] == model.instrument.records
+    frame = model.instrument.to_dataframe()
+    assert frame.index.tolist() == [0, 1, 2, 3]
+    assert "seconds.step" in frame
@@ -0,0 +1,170 @@
+"""
+Tests of the model engines.
+"""
+
+import pytest
+
+from workforce.agents import GPFellow, Patient, Trainee
+from workforce.model import ENGINES, PatientGPFellow
+
+HEADCOUNTS = ("Patients", "GPFellows", "Trainees")
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+def test_every_engine_runs_with_its_defaults(engine):
+    model = ENGINES[engine]()
+    for i in range(3):
+        model.step()
+    series = model.datacollector.model_vars
+    for name in HEADCOUNTS:
+        assert len(series[name]) == 4
+        assert min(series[name]) >= 0
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+def test_every_engine_is_reproduced_by_its_seed(engine):
+    parameters = dict(initial_patients=50, patient_reproduce=0.05, seed=7)
+    runs = []
+    for i in range(2):
+        model = ENGINES[engine](**parameters)
+        for step in range(10):
+            model.step()
+        runs.append(model.datacollector.model_vars)
+    assert runs[0] == runs[1]
+
+
+def test_grid_and_schedule_agree_after_bulk_steps():
+    model = PatientGPFellow(
+        initial_patients=200, patient_reproduce=0.05, bulk_movement=True,
+        bulk_births=True, bulk_attendance=True, seed=3,
+    )
+    for i in range(10):
+        model.step()
+    placed = [agent for cell in model.grid.coord_iter() for agent in cell[0]]
+    scheduled = [agent for agents in model.schedule.agents_by_breed.values() for agent in agents.values()]
+    assert sorted(a.unique_id for a in placed) == sorted(a.unique_id for a in scheduled)
+    for agent in scheduled:
+        assert agent in model.grid.get_cell_list_contents([agent.pos])
+
+
+def test_gpfellow_index_matches_the_grid():
+    model = PatientGPFellow(initial_gpfellows=60, initial_patients=100, gpfellow_retirement_age=50, seed=4)
+    for i in range(10):
+        model.step()
+    for pos, gpfellows in model.gpfellows_by_cell.items():
+        assert gpfellows
+        on_grid = [a for a in model.grid.get_cell_list_contents([pos]) if type(a) is GPFellow]
+        assert sorted(a.unique_id for a in gpfellows) == sorted(a.unique_id for a in on_grid)
+    indexed = sum(len(gpfellows) for gpfellows in model.gpfellows_by_cell.values())
+    assert indexed == model.schedule.get_breed_count(GPFellow)
+
+
+def test_bulk_attendance_attends_every_patient_with_a_gpfellow():
+    model = PatientGPFellow(initial_gpfellows=30, initial_patients=300, height=10, width=10, seed=5)
+    staffed = [
+        patient
+        for patient in model.schedule.agents_by_breed[Patient].values()
+        if patient.pos in model.gpfellows_by_cell
+    ]
+    model.attend_patients()
+    assert sum(p.attendance_count for p in model.schedule.agents_by_breed[Patient].values()) == len(staffed)
+    assert all(p.attendance_count == 1 for p in staffed)
+    attendances = sum(g.attendances for g in model.schedule.agents_by_breed[GPFellow].values())
+    assert attendances == len(staffed)
+
+
+def torus_step(before, after, size):
+    return min(abs(after - before), size - abs(after - before))
+
+
+def test_bulk_movement_moves_each_patient_at_most_one_cell():
+    model = PatientGPFellow(initial_gpfellows=20, initial_patients=300, height=12, width=15, seed=12)
+    patients = list(model.schedule.agents_by_breed[Patient].values())
+    for patient in patients[::2]:
+        patient.moore = False
+    others = {agent.unique_id: agent.pos for agent in model.schedule.agents if type(agent) is not Patient}
+    before = {patient.unique_id: patient.pos for patient in patients}
+    model.move_patients()
+    for patient in patients:
+        (x0, y0), (x1, y1) = before[patient.unique_id], patient.pos
+        dx, dy = torus_step(x0, x1, model.width), torus_step(y0, y1, model.height)
+        assert dx <= 1 and dy <= 1
+        if not patient.moore:
+            assert dx + dy <= 1
+        assert patient in model.grid.get_cell_list_contents([patient.pos])
+    for agent in model.schedule.agents:
+        if type(agent) is not Patient:
+            assert agent.pos == others[agent.unique_id]
+            assert agent in model.grid.get_cell_list_contents([agent.pos])
+    assert sum(len(cell[0]) for cell in model.grid.coord_iter()) == len(model.schedule.agents)
+
+
+def test_bulk_movement_does_not_change_the_headcounts():
+    runs = []
+    for bulk_movement in (False, True):
+        model = PatientGPFellow(initial_patients=100, patient_reproduce=0.05, bulk_movement=bulk_movement, seed=13)
+        model.run_model(10)
+        runs.append(model.datacollector.model_vars)
+    assert runs[0] == runs[1]
+
+
+def test_allocated_ids_continue_next_id():
+    model = PatientGPFellow(initial_patients=10, seed=1)
+    first = model.next_id()
+    assert list(model.allocate_ids(3)) == [first + 1, first + 2, first + 3]
+    assert model.next_id() == first + 4
+
+
+def test_created_agents_are_placed_and_scheduled():
+    model = PatientGPFellow(initial_gpfellows=0, initial_trainees=0, initial_patients=0, seed=1)
+    positions = [(0, 0), (3, 4), (3, 4)]
+    agents = model.create_agents(GPFellow, positions, [True, False, True], [40, 50, 60], [0, 1, 1])
+    assert [agent.pos for agent in agents] == positions
+    assert [agent.sex for agent in agents] == ["F", "M", "M"]
+    assert [agent.age for agent in agents] == [40, 50, 60]
+    assert len({agent.unique_id for agent in agents}) == 3
+    for agent in agents:
+        x, y = agent.pos
+        assert agent.pos is model.cell_positions[x * model.height + y]
+        assert agent in model.grid.get_cell_list_contents([agent.pos])
+        assert model.schedule.agents_by_breed[GPFellow][agent.unique_id] is agent
+    assert len(model.gpfellows_by_cell[(3, 4)]) == 2
+    assert not model.grid.is_cell_empty((3, 4))
+
+
+def test_bulk_births_have_the_per_patient_mean():
+    births = 0
+    for seed in range(40):
+        model = PatientGPFellow(
+            initial_gpfellows=0, initial_trainees=0, initial_patients=500, patient_reproduce=0.05, seed=seed
+        )
+        patients = dict(model.schedule.agents_by_breed[Patient])
+        model.reproduce_patients()
+        babies = [p for i, p in model.schedule.agents_by_breed[Patient].items() if i not in patients]
+        # Each baby starts, at age 0, in its parent's cell
+        assert {baby.age for baby in babies} <= {0}
+        assert {baby.pos for baby in babies} <= {p.pos for p in patients.values()}
+        births += len(babies)
+    mean, sd = 40 * 500 * 0.05, (40 * 500 * 0.05 * 0.95) ** 0.5
+    assert abs(births - mean) < 4.5 * sd
+
+
+def test_bulk_trainee_starts_have_the_per_gpfellow_mean():
+    starts = 0
+    for seed in range(40):
+        model = PatientGPFellow(
+            initial_gpfellows=200, initial_trainees=0, initial_patients=0,
+            gpfellow_trained_trainee=0.05, gpfellow_retirement_age=200, seed=seed,
+        )
+        gpfellows = {g.pos for g in model.schedule.agents_by_breed[GPFellow].values()}
+        model.start_trainees()
+        for trainee in model.schedule.agents_by_breed[Trainee].values():
+            # One cell away from the gpfellow who started them
+            x, y = trainee.pos
+            assert any(
+                torus_step(x, gx, model.width) <= 1 and torus_step(y, gy, model.height) <= 1
+                for gx, gy in gpfellows
+            )
+        starts += model.schedule.get_breed_count(Trainee)
+    mean, sd = 40 * 200 * 0.05, (40 * 200 * 0.05 * 0.95) ** 0.5
+    assert abs(starts - mean) < 4.5 * sd
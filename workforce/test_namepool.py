@@ -0,0 +1,45 @@
+"""
+Tests of the preloaded name pool.
+"""
+
+import numpy
+
+from workforce.agents import GPFellow
+from workforce.model import PatientGPFellow
+from workforce.namepool import get_pool
+
+
+def test_first_names_come_from_the_list_of_their_sex():
+    pool = get_pool()
+    sex_codes = numpy.array([0, 1] * 50)
+    drawn = pool.draw(sex_codes, numpy.random.default_rng(0))
+    for sex_code, name in zip(sex_codes.tolist(), drawn):
+        first, last = name.split(" ")
+        assert first.encode() in set(pool.first[sex_code][0].tolist())
+        assert last.encode() in set(pool.last[0].tolist())
+
+
+def test_codes_turn_into_the_names_drawn_with_them():
+    pool = get_pool()
+    sex_codes = [0, 1, 1, 0]
+    codes = pool.draw_codes(sex_codes, numpy.random.default_rng(1))
+    names = pool.draw(sex_codes, numpy.random.default_rng(1))
+    assert [pool.name(sex, code) for sex, code in zip(sex_codes, codes.tolist())] == names
+
+
+def test_lazy_names_do_not_change_the_run():
+    runs = []
+    for lazy_names in (False, True):
+        model = PatientGPFellow(initial_patients=100, patient_reproduce=0.05, lazy_names=lazy_names, seed=2)
+        for i in range(10):
+            model.step()
+        runs.append(model.datacollector.model_vars)
+    assert runs[0] == runs[1]
+
+
+def test_lazy_names_are_drawn_once_and_kept():
+    model = PatientGPFellow(initial_gpfellows=3, lazy_names=True, seed=2)
+    agent = next(iter(model.schedule.agents_by_breed[GPFellow].values()))
+    assert agent._nickname is None
+    assert agent.nickname == agent.nickname
+    assert agent._nickname is not None
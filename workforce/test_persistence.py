@@ -0,0 +1,74 @@
+"""
+Tests of the database persistence layer, on the SQLite stand-in.
+"""
+
+import json
+import sqlite3
+
+import pytest
+
+from workforce.agents import GPFellow, Patient, Trainee
+from workforce.persistence import build_model, create_sqlite_schema, run_scenario, sqlite_pool
+
+# PERSON_AGENT_ID, DATE_OF_BIRTH, SEX, LOCATION_ID
+PEOPLE = [
+    (1, "1970-03-01", "F", 1),
+    (2, "1995-07-12", "M", 2),
+    (3, "1988-01-30", "F", 22),
+    (4, "2001-11-02", "M", 3),
+]
+
+
+@pytest.fixture
+def pool(tmp_path):
+    path = str(tmp_path / "workforce.db")
+    connection = sqlite3.connect(path)
+    create_sqlite_schema(connection)
+    connection.execute(
+        "INSERT INTO SCENARIO (SCENARIO_NAME, SCENARIO_PARAMETERS) VALUES (?, ?)",
+        ("test", json.dumps({"height": 10, "width": 10, "gpfellow_retirement_age": 60, "unknown": 1})),
+    )
+    connection.executemany("INSERT INTO PERSON_AGENT VALUES (?, ?, ?, ?)", PEOPLE)
+    connection.execute("INSERT INTO GP_FELLOW (PERSON_AGENT_ID, YEAR_FELLOWED) VALUES (1, 2000)")
+    connection.execute("INSERT INTO GP_TRAINEE (PERSON_AGENT_ID, YEAR_STARTED_TRAINING) VALUES (2, 2018)")
+    connection.commit()
+    connection.close()
+    pool = sqlite_pool(path, size=2)
+    yield pool
+    pool.close()
+
+
+def test_build_model_loads_the_scenario_and_population(pool):
+    model = build_model(pool, 1, year=2020, seed=1)
+    assert (model.width, model.height, model.gpfellow_retirement_age) == (10, 10, 60)
+    by_id = {a.unique_id: a for a in model.schedule.agents}
+    assert type(by_id[1]) is GPFellow and by_id[1].yearsOutTraining == 20 and by_id[1].age == 50
+    assert type(by_id[2]) is Trainee and by_id[2].yearsInTraining == 2
+    assert type(by_id[3]) is Patient and by_id[3].pos == (1, 2)
+    assert by_id[4].sex == "M"
+    # New agents are numbered after the loaded ones
+    assert model.next_id() == 5
+    assert model.datacollector.model_vars["GPFellows"] == [1]
+
+
+def test_missing_scenarios_raise_key_error(pool):
+    with pytest.raises(KeyError):
+        build_model(pool, 2)
+
+
+def test_run_scenario_writes_every_step(pool):
+    model = build_model(pool, 1, year=2020, seed=1, patient_reproduce=0.1)
+    run_scenario(model, pool, 1, steps=5)
+    with pool.connection() as connection:
+        results = connection.execute(
+            "SELECT STEP, PATIENTS, GP_FELLOWS, GP_TRAINEES FROM SCENARIO_RESULT ORDER BY STEP"
+        ).fetchall()
+        agent_rows = connection.execute(
+            "SELECT STEP, COUNT(*) FROM AGENT_RESULT GROUP BY STEP ORDER BY STEP"
+        ).fetchall()
+    series = model.datacollector.model_vars
+    assert results == [
+        (step, series["Patients"][step], series["GPFellows"][step], series["Trainees"][step])
+        for step in range(6)
+    ]
+    assert [count for step, count in agent_rows] == [sum(row[1:]) for row in results]
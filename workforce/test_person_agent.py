@@ -73,10 +73,31 @@ class WalkerWorldViz(TextVisualization):
         """
         self.model = model
         grid_viz = TextGrid(self.model.grid, None)
-        grid_viz.converter = lambda m: str(len(x))
+        grid_viz.converter = lambda m: str(len(m))
         self.elements = [grid_viz]
 
 
+def test_walkers_move_one_cell_on_a_plain_mesa_model():
+    model = WalkerWorld(10, 10, 50)
+    before = {agent.unique_id: agent.pos for agent in model.schedule.agents}
+    model.step()
+    for agent in model.schedule.agents:
+        (x0, y0), (x1, y1) = before[agent.unique_id], agent.pos
+        assert min(abs(x1 - x0), 10 - abs(x1 - x0)) <= 1
+        assert min(abs(y1 - y0), 10 - abs(y1 - y0)) <= 1
+        assert agent in model.grid.get_cell_list_contents([agent.pos])
+
+
+def test_walkers_share_the_workforce_model_cell_positions():
+    from workforce.model import PatientGPFellow
+
+    model = PatientGPFellow(initial_gpfellows=0, initial_trainees=0, initial_patients=20, seed=1)
+    for agent in model.schedule.agents:
+        agent.random_move()
+        x, y = agent.pos
+        assert agent.pos is model.cell_positions[x * model.height + y]
+
+
 if __name__ == "__main__":
     print("Testing 10x10 world, with 50 random walkers, for 10 steps.")
     model = WalkerWorld(10, 10, 50)
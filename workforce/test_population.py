@@ -0,0 +1,139 @@
+"""
+Tests of the population bootstrap.
+"""
+
+import collections
+import io
+import os
+
+import numpy
+import pandas
+import pytest
+
+from workforce.agents import GPFellow, Patient, Trainee
+from workforce.headless import main, run
+from workforce.model import PatientGPFellow
+from workforce.population import PERSON_DTYPE, ROLES, PopulationTable, generate
+
+TABLE = pandas.DataFrame(
+    {
+        "ROLE": ["GP_FELLOW", "GP_FELLOW", "GP_TRAINEE", "PATIENT", "PATIENT", "PATIENT"],
+        "SEX": ["F", "M", "F", "M", "F", "M"],
+        "AGE": [50, 60, 28, 5, 40, 5],
+        "COUNT": [1, 3, 2, 10, 30, 5],
+    }
+)
+HEADCOUNTS = dict(initial_gpfellows=40, initial_trainees=10, initial_patients=200)
+
+
+def people(model):
+    return sorted(
+        (type(agent).__name__, agent.age, agent.sex, agent.pos) for agent in model.schedule.agents
+    )
+
+
+def test_rows_are_grouped_and_counted():
+    table = PopulationTable.from_frame(TABLE)
+    assert table.roles.tolist() == [0, 0, 1, 2, 2]
+    assert table.ages.tolist() == [50, 60, 28, 5, 40]
+    assert table.sexes.tolist() == [0, 1, 0, 1, 0]
+    assert table.counts.tolist() == [1, 3, 2, 15, 30]
+    assert table.locations is None
+
+
+def test_ages_are_counted_from_dates_of_birth_and_rows_default_to_one_person():
+    frame = pandas.DataFrame(
+        {
+            "role": ["gp_fellow", "PATIENT", "PATIENT"],
+            "sex": ["m", "F", "F"],
+            "date_of_birth": ["1970-05-01", "2010-01-31", "2010-12-31"],
+        }
+    )
+    table = PopulationTable.from_frame(frame, year=2020)
+    assert table.ages.tolist() == [50, 10]
+    assert table.counts.tolist() == [1, 2]
+
+
+def test_unknown_roles_sexes_and_negative_counts_are_refused():
+    with pytest.raises(ValueError, match="ROLE"):
+        PopulationTable.from_frame(TABLE.assign(ROLE="NURSE"))
+    with pytest.raises(ValueError, match="SEX"):
+        PopulationTable.from_frame(TABLE.assign(SEX="X"))
+    with pytest.raises(ValueError, match="COUNT"):
+        PopulationTable.from_frame(TABLE.assign(COUNT=-1))
+
+
+def test_csv_and_numpy_tables_are_the_same(tmp_path):
+    TABLE.to_csv(str(tmp_path / "table.csv"), index=False)
+    records = TABLE.to_records(index=False, column_dtypes={"ROLE": "S10", "SEX": "S1"})
+    numpy.save(str(tmp_path / "table.npy"), records)
+    digests = {PopulationTable.load(str(tmp_path / name)).digest() for name in ("table.csv", "table.npy")}
+    assert digests == {PopulationTable.from_frame(TABLE).digest()}
+
+
+def test_samples_follow_the_row_counts():
+    table = PopulationTable.from_frame(TABLE)
+    sample = table.sample((1000, 0, 5000), 20, 20, numpy.random.default_rng(1))
+    assert sample.dtype == PERSON_DTYPE
+    assert sample["role"].tolist() == [0] * 1000 + [2] * 5000
+    fellows = collections.Counter(sample["age"][:1000].tolist())
+    assert set(fellows) == {50, 60}
+    assert abs(fellows[60] / 1000 - 0.75) < 0.05
+    patients = collections.Counter(zip(sample["age"][1000:].tolist(), sample["sex"][1000:].tolist()))
+    assert set(patients) == {(5, 1), (40, 0)}
+    assert abs(patients[(40, 0)] / 5000 - 30 / 45) < 0.03
+    assert 0 <= sample["x"].min() and sample["x"].max() < 20
+
+
+def test_locations_are_placed_as_location_ids():
+    table = PopulationTable.from_frame(TABLE.assign(LOCATION_ID=[1, 2, 3, 22, 22, 22]))
+    sample = table.sample((10, 5, 10), 20, 10, numpy.random.default_rng(2))
+    assert set(zip(sample["x"][10:15].tolist(), sample["y"][10:15].tolist())) == {(2, 0)}
+    assert set(zip(sample["x"][15:].tolist(), sample["y"][15:].tolist())) == {(1, 1)}
+
+
+def test_models_draw_their_agents_from_the_table():
+    model = PatientGPFellow(population=PopulationTable.from_frame(TABLE), seed=1, **HEADCOUNTS)
+    counts = {breed: model.schedule.get_breed_count(breed) for breed in ROLES.values()}
+    assert counts == {GPFellow: 40, Trainee: 10, Patient: 200}
+    assert {agent.age for agent in model.schedule.agents_by_breed[Trainee].values()} == {28}
+    for agent in model.schedule.agents:
+        assert agent in model.grid.get_cell_list_contents([agent.pos])
+    assert model.datacollector.model_vars["Patients"] == [200]
+    model.run_model(3)
+
+
+def test_seeded_populations_repeat_and_differ_between_seeds():
+    table = PopulationTable.from_frame(TABLE)
+    first = people(PatientGPFellow(population=table, seed=1, **HEADCOUNTS))
+    assert people(PatientGPFellow(population=table, seed=1, **HEADCOUNTS)) == first
+    assert people(PatientGPFellow(population=table, seed=2, **HEADCOUNTS)) != first
+
+
+def test_a_cached_population_is_memory_mapped(tmp_path):
+    table = PopulationTable.from_frame(TABLE)
+    cache = str(tmp_path / "populations")
+    miss = PatientGPFellow(population=table, population_cache=cache, seed=3, **HEADCOUNTS)
+    (entry,) = os.listdir(cache)
+    assert entry.startswith("population-") and entry.endswith(".npy")
+    assert len(numpy.load(os.path.join(cache, entry))) == 250
+    hit = PatientGPFellow(population=table, population_cache=cache, seed=3, **HEADCOUNTS)
+    assert people(hit) == people(miss) == people(PatientGPFellow(population=table, seed=3, **HEADCOUNTS))
+    assert isinstance(generate(hit, table, (40, 10, 200), 3, cache), numpy.memmap)
+    # New headcounts, or no seed, draw a population of their own
+    PatientGPFellow(population=table, population_cache=cache, seed=3, **dict(HEADCOUNTS, initial_patients=1))
+    PatientGPFellow(population=table, population_cache=cache, **HEADCOUNTS)
+    assert len(os.listdir(cache)) == 2
+
+
+def test_headless_runs_take_a_population_table(tmp_path):
+    path = str(tmp_path / "table.csv")
+    TABLE.to_csv(path, index=False)
+    output = str(tmp_path / "run.csv")
+    main(["--years", "2", "--initial-patients", "200", "--seed", "2", "--population", path, "--output", output])
+    expected = io.StringIO()
+    run({"initial_patients": 200, "population": path}, years=2, seed=2, output=expected)
+    with open(output, newline="") as written:
+        assert written.read() == expected.getvalue()
+    with pytest.raises(SystemExit):
+        main(["--engine", "cohort", "--population", path])
@@ -0,0 +1,205 @@
+"""
+Tests of the visualization elements.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+from tornado.httpserver import HTTPServer
+from tornado.testing import bind_unused_port
+from tornado.websocket import websocket_connect
+
+from workforce import server
+from workforce.batch import cached_series, run_seed
+from workforce.cache import ResultCache
+from workforce.model import PatientGPFellow
+from workforce.server import (
+    HEATMAP_BREEDS,
+    PROJECTION_YEARS,
+    VIEWER,
+    BandChartModule,
+    HeatmapGrid,
+    ProjectionElement,
+    ViewerServer,
+    cell_counts,
+    scenario_parameters,
+)
+
+SETTINGS = dict(initial_gpfellows=5, initial_trainees=1, initial_patients=10, patient_reproduce=0.02)
+
+
+def serve(application, client):
+    """
+    Serve the application on a free port and return what the coroutine
+    client(websocket_url) returns.
+    """
+
+    async def main():
+        sock, port = bind_unused_port()
+        server = HTTPServer(application)
+        server.add_sockets([sock])
+        try:
+            return await client("ws://127.0.0.1:{0}/ws".format(port))
+        finally:
+            server.stop()
+
+    return asyncio.run(main())
+
+
+def test_a_new_projection_is_run_in_the_background(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    element = ProjectionElement(cache)
+    model = PatientGPFellow(seed=1, **SETTINGS)
+    assert element.render(model).startswith("Projecting")
+    series = element._series[model].result(timeout=60)
+    assert element.render(model).startswith("Projection<table>")
+    # Stored under the settings alone, with run_series' fast defaults
+    assert cached_series("agent", scenario_parameters(model), 1, PROJECTION_YEARS, cache) == series
+
+
+def test_a_cached_projection_is_shown_at_once(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    first = ProjectionElement(cache)
+    model = PatientGPFellow(seed=1, **SETTINGS)
+    first.render(model)
+    first._series[model].result(timeout=60)
+    text = first.render(model)
+    # A reset to the same settings, also from a view with its own element
+    assert ProjectionElement(cache).render(PatientGPFellow(seed=1, **SETTINGS)) == text
+
+
+def test_threads_rendering_one_model_start_one_projection(tmp_path, monkeypatch):
+    started = []
+
+    def slow_miss(*args):
+        # Widen the window between looking a model up and storing its Future
+        time.sleep(0.05)
+
+    def counted(model, function, *args):
+        started.append(threading.get_ident())
+        return server.Future()
+
+    monkeypatch.setattr(server, "cached_series", slow_miss)
+    monkeypatch.setattr(server, "in_background", counted)
+    element = ProjectionElement(ResultCache(str(tmp_path)))
+    model = PatientGPFellow(seed=1, **SETTINGS)
+    with ThreadPoolExecutor(max_workers=4) as threads:
+        texts = list(threads.map(lambda i: element.render(model), range(4)))
+    assert len(started) == 1
+    assert all(text.startswith("Projecting") for text in texts)
+
+
+def test_unseeded_models_are_not_projected():
+    element = ProjectionElement()
+    assert element.render(PatientGPFellow(**SETTINGS)) == "Set a seed to see the projection"
+    assert element.cache is None
+
+
+def test_bands_are_left_out_until_their_ensemble_finishes(tmp_path):
+    chart = BandChartModule(
+        [{"Label": "Patients"}, {"Label": "Patients mean"}, {"Label": "Patients 95%"}],
+        replicates=4,
+        years=3,
+        cache=ResultCache(str(tmp_path)),
+    )
+    model = PatientGPFellow(seed=1, **SETTINGS)
+    assert chart.render(model) == [10, None, None]
+    bands = chart._bands[model].result(timeout=60)
+    assert len(bands["Patients mean"]) == 4
+    # The ensemble has the settings alone, with run_series' fast defaults
+    assert cached_series("agent", scenario_parameters(model), run_seed(1, 0), 3, chart.cache) is not None
+    for year in range(5):
+        values = chart.render(model)
+        assert values[0] == model.datacollector.model_vars["Patients"][-1]
+        if year <= 3:
+            assert values[1:] == [float(bands["Patients mean"][year]), float(bands["Patients 95%"][year])]
+        else:
+            assert values[1:] == [None, None]
+        model.step()
+
+
+def test_unseeded_models_have_no_bands():
+    chart = BandChartModule([{"Label": "Patients"}, {"Label": "Patients mean"}], replicates=2, years=3)
+    model = PatientGPFellow(**SETTINGS)
+    for year in range(2):
+        assert chart.render(model) == [model.datacollector.model_vars["Patients"][-1], None]
+        model.step()
+    assert model not in chart._bands
+    assert chart.cache is None
+
+
+class Viewer:
+    pass
+
+
+def apply(frame, counts):
+    """
+    Update a viewer's counts as HeatmapModule.js does.
+    """
+    if frame["full"]:
+        counts[:] = 0
+    cells = numpy.reshape(frame["cells"], (-1, 1 + len(HEATMAP_BREEDS)))
+    counts[:, cells[:, 0]] = cells[:, 1:].T
+
+
+def render_for(element, model, viewer):
+    token = VIEWER.set(viewer)
+    try:
+        return element.render(model)
+    finally:
+        VIEWER.reset(token)
+
+
+def test_heatmap_viewers_of_one_model_get_their_own_deltas():
+    element = HeatmapGrid(10, 10)
+    model = PatientGPFellow(seed=1, height=10, width=10, **SETTINGS)
+    viewers = [Viewer(), Viewer()]
+    counts = [numpy.zeros_like(cell_counts(model)) for viewer in viewers]
+    for step in range(6):
+        # The first viewer draws every step, the second every other step
+        for i, viewer in enumerate(viewers):
+            if step % (i + 1) == 0:
+                frame = render_for(element, model, viewer)
+                assert frame["full"] == (step == 0)
+                apply(frame, counts[i])
+                assert (counts[i] == cell_counts(model)).all()
+        model.step()
+
+
+def test_heatmap_sends_a_full_frame_to_new_viewers_and_models():
+    element = HeatmapGrid(10, 10)
+    model = PatientGPFellow(seed=1, height=10, width=10, **SETTINGS)
+    viewer = Viewer()
+    assert render_for(element, model, viewer)["full"]
+    assert not render_for(element, model, viewer)["full"]
+    # A reloaded page
+    assert render_for(element, model, Viewer())["full"]
+    # A reset
+    assert render_for(element, PatientGPFellow(seed=2, height=10, width=10, **SETTINGS), viewer)["full"]
+    # Without a viewer, as in a session's thread
+    assert element.render(model)["full"]
+    assert not element.render(model)["full"]
+
+
+def test_viewer_server_sockets_get_their_own_heatmap_frames():
+    application = ViewerServer(PatientGPFellow, [HeatmapGrid(20, 20)], "Test", dict(SETTINGS, seed=1))
+
+    async def client(url):
+        first = await websocket_connect(url)
+        second = await websocket_connect(url)
+        for connection in (first, second):
+            await connection.read_message()  # model_params
+        frames = []
+        for connection in (first, first, second):
+            connection.write_message(json.dumps({"type": "get_step"}))
+            frames.append(json.loads(await connection.read_message())["data"][0])
+        first.close()
+        second.close()
+        return frames
+
+    frames = serve(application, client)
+    assert [frame["full"] for frame in frames] == [True, False, True]
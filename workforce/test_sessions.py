@@ -0,0 +1,94 @@
+"""
+Tests of the session server.
+"""
+
+import asyncio
+import json
+import logging
+
+from tornado.httpserver import HTTPServer
+from tornado.testing import bind_unused_port
+from tornado.websocket import websocket_connect
+
+from workforce.model import PatientGPFellow
+from workforce.server import HeatmapGrid, ProfileElement
+from workforce.sessions import SessionServer
+
+SETTINGS = dict(initial_gpfellows=5, initial_trainees=1, initial_patients=10, seed=1)
+
+
+def serve(application, client):
+    """
+    Serve the application on a free port and return what the coroutine
+    client(websocket_url) returns.
+    """
+
+    async def main():
+        sock, port = bind_unused_port()
+        server = HTTPServer(application)
+        server.add_sockets([sock])
+        try:
+            return await client("ws://127.0.0.1:{0}/ws".format(port))
+        finally:
+            server.stop()
+
+    return asyncio.run(main())
+
+
+def session_server(max_sessions=2):
+    return SessionServer(
+        PatientGPFellow, [HeatmapGrid(20, 20), ProfileElement()], "Test", SETTINGS, max_sessions=max_sessions
+    )
+
+
+async def get_step(connection):
+    connection.write_message(json.dumps({"type": "get_step"}))
+    return json.loads(await connection.read_message())
+
+
+def test_sessions_step_their_own_models():
+    application = session_server()
+
+    async def client(url):
+        connections = [await websocket_connect(url) for i in range(2)]
+        ids = [json.loads(await connection.read_message())["session"] for connection in connections]
+        first = [await get_step(connections[0]) for i in range(3)]
+        second = await get_step(connections[1])
+        for connection in connections:
+            connection.close()
+        return ids, first, second
+
+    ids, first, second = serve(application, client)
+    assert len(set(ids)) == 2
+    assert [frame["type"] for frame in first + [second]] == ["viz_state"] * 4
+    # Each session's first frame is a full heatmap of its own model
+    assert [frame["data"][0]["full"] for frame in first] == [True, False, False]
+    assert second["data"][0]["full"]
+
+
+def test_connections_beyond_max_sessions_are_turned_away(caplog):
+    application = session_server(max_sessions=2)
+
+    async def client(url):
+        connections = [await websocket_connect(url) for i in range(3)]
+        # The extra connection talks before it sees its close
+        for message in ("submit_params", "get_step", "reset"):
+            connections[2].write_message(json.dumps({"type": message, "param": "seed", "value": 2}))
+        rejected = await connections[2].read_message()
+        open_sessions = len(application.sessions)
+        for connection in connections[:2]:
+            await connection.read_message()  # model_params
+        frames = [await get_step(connection) for connection in connections[:2]]
+        for connection in connections:
+            connection.close()
+        await asyncio.sleep(0.1)
+        return rejected, connections[2].close_code, open_sessions, frames
+
+    with caplog.at_level(logging.ERROR):
+        rejected, close_code, open_sessions, frames = serve(application, client)
+    assert rejected is None
+    assert close_code == 1013
+    assert open_sessions == 2
+    assert [frame["type"] for frame in frames] == ["viz_state"] * 2
+    assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
+    assert application.sessions == {}
@@ -0,0 +1,68 @@
+"""
+Tests of the sharded simulation.
+"""
+
+import pytest
+
+from workforce.agents import Patient
+from workforce.shard import ShardModel, ShardedPatientGPFellow, agent_state, shard_seeds, strip_bounds
+
+SCENARIO = dict(initial_gpfellows=20, initial_trainees=3, initial_patients=60, patient_reproduce=0.05)
+
+
+def test_strips_cover_the_width():
+    assert strip_bounds(20, 3) == [0, 6, 13, 20]
+    assert strip_bounds(20, 1) == [0, 20]
+    with pytest.raises(ValueError):
+        strip_bounds(20, 21)
+    with pytest.raises(ValueError):
+        strip_bounds(20, 0)
+
+
+def test_shard_seeds_come_from_the_seed():
+    assert shard_seeds(1, 3) == shard_seeds(1, 3)
+    assert len(set(shard_seeds(1, 3))) == 4
+    assert shard_seeds(1, 3) != shard_seeds(2, 3)
+
+
+def test_shards_hand_out_interleaved_ids():
+    shards = [ShardModel(index, 3, 0, 20, seed=index) for index in range(3)]
+    ids = [shard.next_id() for shard in shards] + [i for shard in shards for i in shard.allocate_ids(4)]
+    assert len(set(ids)) == len(ids)
+    assert all(i % 3 == index for index, shard in enumerate(shards) for i in shard.allocate_ids(2))
+
+
+def test_agents_cross_to_the_shard_owning_their_column():
+    bounds = strip_bounds(20, 2)
+    left = ShardModel(0, 2, 0, 10, seed=1, **SCENARIO)
+    right = ShardModel(1, 2, 10, 20, seed=2, initial_gpfellows=0, initial_trainees=0, initial_patients=0)
+    patient = next(iter(left.schedule.agents_by_breed[Patient].values()))
+    state = agent_state(patient)
+    left.grid.move_agent(patient, (15, 4))
+    leaving = left.emigrate((Patient,), bounds)
+    assert list(leaving) == [1]
+    assert len(leaving[1]) == 1
+    right.immigrate(leaving[1])
+    arrived = right.schedule.agents_by_breed[Patient][patient.unique_id]
+    assert agent_state(arrived) == (state[:2] + ((15, 4),) + state[3:])
+    assert patient.unique_id not in left.schedule.agents_by_breed[Patient]
+
+
+def test_sharded_run_sums_the_shard_headcounts():
+    with ShardedPatientGPFellow(shards=2, seed=1, **SCENARIO) as model:
+        model.run_model(5)
+    frame = model.get_model_vars_dataframe()
+    assert len(frame) == 6
+    assert frame.loc[0, "Patients"] == 60
+    assert frame.loc[0, "GPFellows"] == 20
+    assert frame.loc[0, "Trainees"] == 3
+    assert model.processes == []
+
+
+def test_seeded_sharded_runs_repeat():
+    runs = []
+    for i in range(2):
+        with ShardedPatientGPFellow(shards=2, seed=4, **SCENARIO) as model:
+            model.run_model(5)
+        runs.append(model.model_vars)
+    assert runs[0] == runs[1]
@@ -0,0 +1,49 @@
+"""
+Tests of the model's seeded random streams.
+"""
+
+from workforce.model import PatientGPFellow
+from workforce.streams import STREAMS, RandomStreams
+
+
+def draws(streams):
+    return {name: [getattr(streams, name).random() for i in range(5)] for name in STREAMS}
+
+
+def test_a_seed_reproduces_every_stream():
+    assert draws(RandomStreams(3)) == draws(RandomStreams(3))
+    assert draws(RandomStreams(3)) != draws(RandomStreams(4))
+
+
+def test_streams_are_independent():
+    streams, other = RandomStreams(3), RandomStreams(3)
+    for i in range(1000):
+        other.names.random()
+    assert streams.movement.random() == other.movement.random()
+
+
+def test_state_round_trips_with_undrawn_block_values():
+    streams = RandomStreams(5, block_size=16)
+    for i in range(7):
+        streams.demographics.random()
+        streams.demographics.normal()
+    state = streams.getstate()
+    expected = draws(streams)
+    restored = RandomStreams(0, block_size=16)
+    restored.setstate(state)
+    assert draws(restored) == expected
+
+
+def test_scalar_draws_stay_in_range():
+    stream = RandomStreams(1).intake
+    assert all(0 <= stream.integers(7) < 7 for i in range(1000))
+    assert all(stream.choice("ab") in "ab" for i in range(100))
+
+
+def test_a_seed_reproduces_a_model_run():
+    runs = []
+    for i in range(2):
+        model = PatientGPFellow(initial_patients=50, patient_reproduce=0.05, seed=11)
+        model.run_model(10)
+        runs.append([(a.unique_id, a.pos, a.age, a.nickname) for a in model.schedule.agents])
+    assert runs[0] == runs[1]